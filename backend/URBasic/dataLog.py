@@ -28,7 +28,6 @@ __license__ = "MIT License"
 import threading
 import URBasic
 import numpy as np
-import time
 import xml.etree.ElementTree as ET
 
 
@@ -118,13 +117,17 @@ class DataLog(threading.Thread):
  
     def run(self):
         self.__stop_event = False
+        lastSeq = 0
         while not self.__stop_event:
+            # Snapshots are immutable, so each new sample is logged without copying it
+            snapshot = self.__robotModel.waitForSnapshot(lastSeq, timeout=0.1)
+            if snapshot is None:
+                continue
+            lastSeq = snapshot.seq
             try:
-                dataDirCopy = self.__robotModel.dataDir.copy()
-                self.logdata(dataDirCopy)
-                time.sleep(0.005)
+                self.logdata(snapshot.data)
             except:
-                self.__robotModelDataDirCopy = dataDirCopy
+                self.__robotModelDataDirCopy = snapshot.data
                 self.__logger.warning("DataLog error while running, but will retry")
         self.__logger.info("DataLog is stopped")
 
@@ -25,26 +25,189 @@ __author__ = "Martin Huus Bjerge"
 __copyright__ = "Copyright 2017, Rope Robotics ApS, Denmark"
 __license__ = "MIT License"
 
-import ikpy  as ik
 import numpy as np
-import sympy as sp
+import hashlib
 import math
+import os
 import scipy
 from scipy import linalg
 from URBasic.manipulation import *
 
 pi = np.pi
-# Disable the logging stream from ikpy
-ik.logs.manager.removeHandler(ik.logs.stream_handler)
+# sympy (also pulled in by ikpy.chain) takes long to import, so both are imported where they are used
+
+
+class RobotKinematics(object):
+    '''
+    Kinematic model of one robot type, built once and shared by all FK/IK calls.
+
+    Holds the DH table (a, alpha, d per joint), the home configuration M and the screw
+    axes in the fixed frame (Slist) and in the end-effector frame (Blist), all as numpy
+    arrays. When M and Slist are not given they are derived from the DH table, so a
+    new robot variant only needs its DH parameters. The ikpy chain is parsed from the
+    URDF file on first use and then reused.
+
+    Input parameters:
+    name (string): robot name, e.g. 'ur10'
+    a, d (6 floats): DH link lengths and offsets [m]
+    alpha (6 floats): DH link twists [rad] (default the UR twists)
+    M (4x4 float), Slist (6x6 float): optional home pose and fixed screw axes
+    urdfFile (string): optional URDF file for the ikpy based Forward_kin/Inverse_kin
+    '''
+    def __init__(self, name, a, d, alpha=(pi/2, 0, 0, pi/2, -pi/2, 0), M=None, Slist=None, urdfFile=None):
+        self.name = name
+        self.a = np.array(a, dtype=float)
+        self.alpha = np.array(alpha, dtype=float)
+        self.d = np.array(d, dtype=float)
+        if M is None or Slist is None:
+            M, Slist = self.__screwAxesFromDH()
+        self.M = np.array(M, dtype=float)
+        self.Slist = np.array(Slist, dtype=float)
+        self.Blist = np.dot(Adjoint(TransInv(self.M)), self.Slist.T).T
+        self.urdfFile = urdfFile
+        self.__chain = None
+        self.__ikSolvers = {}
+
+    def __screwAxesFromDH(self):
+        '''
+        Joint i turns about the z axis of DH frame i-1, so at the zero configuration
+        its screw axis is [z, -z x p] with p the origin of that frame.
+        '''
+        T = np.identity(4)
+        Slist = []
+        for a, alpha, d in zip(self.a, self.alpha, self.d):
+            w = T[:3, 2].copy()
+            Slist.append(np.concatenate((w, -np.cross(w, T[:3, 3]))))
+            T = np.dot(T, dhTransform(a, alpha, d, 0.))
+        return T, Slist
+
+    def dhTable(self, joint=(0, 0, 0, 0, 0, 0)):
+        '''DH table with rows [a, alpha, d, theta] for the given joint vector'''
+        return np.column_stack((self.a, self.alpha, self.d, np.asarray(joint, dtype=float)))
+
+    def ikSolver(self, tcpOffset=(0, 0, 0, 0, 0, 0)):
+        '''
+        Shared IKinSolver (iterative IK) for a TCP offset, built on first use.
+        It keeps buffers and the last solution, so hold solver.lock while using it.
+        '''
+        key = tuple(float(x) for x in tcpOffset)
+        solver = self.__ikSolvers.get(key)
+        if solver is None:
+            M = np.dot(self.M, Pose2Tran_Mat(pose=key))
+            # setdefault: threads racing here all get the same solver (and so the same lock)
+            solver = self.__ikSolvers.setdefault(key, IKinSolver(self.Slist, M, jointLimits=[[-2*pi, 2*pi]]*6))
+        return solver
+
+    @property
+    def chain(self):
+        '''ikpy chain of the robot, parsed from urdfFile on first use'''
+        if self.__chain is None:
+            if self.urdfFile is None:
+                raise ValueError('No URDF file configured for robot {}'.format(self.name))
+            import ikpy.chain
+            import ikpy.logs
+            # Disable the logging stream from ikpy (the logger was called "manager" before ikpy 3)
+            (getattr(ikpy.logs, 'logger', None) or ikpy.logs.manager).removeHandler(ikpy.logs.stream_handler)
+            self.__chain = ikpy.chain.Chain.from_urdf_file(self.urdfFile)
+        return self.__chain
+
+
+def dhTransform(a, alpha, d, theta):
+    '''
+    Transformation matrix of one standard DH link: Rz(theta) Tz(d) Tx(a) Rx(alpha)
+    theta may be an array, then the result has shape theta.shape+(4,4)
+    '''
+    theta = np.asarray(theta, dtype=float)
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    T = np.zeros(theta.shape+(4,4))
+    T[...,0,0] = ct
+    T[...,0,1] = -st*ca
+    T[...,0,2] = st*sa
+    T[...,0,3] = a*ct
+    T[...,1,0] = st
+    T[...,1,1] = ct*ca
+    T[...,1,2] = -ct*sa
+    T[...,1,3] = a*st
+    T[...,2,1] = sa
+    T[...,2,2] = ca
+    T[...,2,3] = d
+    T[...,3,3] = 1.
+    return T
+
+def invTransform(T):
+    '''
+    Inverse of one or more (...,4,4) rigid transformation matrices
+    '''
+    T = np.asarray(T, dtype=float)
+    Tinv = np.zeros(T.shape)
+    Rt = np.swapaxes(T[...,:3,:3], -1, -2)
+    Tinv[...,:3,:3] = Rt
+    Tinv[...,:3,3] = -np.matmul(Rt, T[...,:3,3,np.newaxis])[...,0]
+    Tinv[...,3,3] = 1.
+    return Tinv
+
+
+_robotKinematics = {}
+
+def registerRobotKinematics(kinematics):
+    '''
+    Make a RobotKinematics available by name to getRobotKinematics and the rob=... functions.
+    E.g. registerRobotKinematics(RobotKinematics('my_ur5e', a=[...], d=[...]))
+    '''
+    _robotKinematics[str(kinematics.name).lower()] = kinematics
+    return kinematics
+
+def getRobotKinematics(rob='ur10'):
+    '''
+    Return the shared RobotKinematics of a robot ('ur3', 'ur5', 'ur10', 'ur3e', 'ur5e',
+    'ur10e', 'ur16e' or a registered variant). A RobotKinematics is passed through as is.
+    Raises ValueError for an unknown robot.
+    '''
+    if isinstance(rob, RobotKinematics):
+        return rob
+    kinematics = _robotKinematics.get(str(rob).lower())
+    if kinematics is None:
+        raise ValueError('Wrong robot selected: {}'.format(rob))
+    return kinematics
+
+# https://www.universal-robots.com/articles/ur/application-installation/dh-parameters-for-calculations-of-kinematics-and-dynamics/
+# The screw axes are derived from the DH table for every robot, so the screw based FK/IK and the
+# DH based closed-form IK agree exactly (the rounded ur5/ur10 screw axes used before were up to 50 um off)
+registerRobotKinematics(RobotKinematics('ur5', a=[0, -0.425, -0.39225, 0, 0, 0], d=[0.089159, 0, 0, 0.10915, 0.09465, 0.0823],
+                                        urdfFile='URDF/UR5.URDF'))
+registerRobotKinematics(RobotKinematics('ur10', a=[0, -0.612, -0.5723, 0, 0, 0], d=[0.1273, 0, 0, 0.163941, 0.1157, 0.0922]))
+registerRobotKinematics(RobotKinematics('ur3', a=[0, -0.24365, -0.21325, 0, 0, 0], d=[0.1519, 0, 0, 0.11235, 0.08535, 0.0819]))
+registerRobotKinematics(RobotKinematics('ur3e', a=[0, -0.24355, -0.2132, 0, 0, 0], d=[0.15185, 0, 0, 0.13105, 0.08535, 0.0921]))
+registerRobotKinematics(RobotKinematics('ur5e', a=[0, -0.425, -0.3922, 0, 0, 0], d=[0.1625, 0, 0, 0.1333, 0.0997, 0.0996]))
+registerRobotKinematics(RobotKinematics('ur10e', a=[0, -0.6127, -0.57155, 0, 0, 0], d=[0.1807, 0, 0, 0.17415, 0.11985, 0.11655]))
+registerRobotKinematics(RobotKinematics('ur16e', a=[0, -0.4784, -0.36, 0, 0, 0], d=[0.1807, 0, 0, 0.17415, 0.11985, 0.11655]))
 
 def Forwardkin_manip(joints,rob='ur10'):    
     '''
     This function solves forward kinematics, it returns pose vector
     '''
-    M,Slist = Robot_parameter_screw_axes(rob)
+    kinematics = getRobotKinematics(rob)
     thetalist = joints
-    fk = FKinFixed(M, Slist, thetalist)
+    fk = FKinFixed(kinematics.M, kinematics.Slist, thetalist)
     return np.round(Tran_Mat2Pose(Tran_Mat=fk),4)
+
+def Forwardkin_Tran_Mat_batch(joints,rob='ur10'):
+    '''
+    Forward kinematics for many joint vectors at once.
+    joints: (N,6) array of joint vectors
+    Returns the (N,4,4) TCP transformation matrices
+    '''
+    kinematics = getRobotKinematics(rob)
+    return FKinFixedBatch(kinematics.M, kinematics.Slist, joints)
+
+def Forwardkin_batch(joints,rob='ur10'):
+    '''
+    Forward kinematics for many joint vectors at once, e.g. all waypoints of a program.
+    joints: (N,6) array of joint vectors
+    Returns the (N,6) pose vectors (not rounded, unlike Forwardkin_manip)
+    '''
+    return Tran_Mat2Pose_batch(Forwardkin_Tran_Mat_batch(joints, rob))
     
 def Invkine_manip(target_pos,init_joint_pos=[0,0,0, 0,0,0],rob='ur10',tcpOffset=[0,0,0, 0,0,0]):
     '''
@@ -54,7 +217,8 @@ def Invkine_manip(target_pos,init_joint_pos=[0,0,0, 0,0,0],rob='ur10',tcpOffset=
     (thetalist_init), and small positive scalar thresholds (wthresh, vthresh) controlling how close the
     final solution thetas must be to the desired thetas.
     '''
-    M,Slist = Robot_parameter_screw_axes(rob)
+    kinematics = getRobotKinematics(rob)
+    M,Slist = kinematics.M, kinematics.Slist
     wthresh =0.001
     vthresh = 0.0001
     #T_sd = Pose2Tran_Mat(pose=target_pos)
@@ -101,6 +265,205 @@ def Invkine_manip(target_pos,init_joint_pos=[0,0,0, 0,0,0],rob='ur10',tcpOffset=
     
     return out
     #return init_joint_pos+error
+
+def Invkine_analytic_Tran_Mat(T_06,rob='ur10',q6=0.):
+    '''
+    Closed-form inverse kinematics of a UR arm from its DH table, for one or more
+    flange transformation matrices T_06 (4x4 or (N,4,4)).
+    Returns the eight solutions of every matrix as an (N,8,6) array in the order
+    shoulder left/right x wrist up/down x elbow up/down, joints wrapped to [-pi, pi].
+    Unreachable branches are NaN. q6 (scalar or (N,)) is used for joint 6 when the
+    wrist is singular (joint 5 within 1e-6 rad of 0 or pi), where any joint 6 value fits.
+    Reference: K. P. Hawkins, Analytic Inverse Kinematics for the Universal Robots UR-5/UR-10 Arms, 2013
+    '''
+    tol = 1e-9  # Rounding slack on the arccos arguments, so poses at a boundary (e.g. q5 = 0) keep their branches
+    singular = 1e-6  # Below this |sin(q5)| joint 6 is taken from q6, the arctan2 below would only fit rounding noise
+    kinematics = getRobotKinematics(rob)
+    a2, a3 = kinematics.a[1], kinematics.a[2]
+    d1, d4, d5, d6 = kinematics.d[0], kinematics.d[3], kinematics.d[4], kinematics.d[5]
+    al = kinematics.alpha
+    T = np.asarray(T_06, dtype=float).reshape(-1,4,4)
+    N = len(T)
+    R = T[:,:3,:3]
+    p = T[:,:3,3]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Joint 1 (shoulder left/right) from the wrist center P05, which lies d4 off the base z plane
+        p05 = p - d6*R[:,:,2]
+        c_phi = d4/np.hypot(p05[:,0], p05[:,1])
+        valid = np.abs(c_phi) <= 1.+tol
+        phi = np.arccos(np.clip(c_phi, -1., 1.))
+        q1 = np.arctan2(p05[:,1], p05[:,0])[:,np.newaxis] + np.stack((phi, -phi), axis=1) + pi/2   # (N,2)
+        s1, c1 = np.sin(q1), np.cos(q1)
+
+        # Joint 5 (wrist up/down) from the flange position along joint 1's z axis
+        c5 = (p[:,0,np.newaxis]*s1 - p[:,1,np.newaxis]*c1 - d4)/d6
+        valid = valid[:,np.newaxis] & (np.abs(c5) <= 1.+tol)
+        q5_abs = np.arccos(np.clip(c5, -1., 1.))
+        q5 = np.stack((q5_abs, -q5_abs), axis=2)                                                 # (N,2,2)
+        valid = np.repeat(valid[:,:,np.newaxis], 2, axis=2)
+        q1 = np.repeat(q1[:,:,np.newaxis], 2, axis=2)
+        s1, c1 = np.sin(q1), np.cos(q1)
+
+        # Joint 6 from the flange orientation, free when sin(q5) ~ 0
+        s5 = np.sin(q5)
+        sign5 = np.sign(s5)
+        y6 = (-R[:,0,1,np.newaxis,np.newaxis]*s1 + R[:,1,1,np.newaxis,np.newaxis]*c1)*sign5
+        x6 = (R[:,0,0,np.newaxis,np.newaxis]*s1 - R[:,1,0,np.newaxis,np.newaxis]*c1)*sign5
+        q6 = np.broadcast_to(np.asarray(q6, dtype=float).reshape(-1,1,1), q5.shape)
+        q6 = np.where(np.abs(s5) < singular, q6, np.arctan2(y6, x6))
+
+        # Joints 2-4 are a planar 3R chain: T14 = T01^-1 T06 T56^-1 T45^-1
+        T14 = np.matmul(np.matmul(invTransform(dhTransform(0., al[0], d1, q1)), T[:,np.newaxis,np.newaxis]),
+                        invTransform(np.matmul(dhTransform(0., al[4], d5, q5), dhTransform(0., al[5], d6, q6))))
+        x13 = T14[...,0,3]
+        y13 = T14[...,1,3]
+        c3 = (x13**2 + y13**2 - a2**2 - a3**2)/(2*a2*a3)
+        valid = valid & (np.abs(c3) <= 1.+tol)
+        q3_abs = np.arccos(np.clip(c3, -1., 1.))
+        q3 = np.stack((q3_abs, -q3_abs), axis=3)                                                 # (N,2,2,2)
+        q2 = (np.arctan2(y13, x13)[...,np.newaxis]
+              - np.arctan2(a3*np.sin(q3), a2 + a3*np.cos(q3)))
+        q234 = np.arctan2(T14[...,1,0], T14[...,0,0])[...,np.newaxis]
+        q4 = q234 - q2 - q3
+
+    expand = lambda q: np.broadcast_to(q[...,np.newaxis], q3.shape)
+    solutions = np.stack((expand(q1), q2, q3, q4, expand(q5), expand(q6)), axis=-1)
+    solutions = (solutions + pi) % (2*pi) - pi
+    solutions[~np.broadcast_to(valid[...,np.newaxis], q3.shape)] = np.nan
+    return solutions.reshape(N,8,6)
+
+def Invkine_analytic_all(target_pos,rob='ur10',tcpOffset=[0,0,0, 0,0,0]):
+    '''
+    All valid closed-form inverse kinematics solutions (up to 8) of a TCP pose,
+    as a (k,6) array. Empty when the pose is out of reach.
+    '''
+    T_sd = np.matmul(Pose2Tran_Mat(pose=target_pos), invTransform(Pose2Tran_Mat(pose=tcpOffset)))
+    solutions = Invkine_analytic_Tran_Mat(T_sd, rob)[0]
+    return solutions[~np.isnan(solutions[:,0])]
+
+def Invkine_analytic_batch(target_pos,init_joint_pos=[0,0,0, 0,0,0],rob='ur10',tcpOffset=[0,0,0, 0,0,0]):
+    '''
+    Closed-form inverse kinematics for (N,6) TCP poses.
+    For each pose returns the solution closest to the seed init_joint_pos (one joint
+    vector or one per pose), with every joint shifted by multiples of 2*pi to the
+    turn nearest the seed. Rows of unreachable poses are NaN.
+    '''
+    poses = np.atleast_2d(np.asarray(target_pos, dtype=float))
+    seeds = np.broadcast_to(np.asarray(init_joint_pos, dtype=float), poses.shape)
+    T_sd = np.matmul(Pose2Tran_Mat_batch(poses), invTransform(Pose2Tran_Mat(pose=tcpOffset)))
+    solutions = Invkine_analytic_Tran_Mat(T_sd, rob, q6=seeds[:,5])                             # (N,8,6)
+    solutions = solutions - np.round((solutions - seeds[:,np.newaxis])/(2*pi))*2*pi
+    distance = np.sum((solutions - seeds[:,np.newaxis])**2, axis=2)
+    distance[np.isnan(distance)] = np.inf
+    best = np.argmin(distance, axis=1)
+    return solutions[np.arange(len(poses)), best]
+
+# Scalar 3x4 transforms (rows [r0, r1, r2, p], last row [0, 0, 0, 1] implied) for the single-pose
+# closed-form IK, where numpy's per-call overhead on 4x4 arrays would dominate
+
+def _dhTransformScalar(a, alpha, d, theta):
+    ct, st = math.cos(theta), math.sin(theta)
+    ca, sa = math.cos(alpha), math.sin(alpha)
+    return ((ct, -st*ca, st*sa, a*ct),
+            (st, ct*ca, -ct*sa, a*st),
+            (0., sa, ca, d))
+
+def _mulTransformScalar(A, B):
+    (a00, a01, a02, a03), (a10, a11, a12, a13), (a20, a21, a22, a23) = A
+    (b00, b01, b02, b03), (b10, b11, b12, b13), (b20, b21, b22, b23) = B
+    return ((a00*b00 + a01*b10 + a02*b20, a00*b01 + a01*b11 + a02*b21, a00*b02 + a01*b12 + a02*b22, a00*b03 + a01*b13 + a02*b23 + a03),
+            (a10*b00 + a11*b10 + a12*b20, a10*b01 + a11*b11 + a12*b21, a10*b02 + a11*b12 + a12*b22, a10*b03 + a11*b13 + a12*b23 + a13),
+            (a20*b00 + a21*b10 + a22*b20, a20*b01 + a21*b11 + a22*b21, a20*b02 + a21*b12 + a22*b22, a20*b03 + a21*b13 + a22*b23 + a23))
+
+def _invTransformScalar(A):
+    (r00, r01, r02, x), (r10, r11, r12, y), (r20, r21, r22, z) = A
+    return ((r00, r10, r20, -(r00*x + r10*y + r20*z)),
+            (r01, r11, r21, -(r01*x + r11*y + r21*z)),
+            (r02, r12, r22, -(r02*x + r12*y + r22*z)))
+
+def _invkineAnalyticSingle(T_06, kinematics, q6=0.):
+    '''
+    Invkine_analytic_Tran_Mat for a single 4x4 matrix with scalar math, returning only
+    the valid solutions (same formulas and tolerances, joints wrapped to [-pi, pi]).
+    '''
+    tol, singular = 1e-9, 1e-6  # As in Invkine_analytic_Tran_Mat
+    a2, a3 = float(kinematics.a[1]), float(kinematics.a[2])
+    d1, d4, d5, d6 = (float(kinematics.d[i]) for i in (0, 3, 4, 5))
+    al0, al4, al5 = (float(kinematics.alpha[i]) for i in (0, 4, 5))
+    T = np.asarray(T_06, dtype=float)[:3].tolist()
+    (r00, r01, r02, px), (r10, r11, r12, py) = T[0], T[1]
+    wrap = math.remainder  # math.* throughout: abs/round here are numpy's (star import), slow on scalars
+    clip = lambda c: -1. if c < -1. else (1. if c > 1. else c)
+
+    x05, y05 = px - d6*r02, py - d6*r12
+    r = math.hypot(x05, y05)
+    if r == 0. or math.fabs(d4/r) > 1.+tol:
+        return []
+    phi = math.acos(clip(d4/r))
+    solutions = []
+    for q1 in (math.atan2(y05, x05) + phi + pi/2, math.atan2(y05, x05) - phi + pi/2):
+        s1, c1 = math.sin(q1), math.cos(q1)
+        c5 = (px*s1 - py*c1 - d4)/d6
+        if math.fabs(c5) > 1.+tol:
+            continue
+        T16 = _mulTransformScalar(_invTransformScalar(_dhTransformScalar(0., al0, d1, q1)), T)
+        q5_abs = math.acos(clip(c5))
+        for q5 in (q5_abs, -q5_abs):
+            s5 = math.sin(q5)
+            if math.fabs(s5) < singular:
+                q6_ = q6
+            else:
+                sign5 = 1. if s5 > 0 else -1.
+                q6_ = math.atan2((-r01*s1 + r11*c1)*sign5, (r00*s1 - r10*c1)*sign5)
+            T46 = _mulTransformScalar(_dhTransformScalar(0., al4, d5, q5), _dhTransformScalar(0., al5, d6, q6_))
+            T14 = _mulTransformScalar(T16, _invTransformScalar(T46))
+            x13, y13 = T14[0][3], T14[1][3]
+            c3 = (x13**2 + y13**2 - a2**2 - a3**2)/(2*a2*a3)
+            if math.fabs(c3) > 1.+tol:
+                continue
+            q3_abs = math.acos(clip(c3))
+            q234 = math.atan2(T14[1][0], T14[0][0])
+            for q3 in (q3_abs, -q3_abs):
+                q2 = math.atan2(y13, x13) - math.atan2(a3*math.sin(q3), a2 + a3*math.cos(q3))
+                solutions.append((wrap(q1, 2*pi), wrap(q2, 2*pi), wrap(q3, 2*pi), wrap(q234 - q2 - q3, 2*pi),
+                                  wrap(q5, 2*pi), wrap(q6_, 2*pi)))
+    return solutions
+
+def Invkine_analytic(target_pos,init_joint_pos=[0,0,0, 0,0,0],rob='ur10',tcpOffset=[0,0,0, 0,0,0]):
+    '''
+    Closed-form inverse kinematics: the solution closest to init_joint_pos, with every
+    joint on the turn nearest the seed (like Invkine_manip, without iterating).
+    Solves the single pose with scalar math (~0.1 ms); the microsecond-per-pose rate
+    needs Invkine_analytic_batch, which amortizes the numpy overhead over many poses.
+    Returns None when the pose is out of reach.
+    '''
+    seed = [float(x) for x in init_joint_pos]
+    T_sd = Pose2Tran_Mat(pose=target_pos)
+    if any(tcpOffset):
+        T_sd = np.dot(T_sd, invTransform(Pose2Tran_Mat(pose=tcpOffset)))
+    best, best_distance = None, math.inf
+    for solution in _invkineAnalyticSingle(T_sd, getRobotKinematics(rob), seed[5]):
+        # Shift every joint to the turn nearest the seed, as Invkine_analytic_batch
+        # (plain loops: sum/round are numpy's here)
+        solution = [q - math.floor((q - s)/(2*pi) + 0.5)*2*pi for q, s in zip(solution, seed)]
+        distance = 0.
+        for q, s in zip(solution, seed):
+            distance += (q - s)**2
+        if distance < best_distance:
+            best, best_distance = solution, distance
+    return None if best is None else np.array(best)
+
+def Invkine_newton(target_pos,init_joint_pos=None,rob='ur10',tcpOffset=[0,0,0, 0,0,0]):
+    '''
+    Iterative inverse kinematics (damped least squares) with the robot's shared IKinSolver,
+    using the screw axes instead of the DH table. Without init_joint_pos it warm starts
+    from the previous solution of the same robot and TCP offset.
+    Returns None if it did not converge.
+    '''
+    solver = getRobotKinematics(rob).ikSolver(tcpOffset)
+    with solver.lock:  # The shared solver's buffers and warm start (e.g. requests run via asyncio.to_thread)
+        ik, success = solver.solve(Pose2Tran_Mat(pose=target_pos), init_joint_pos)
+    return ik if success else None
     
 
 
@@ -151,30 +514,14 @@ def Robot_parameter_screw_axes(rob='ur10'):
     rob='ur5'  : ur5
     rob='ur10' : ur10
     https://www.universal-robots.com/how-tos-and-faqs/faq/ur-faq/actual-center-of-mass-for-robot-17264/ 
+    Other registered robots work too, see getRobotKinematics.
     '''
-    if str(rob).lower()=='ur5':
-        M_ur5 = [[1,0,0,-.81725],[0,0,-1,-.19145],[0,1,0,-.0055],[0,0,0,1]]
-        S1_ur5 = [0,0,1,0,0,0]
-        S2_ur5 = [0,-1,0,.089159,0,0]
-        S3_ur5 = [0,-1,0,.089159,0,.425]
-        S4_ur5 = [0,-1,0,.089159,0,.81725]
-        S5_ur5 = [0,0,-1,.10915,-.81725,0]  
-        S6_ur5 = [0,-1,0,-.0055,0,.81725]
-        Slist_ur5 = [S1_ur5,S2_ur5,S3_ur5,S4_ur5,S5_ur5,S6_ur5]
-        return M_ur5,Slist_ur5
-    elif str(rob).lower()=='ur10':
-        M_ur10 = [[1,0,0,-1.1843],[0,0,-1,-0.2561],[0,1,0,0.0116],[0,0,0,1]]
-        S1_ur10 = [0,0,1,0,0,0]
-        S2_ur10 = [0,-1,0,.1273,0,0]
-        S3_ur10 = [0,-1,0,.1273,0,.612]
-        S4_ur10 = [0,-1,0,.1273,0,1.1843]
-        S5_ur10 = [0,0,-1,.16394,-1.1843,0]  
-        S6_ur10 = [0,-1,0,0.01165,0,1.1843]
-        Slist_ur10 = [S1_ur10,S2_ur10,S3_ur10,S4_ur10,S5_ur10,S6_ur10]
-        return M_ur10,Slist_ur10
-    else:
+    try:
+        kinematics = getRobotKinematics(rob)
+    except ValueError:
         print('Wrong robot selected')
         return False
+    return kinematics.M.tolist(), kinematics.Slist.tolist()
     
 def Robot_DH_Numerical(rob='ur10',joint=[0,0,0,0,0,0]):
     '''
@@ -183,28 +530,12 @@ def Robot_DH_Numerical(rob='ur10',joint=[0,0,0,0,0,0]):
     rob='ur10' : ur10 
     joint: the robot joint vectors
     '''
-    j = joint
-    if str(rob).lower()=='ur5':
-        dh_ur=np.matrix([
-                        [0, pi/2, 0.089159,j[0]],
-                        [-0.425,0,0,j[1]],
-                        [-0.39225,0,0,j[2]],
-                        [0, pi/2, 0.10915,j[3]],
-                        [0, -pi/2, 0.09465,j[4]],
-                        [0, 0, 0.0823,j[5]]])
-        return dh_ur
-    elif str(rob).lower()=='ur10':
-        dh_ur=np.matrix([
-                        [0, pi/2, 0.1273,j[0]],
-                        [-0.612 ,0,0,j[1]],
-                        [-0.5723 ,0,0,j[2]],
-                        [0, pi/2, 0.163941 ,j[3]],
-                        [0, -pi/2, 0.1157 ,j[4]],
-                        [0, 0, 0.0922,j[5]]])
-        return dh_ur
-    else:
+    try:
+        kinematics = getRobotKinematics(rob)
+    except ValueError:
         print('Wrong robot selected')
-        return         
+        return
+    return np.matrix(kinematics.dhTable(joint))
     
     
 def Robot_DH_Symbol(rob='ur10' ):
@@ -213,29 +544,25 @@ def Robot_DH_Symbol(rob='ur10' ):
     rob='ur5'  : ur5
     rob='ur10' : ur10 
     '''
+    import sympy as sp
     # set up our joint angle symbols (6th angle doesn't affect any kinematics)
     q = [sp.Symbol('q%i'%ii) for ii in range(6)]
-    if str(rob).lower()=='ur5': 
-        dh_ur=np.matrix([
-                        [0, pi/2, 0.089159,q[0]],
-                        [-0.425,0,0,q[1]],
-                        [-0.39225,0,0,q[2]],
-                        [0, pi/2, 0.10915,q[3]],
-                        [0, -pi/2, 0.09465,q[4]],
-                        [0, 0, 0.0823,q[5]]])
-        return dh_ur
-    elif str(rob).lower()=='ur10':
-        dh_ur=np.matrix([
-                        [0, pi/2, 0.1273,q[0]],
-                        [-0.612 ,0,0,q[1]],
-                        [-0.5723 ,0,0,q[2]],
-                        [0, pi/2, 0.163941 ,q[3]],
-                        [0, -pi/2, 0.1157 ,q[4]],
-                        [0, 0, 0.0922,q[5]]])
-        return dh_ur
-    else:
+    try:
+        kinematics = getRobotKinematics(rob)
+    except ValueError:
         print('Wrong robot selected')
-        return         
+        return
+    return np.matrix([[a, alpha, d, q[ii]] for ii, (a, alpha, d) in enumerate(zip(kinematics.a.tolist(), kinematics.alpha.tolist(), kinematics.d.tolist()))])
+
+def _dhDigest(kinematics):
+    '''Short hash of the DH table, so cached derivations follow a re-registered robot name'''
+    dh = repr((kinematics.a.tolist(), kinematics.alpha.tolist(), kinematics.d.tolist()))
+    return hashlib.sha1(dh.encode()).hexdigest()[:12]
+
+def _symbolKey(kinematics, joint_num):
+    return (kinematics.name, _dhDigest(kinematics), joint_num)
+
+_transMatrixSymbols = {}
 
 def TransMatrix_DH_Symbol(rob='ur10' ,joint_num=6):
     '''
@@ -243,10 +570,16 @@ def TransMatrix_DH_Symbol(rob='ur10' ,joint_num=6):
     rob='ur5'  : ur5
     rob='ur10' : ur10 
     joint_num: the transform matrix for joint_num (from 1 to 6) 
+    The product is built once per robot, DH table and joint_num, later calls return a copy.
     '''
+    import sympy as sp
+    if joint_num not in range(1,7):
+        print('Wrong joint number input')
+        return
+    key = _symbolKey(getRobotKinematics(rob), joint_num)
+    if key in _transMatrixSymbols:
+        return _transMatrixSymbols[key].copy()
     T=[]
-    # set up our joint angle symbols (6th angle doesn't affect any kinematics)
-    q = [sp.Symbol('q%i'%ii) for ii in range(joint_num)]
     dh_ur = Robot_DH_Symbol(rob)
     for ii in range(joint_num):
         #descriptions terms in dh_ur
@@ -259,21 +592,11 @@ def TransMatrix_DH_Symbol(rob='ur10' ,joint_num=6):
                             [0,sp.sin(dh_ur[ii,1]),sp.cos(dh_ur[ii,1]),dh_ur[ii,2]],
                             [0,0,0,1]
                             ]))
-    if joint_num==1:
-        return T[0]
-    elif joint_num==2:
-        return T[0]*T[1]
-    elif joint_num==3:
-        return T[0]*T[1]*T[2]
-    elif joint_num==4:
-        return T[0]*T[1]*T[2]*T[3]
-    elif joint_num==5:
-        return T[0]*T[1]*T[2]*T[3]*T[4]
-    elif joint_num==6:
-        return T[0]*T[1]*T[2]*T[3]*T[4]*T[5]
-    else:
-        print('Wrong joint number input')
-        return
+    Tx = T[0]
+    for Ti in T[1:]:
+        Tx = Tx*Ti
+    _transMatrixSymbols[key] = Tx
+    return Tx.copy()
     
 
 
@@ -284,28 +607,26 @@ def TransMatrix_DH_Numerical(rob='ur10' ,joint=[0,0,0,0,0,0]):
     rob='ur10' : ur10 
     joint: the robot joint vectors
     '''
-    T=[]
-    dh_ur = Robot_DH_Numerical(rob, joint)
-    for ii in range(6):
-        #descriptions terms in dh_ur
-        #dh_ur[:,0] = a or r
-        #dh_ur[:,1] = alpha
-        #dh_ur[:,2] = d
-        #dh_ur[:,3] = theta
-        T.append(np.matrix([[np.cos(dh_ur[ii,3]), -np.sin(dh_ur[ii,3])*np.cos(dh_ur[ii,1]),np.sin(dh_ur[ii,3])*np.sin(dh_ur[ii,1]),np.cos(dh_ur[ii,3])*dh_ur[ii,0]],
-                            [np.sin(dh_ur[ii,3]),np.cos(dh_ur[ii,3])*np.cos(dh_ur[ii,1]),-np.cos(dh_ur[ii,3])*np.sin(dh_ur[ii,1]),np.sin(dh_ur[ii,3])*dh_ur[ii,0]],
-                            [0,np.sin(dh_ur[ii,1]),np.cos(dh_ur[ii,1]),dh_ur[ii,2]],
-                            [0,0,0,1]
-                            ]))
-    return np.round(T[0]*T[1]*T[2]*T[3]*T[4]*T[5],4)
+    kinematics = getRobotKinematics(rob)
+    #dhTable columns: a or r, alpha, d, theta
+    T = np.linalg.multi_dot([dhTransform(*row) for row in kinematics.dhTable(joint)])
+    return np.matrix(np.round(T,4))
+
 
 
+_jacobianSymbols = {}
 
 def Jacobian_Symbol(rob='ur10' ,joint_num=6):
     '''
     This function returns a 6*6 symbolic jacobian matrix 
     Tx: transfermation matrix
+    The simplified expressions take seconds to derive, so they are kept per robot, DH
+    table and joint_num. For numbers use Jacobian_Function (same layout) or Jacobian_Analytic.
     '''
+    import sympy as sp
+    key = _symbolKey(getRobotKinematics(rob), joint_num)
+    if key in _jacobianSymbols:
+        return [row[:] for row in _jacobianSymbols[key]]
     # set up our joint angle symbols (6th angle doesn't affect any kinematics) 
     q = [sp.Symbol('q%i'%ii) for ii in range(joint_num)] 
 
@@ -328,7 +649,82 @@ def Jacobian_Symbol(rob='ur10' ,joint_num=6):
     # add on the orientation information up to the last joint
     for ii in range(joint_num):
         J[ii] = J[ii] + J_orientation[ii]
-    return J        
+    _jacobianSymbols[key] = J
+    return [row[:] for row in J]
+
+
+# Compiled Jacobian_Symbol expressions, one numpy module per robot, joint_num and DH table
+JACOBIAN_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'URBasic')
+_jacobianFunctions = {}
+
+def _jacobianSource(kinematics, joint_num):
+    '''Python source of a function evaluating Jacobian_Symbol with numpy'''
+    import sympy as sp
+    from sympy.printing.numpy import NumPyPrinter
+    printer = NumPyPrinter()
+    J = Jacobian_Symbol(kinematics, joint_num)
+    rows = ',\n        '.join('[' + ', '.join(printer.doprint(sp.sympify(x)) for x in row) + ']' for row in J)
+    args = ', '.join('q%i'%ii for ii in range(joint_num))
+    return ('# Generated by URBasic.kinematic.Jacobian_Function for {}\n'
+            'def jacobian(q):\n'
+            '    {}, = q[:{}]\n'
+            '    return numpy.array([\n        {}], dtype=float)\n').format(kinematics.name, args, joint_num, rows)
+
+def _jacobianCompile(source, path, joint_num):
+    '''The jacobian function defined by source, None if it is broken (e.g. a truncated cache file)'''
+    namespace = {'numpy': np}
+    try:
+        exec(compile(source, path, 'exec'), namespace)
+        function = namespace['jacobian']
+        if function(np.zeros(joint_num)).shape != (joint_num, 6):
+            return None
+    except Exception as e:
+        print('Ignoring broken Jacobian in {}: {!r}'.format(path, e))
+        return None
+    return function
+
+def Jacobian_Function(rob='ur10' ,joint_num=6):
+    '''
+    Returns a function f(joint) -> (joint_num,6) array, the numerical Jacobian_Symbol.
+    The expressions are derived with sympy the first time and compiled to numpy code,
+    which is kept in memory and in JACOBIAN_CACHE_DIR, so later runs need no sympy.
+    A cache file that does not load is derived and written again.
+    '''
+    kinematics = getRobotKinematics(rob)
+    key = _symbolKey(kinematics, joint_num)
+    function = _jacobianFunctions.get(key)
+    if function is not None:
+        return function
+
+    path = os.path.join(JACOBIAN_CACHE_DIR, 'jacobian_{}_{}_{}.py'.format(kinematics.name, joint_num, key[1]))
+    try:
+        with open(path) as f:
+            function = _jacobianCompile(f.read(), path, joint_num)
+    except OSError:
+        pass
+    if function is None:
+        source = _jacobianSource(kinematics, joint_num)
+        function = _jacobianCompile(source, path, joint_num)
+        if function is None:
+            raise RuntimeError('Generated Jacobian for {} does not compile'.format(kinematics.name))
+        try:
+            os.makedirs(JACOBIAN_CACHE_DIR, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                f.write(source)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print('Could not cache Jacobian in {}: {}'.format(path, e))
+    _jacobianFunctions[key] = function
+    return function
+
+def Jacobian_Analytic(rob='ur10' ,joint=[0,0,0,0,0,0]):
+    '''
+    Space Jacobian (6xN, like FixedJacobian) from the robot's screw axes, computed in one
+    pass without sympy. This is the full geometric Jacobian (angular rows first).
+    '''
+    solver = getRobotKinematics(rob).ikSolver()
+    with solver.lock:
+        return solver.jacobian(joint)
 
 
 def Jacobian_Numerical(rob='ur10' ,joint=[0,0,0,0,0,0]):
@@ -433,6 +829,67 @@ def Tran_Mat2Pose(Tran_Mat):
     pose[-3:] = angle_vec
     return pose
 
+def RotatMatr2AxisAng_batch(Matrix):
+    '''
+    Convert (N,3,3) rotation matrices to (N,3) axis angles.
+    Unlike RotatMatr2AxisAng this also handles rotations of 0 and pi.
+    '''
+    R = np.asarray(Matrix, dtype=float)
+    cos_theta = np.clip(0.5*(np.trace(R, axis1=1, axis2=2)-1), -1.0, 1.0)
+    theta = np.arccos(cos_theta)
+    e = np.stack((R[:,2,1]-R[:,1,2], R[:,0,2]-R[:,2,0], R[:,1,0]-R[:,0,1]), axis=1)
+    sin_theta = np.sin(theta)
+    small = sin_theta < 1e-6
+    scale = np.full_like(theta, 0.5)  # theta/(2*sin(theta)) -> 1/2 as theta -> 0
+    scale[~small] = theta[~small]/(2*sin_theta[~small])
+    axis_ang = e*scale[:,np.newaxis]
+
+    # Near pi the axis is the largest column of R+I (R = 2*e*e^T - I)
+    flip = small & (cos_theta < 0)
+    if np.any(flip):
+        RI = R[flip] + np.identity(3)
+        cols = np.linalg.norm(RI, axis=1)
+        col = RI[np.arange(len(RI)), :, np.argmax(cols, axis=1)]
+        axis_ang[flip] = col/np.linalg.norm(col, axis=1)[:,np.newaxis]*theta[flip][:,np.newaxis]
+    return axis_ang
+
+def Tran_Mat2Pose_batch(Tran_Mat):
+    '''
+    Convert (N,4,4) transformation matrices to (N,6) poses
+    '''
+    T = np.asarray(Tran_Mat, dtype=float)
+    pose = np.empty((len(T),6))
+    pose[:,:3] = T[:,:3,3]
+    pose[:,3:] = RotatMatr2AxisAng_batch(T[:,:3,:3])
+    return pose
+
+def AxisAng2RotaMatri_batch(angle_vec):
+    '''
+    Convert (N,3) axis angles to (N,3,3) rotation matrices
+    '''
+    r = np.asarray(angle_vec, dtype=float).reshape(-1,3)
+    theta = np.linalg.norm(r, axis=1)
+    e = np.zeros_like(r)
+    moving = theta > 0
+    e[moving] = r[moving]/theta[moving,np.newaxis]
+    cs = np.cos(theta)[:,np.newaxis,np.newaxis]
+    si = np.sin(theta)[:,np.newaxis,np.newaxis]
+    e_so3 = np.zeros((len(r),3,3))
+    e_so3[:,0,1], e_so3[:,0,2], e_so3[:,1,2] = -e[:,2], e[:,1], -e[:,0]
+    e_so3 -= np.swapaxes(e_so3, 1, 2)
+    return cs*np.identity(3) + si*e_so3 + (1-cs)*e[:,:,np.newaxis]*e[:,np.newaxis,:]
+
+def Pose2Tran_Mat_batch(pose):
+    '''
+    Convert (N,6) poses to (N,4,4) transformation matrices
+    '''
+    pose = np.asarray(pose, dtype=float).reshape(-1,6)
+    T = np.zeros((len(pose),4,4))
+    T[:,:3,:3] = AxisAng2RotaMatri_batch(pose[:,3:])
+    T[:,:3,3] = pose[:,:3]
+    T[:,3,3] = 1.
+    return T
+
 def cmpleate_rotation_matrix(start_vector):  
     ''' This function make rotation matrix where the first column is the 
         input vector.
@@ -447,14 +904,15 @@ def cmpleate_rotation_matrix(start_vector):
     Vh = np.transpose(Vh)
     return np.array(Vh)
    
-def Inverse_kin(target_pos,init_joint_pos=[0,0,0,0,0,0],tcpOffset=[0,0,0, 0,0,0]):
+def Inverse_kin(target_pos,init_joint_pos=[0,0,0,0,0,0],tcpOffset=[0,0,0, 0,0,0],rob='ur5'):
     '''
     Find the inverse kinematics
     target_pos = the target pos vector
     init_joint_pos (optional) = the initial joint vector
+    rob (optional) = robot whose URDF chain is used
     '''
-    # Define a robot from URDF file
-    my_chain = ik.chain.Chain.from_urdf_file('URDF/UR5.URDF')        
+    # Robot defined from its URDF file (parsed once)
+    my_chain = getRobotKinematics(rob).chain
     #Convert pos to transfer matrix
     #Mar = Pose2Tran_Mat(target_pos)
 
@@ -483,12 +941,12 @@ def Inverse_kin(target_pos,init_joint_pos=[0,0,0,0,0,0],tcpOffset=[0,0,0, 0,0,0]
     
     return ikin[1:]
     
-def Forward_kin(joint):
+def Forward_kin(joint,rob='ur5'):
     '''
     Find the forward kinematics 
     '''
-    # Define a robot from URDF file
-    my_chain = ik.chain.Chain.from_urdf_file('URDF/UR5.URDF')
+    # Robot defined from its URDF file (parsed once)
+    my_chain = getRobotKinematics(rob).chain
     # add a [0] in joint anlges, due to the defination of URDF
     joint_new = np.zeros([7])
     joint_new[1:] = joint[:]
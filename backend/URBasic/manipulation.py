@@ -1,4 +1,5 @@
 import math
+import threading
 from numpy import *
 
 ### HELPER FUNCTIONS ###
@@ -602,6 +603,90 @@ def FKinBody(M,Blist,thetalist):
     return T_se
 
 
+def MatrixExp6Batch(S, thetas):
+    '''
+    Vectorized MatrixExp6 for one screw axis S (6-vector) and N joint values thetas,
+    using the Rodrigues formula on all N at once. Returns an (N,4,4) array.
+    Example:
+
+    MatrixExp6Batch([0,0,1,0,-3,2], [1, 0.5])[0]
+    >> array([[ 0.54030231, -0.84147098,  0.        ,  1.37909308],
+              [ 0.84147098,  0.54030231,  0.        , -2.52441295],
+              [ 0.        ,  0.        ,  1.        ,  2.        ],
+              [ 0.        ,  0.        ,  0.        ,  1.        ]])
+    '''
+    S = asarray(S, dtype=float)
+    assert len(S) == 6, 'Input not a 6-vector'
+    thetas = asarray(thetas, dtype=float).reshape(-1)
+    T = zeros((len(thetas),4,4))
+    T[:,3,3] = 1
+
+    w_norm = linalg.norm(S[:3])
+    if w_norm == 0:
+        T[:,0,0] = T[:,1,1] = T[:,2,2] = 1
+        T[:,:3,3] = thetas[:,newaxis]*S[3:]
+        return T
+
+    # Unit rotation axis; theta scales with |w| like AxisAng6 does
+    thetas = thetas*w_norm
+    v = S[3:]/w_norm
+    w_so3mat = VecToso3(S[:3]/w_norm)
+    w_so3mat2 = dot(w_so3mat, w_so3mat)
+    s = sin(thetas)
+
+    # The top 3x4 block of every T is a linear combination of five fixed 3x4 blocks:
+    # R = I + sin*[w] + (1-cos)*[w]^2,  p = theta*v + (1-cos)*[w]v + (theta-sin)*[w]^2 v
+    basis = zeros((5,3,4))
+    basis[0,:,:3] = identity(3)
+    basis[1,:,:3] = w_so3mat
+    basis[2,:,:3] = w_so3mat2
+    basis[2,:,3] = dot(w_so3mat, v)
+    basis[3,:,3] = v
+    basis[4,:,3] = dot(w_so3mat2, v)
+    coeffs = empty((len(thetas),5))
+    coeffs[:,0] = 1
+    coeffs[:,1] = s
+    coeffs[:,2] = 1 - cos(thetas)
+    coeffs[:,3] = thetas
+    coeffs[:,4] = thetas - s
+    T[:,:3,:] = dot(coeffs, basis.reshape(5,12)).reshape(-1,3,4)
+    return T
+
+
+def FKinFixedBatch(M, Slist, thetalists):
+    '''
+    FKinFixed for many joint configurations at once.
+    Takes M and Slist as FKinFixed and an (N,n) array of joint vectors, returns the
+    (N,4,4) end-effector transforms.
+    '''
+    M = asarray(M, dtype=float)
+    assert M.shape == (4,4), "M not a 4x4 matrix"
+    Slist = asarray(Slist, dtype=float)
+    thetalists = atleast_2d(asarray(thetalists, dtype=float))
+    assert thetalists.shape[1] == len(Slist), "Joint vectors do not match Slist"
+
+    c = MatrixExp6Batch(Slist[0], thetalists[:,0])
+    for i in range(1, len(Slist)):
+        c = matmul(c, MatrixExp6Batch(Slist[i], thetalists[:,i]), out=c)
+    return matmul(c, M, out=c)
+
+
+def FKinBodyBatch(M, Blist, thetalists):
+    '''
+    FKinBody for many joint configurations at once, see FKinFixedBatch.
+    '''
+    M = asarray(M, dtype=float)
+    assert M.shape == (4,4), "M not a 4x4 matrix"
+    Blist = asarray(Blist, dtype=float)
+    thetalists = atleast_2d(asarray(thetalists, dtype=float))
+    assert thetalists.shape[1] == len(Blist), "Joint vectors do not match Blist"
+
+    c = matmul(M, MatrixExp6Batch(Blist[0], thetalists[:,0]))
+    for i in range(1, len(Blist)):
+        c = matmul(c, MatrixExp6Batch(Blist[i], thetalists[:,i]), out=c)
+    return c
+
+
 ### end of HW2 functions #############################
 
 ### start of HW3 functions ###########################
@@ -798,6 +883,216 @@ def IKinFixed(Slist, M, T_sd, thetalist_init, wthresh, vthresh):
     return jointAngles
 
 
+class IKinSolver(object):
+    '''
+    Reusable iterative inverse kinematics engine for one robot (Newton-Raphson with a
+    damped least-squares step), an alternative to IKinFixed/IKinBody for repeated solves.
+    All matrices of the loop live in buffers allocated once in the constructor; the FK
+    pass fills the space Jacobian at the same time, and the iterate history is only
+    recorded when asked for.
+
+    Slist, M: fixed-frame screw axes and home configuration, as for FKinFixed
+              (IKinSolver.fromBody builds one from body-frame screw axes)
+    damping: damping factor lambda of the step J^T (J J^T + lambda^2 I)^-1 V
+    jointLimits: optional (n,2) array of [lower, upper] joint limits, iterates are clipped to it
+    maxiterates: iteration limit per solve
+
+    solve() warm starts from the last successful solution when no initial guess is given.
+    The buffers are not thread-safe: callers sharing a solver between threads hold its lock.
+    Example:
+
+    solver = IKinSolver(Slist, M, jointLimits=[[-2*pi, 2*pi]]*6)
+    thetalist, success = solver.solve(T_sd, thetalist_init)
+    thetalist, success = solver.solve(T_sd_next)   # starts from the previous solution
+    '''
+    def __init__(self, Slist, M, damping=0.01, jointLimits=None, maxiterates=100):
+        self.Slist = array(Slist, dtype=float)
+        self.M = array(M, dtype=float)
+        assert self.M.shape == (4,4), "M not a 4x4 matrix"
+        assert self.Slist.shape[1] == 6, "Incorrect Screw Axis length"
+        self.n = n = len(self.Slist)
+        self.damping = damping
+        self.maxiterates = maxiterates
+        self.lock = threading.Lock()
+        if jointLimits is None:
+            self.lower = self.upper = None
+        else:
+            limits = array(jointLimits, dtype=float)
+            self.lower, self.upper = limits[:,0].copy(), limits[:,1].copy()
+
+        # Top 3x4 block of exp([S_i]theta) = coeffs . basis_i with coeffs = [1, sin, 1-cos, theta, theta-sin]
+        # of the scaled angle |w|theta (same decomposition as MatrixExp6Batch)
+        self._scale = ones(n)
+        self._basis = zeros((n,5,12))
+        self._wv = zeros((n,3,2))  # Columns w and v of every screw axis
+        for i, S in enumerate(self.Slist):
+            basis = zeros((5,3,4))
+            basis[0,:,:3] = identity(3)
+            w_norm = linalg.norm(S[:3])
+            if w_norm == 0:
+                basis[3,:,3] = S[3:]
+            else:
+                w_so3mat = VecToso3(S[:3]/w_norm)
+                w_so3mat2 = dot(w_so3mat, w_so3mat)
+                v = S[3:]/w_norm
+                basis[1,:,:3] = w_so3mat
+                basis[2,:,:3] = w_so3mat2
+                basis[2,:,3] = dot(w_so3mat, v)
+                basis[3,:,3] = v
+                basis[4,:,3] = dot(w_so3mat2, v)
+                self._scale[i] = w_norm
+            self._basis[i] = basis.reshape(5,12)
+            self._wv[i] = S.reshape(2,3).T
+
+        self._coeffs = empty(5)
+        self._E = identity(4)
+        self._Eblock = self._E.reshape(16)[:12]
+        self._T = identity(4)
+        self._Tnext = identity(4)
+        self._Tsb = identity(4)
+        self._RS = zeros((3,2))
+        self._Vb = zeros((3,2))
+        self._Rbd = zeros((3,3))
+        self._dp = zeros(3)
+        self._pbd = zeros(3)
+        self._J = zeros((6,n))
+        self._A = zeros((6,6))
+        self._V = zeros(6)
+        self._theta = zeros(n)
+        self._dtheta = zeros(n)
+        self._history = zeros((maxiterates+1,n))
+        self.thetalist = zeros(n)
+        self.iterations = 0
+
+    @classmethod
+    def fromBody(cls, Blist, M, **kwargs):
+        '''Solver for screw axes expressed in the end-effector frame (as for IKinBody)'''
+        Slist = dot(Adjoint(M), asarray(Blist, dtype=float).T).T
+        return cls(Slist, M, **kwargs)
+
+    def _forward(self, theta):
+        '''T_sb of theta into self._Tsb and the space Jacobian into self._J'''
+        T, Tnext = self._T, self._Tnext
+        T.fill(0.)
+        T[0,0] = T[1,1] = T[2,2] = T[3,3] = 1.
+        J, RS, coeffs = self._J, self._RS, self._coeffs
+        for i in range(self.n):
+            # J_i = Ad(T) S_i = [R w; p x (R w) + R v] with T the product of the previous exponentials
+            dot(T[:3,:3], self._wv[i], out=RS)
+            wx, wy, wz = RS[0,0], RS[1,0], RS[2,0]
+            px, py, pz = T[0,3], T[1,3], T[2,3]
+            J[0,i], J[1,i], J[2,i] = wx, wy, wz
+            J[3,i] = py*wz - pz*wy + RS[0,1]
+            J[4,i] = pz*wx - px*wz + RS[1,1]
+            J[5,i] = px*wy - py*wx + RS[2,1]
+
+            angle = theta[i]*self._scale[i]
+            s = math.sin(angle)
+            coeffs[1] = s
+            coeffs[2] = 1 - math.cos(angle)
+            coeffs[3] = angle
+            coeffs[4] = angle - s
+            coeffs[0] = 1.
+            dot(coeffs, self._basis[i], out=self._Eblock)
+            dot(T, self._E, out=Tnext)
+            T, Tnext = Tnext, T
+        dot(T, self.M, out=self._Tsb)
+
+    def _error(self, T_sd):
+        '''
+        Body twist Vb = log(T_sb^-1 T_sd); stores it in the space frame in self._V
+        and returns the norms of its angular and linear parts.
+        '''
+        Tsb = self._Tsb
+        R = Tsb[:3,:3]
+        dot(R.T, T_sd[:3,:3], out=self._Rbd)
+        subtract(T_sd[:3,3], Tsb[:3,3], out=self._dp)
+        dot(R.T, self._dp, out=self._pbd)
+        Rbd = self._Rbd
+        px, py, pz = self._pbd
+
+        cos_theta = 0.5*(Rbd[0,0]+Rbd[1,1]+Rbd[2,2]-1)
+        theta = math.acos(1. if cos_theta > 1. else -1. if cos_theta < -1. else cos_theta)
+        if theta < 1e-10:
+            wx = wy = wz = 0.
+            vx, vy, vz = px, py, pz
+        else:
+            sin_theta = math.sin(theta)
+            if sin_theta < 1e-6:
+                ex, ey, ez = MatrixLog3(Rbd).flatten()/theta
+            else:
+                ex = (Rbd[2,1]-Rbd[1,2])/(2*sin_theta)
+                ey = (Rbd[0,2]-Rbd[2,0])/(2*sin_theta)
+                ez = (Rbd[1,0]-Rbd[0,1])/(2*sin_theta)
+            # v = (I - theta/2 [e] + (1 - theta/2 cot(theta/2)) [e]^2) p
+            cx, cy, cz = ey*pz - ez*py, ez*px - ex*pz, ex*py - ey*px
+            ep = ex*px + ey*py + ez*pz
+            k = 1 - 0.5*theta/math.tan(0.5*theta)
+            vx = px - 0.5*theta*cx + k*(ex*ep - px)
+            vy = py - 0.5*theta*cy + k*(ey*ep - py)
+            vz = pz - 0.5*theta*cz + k*(ez*ep - pz)
+            wx, wy, wz = ex*theta, ey*theta, ez*theta
+
+        # Space twist Vs = Ad(T_sb) Vb, the frame of the space Jacobian
+        Vb, RS = self._Vb, self._RS
+        Vb[:,0] = wx, wy, wz
+        Vb[:,1] = vx, vy, vz
+        dot(R, Vb, out=RS)
+        px, py, pz = Tsb[0,3], Tsb[1,3], Tsb[2,3]
+        V = self._V
+        V[0], V[1], V[2] = RS[0,0], RS[1,0], RS[2,0]
+        V[3] = py*RS[2,0] - pz*RS[1,0] + RS[0,1]
+        V[4] = pz*RS[0,0] - px*RS[2,0] + RS[1,1]
+        V[5] = px*RS[1,0] - py*RS[0,0] + RS[2,1]
+        return math.sqrt(wx*wx + wy*wy + wz*wz), math.sqrt(vx*vx + vy*vy + vz*vz)
+
+    def jacobian(self, thetalist):
+        '''Space Jacobian at thetalist (as FixedJacobian), from the same single pass as the solver'''
+        self._forward(asarray(thetalist, dtype=float))
+        return self._J.copy()
+
+    def solve(self, T_sd, thetalist_init=None, wthresh=0.001, vthresh=0.0001, history=False):
+        '''
+        Joint angles that reach T_sd within wthresh/vthresh (the IKinFixed thresholds).
+        Starts from thetalist_init, or the last successful solution when it is None.
+        Returns (thetalist, success), or (thetalist, success, iterates) with history=True.
+        '''
+        T_sd = asarray(T_sd, dtype=float)
+        assert T_sd.shape == (4,4), "T_sd not a 4x4 matrix"
+        theta = self._theta
+        theta[:] = self.thetalist if thetalist_init is None else thetalist_init
+        if self.lower is not None:
+            clip(theta, self.lower, self.upper, out=theta)
+
+        J, A, V = self._J, self._A, self._V
+        lambda2 = self.damping**2
+        success = False
+        for i in range(self.maxiterates+1):
+            if history:
+                self._history[i] = theta
+            self._forward(theta)
+            wnorm, vnorm = self._error(T_sd)
+            if wnorm <= wthresh and vnorm <= vthresh:
+                success = True
+                break
+            if i == self.maxiterates:
+                break
+            # Damped least squares: dtheta = J^T (J J^T + lambda^2 I)^-1 V
+            dot(J, J.T, out=A)
+            A.flat[::7] += lambda2
+            dot(J.T, linalg.solve(A, V), out=self._dtheta)
+            theta += self._dtheta
+            if self.lower is not None:
+                clip(theta, self.lower, self.upper, out=theta)
+
+        self.iterations = i
+        if success:
+            self.thetalist[:] = theta
+        if history:
+            return theta.copy(), success, self._history[:i+1].copy()
+        return theta.copy(), success
+
+
 ### end of HW3 functions #############################
 
 ### start of HW4 functions ###########################
@@ -26,6 +26,28 @@ __copyright__ = "Copyright 2017, Rope Robotics ApS, Denmark"
 __license__ = "MIT License"
 
 import URBasic
+import threading
+import time
+
+class RobotModelSnapshot(object):
+    '''
+    One complete, immutable sample of the robot data.
+    seq counts the RTDE packages published to the model (0 = no data yet) and
+    receivedTime is the time.monotonic() value when the package was published.
+    The data dict must not be modified once the snapshot is published.
+    '''
+    __slots__ = ['seq', 'receivedTime', 'data']
+
+    def __init__(self, seq, receivedTime, data):
+        self.seq = seq
+        self.receivedTime = receivedTime
+        self.data = data
+
+    def age(self):
+        '''Seconds since the sample was received (None if no sample yet)'''
+        if self.receivedTime is None:
+            return None
+        return time.monotonic() - self.receivedTime
 
 class RobotModel(object):
     '''
@@ -49,7 +71,7 @@ class RobotModel(object):
         self.password = None
         self.ipAddress = None
         
-        self.dataDir = {'timestamp':None,
+        dataDir = {'timestamp':None,
                          'target_q':None,
                          'target_q':None,
                          'target_qd':None,
@@ -153,6 +175,10 @@ class RobotModel(object):
                          'urPlus_force_torque_sensor':None,
                          'urPlus_totalMovedVerticalDistance':None
                          }
+        # Readers take the current snapshot reference without locking; the RTDE thread
+        # builds the next sample in a new dict and swaps the reference in one assignment.
+        self.__snapshot = RobotModelSnapshot(0, None, dataDir)
+        self.__sampleCondition = threading.Condition()
                             
         
         self.rtcConnectionState = None
@@ -165,6 +191,51 @@ class RobotModel(object):
         self.hasForceTorqueSensor = False
         self.forceTourqe = None
         
+    @property
+    def dataDir(self):
+        '''Latest sample as a dict (read only - use publishSample to update)'''
+        return self.__snapshot.data
+
+    def snapshot(self):
+        '''
+        Return the latest RobotModelSnapshot. All values in it belong to the same
+        RTDE package, no copy is made.
+        '''
+        return self.__snapshot
+
+    def publishSample(self, package):
+        '''
+        Publish a decoded RTDE data package as the next snapshot and wake up
+        readers waiting in waitForSnapshot. Called from the RTDE receive thread only.
+        '''
+        previous = self.__snapshot
+        data = dict(previous.data)
+        data.update(package)
+        snapshot = RobotModelSnapshot(previous.seq + 1, time.monotonic(), data)
+        self.__snapshot = snapshot
+        with self.__sampleCondition:
+            self.__sampleCondition.notify_all()
+        return snapshot
+
+    def waitForSnapshot(self, afterSeq, timeout=None):
+        '''
+        Wait for a snapshot newer than afterSeq.
+
+        Input parameters:
+        afterSeq (int): sequence number the caller has already seen
+        timeout (float): max seconds to wait, None waits forever
+
+        Return value:
+        RobotModelSnapshot with seq > afterSeq, or None on timeout
+        '''
+        snapshot = self.__snapshot
+        if snapshot.seq > afterSeq:
+            return snapshot
+        with self.__sampleCondition:
+            if not self.__sampleCondition.wait_for(lambda: self.__snapshot.seq > afterSeq, timeout):
+                return None
+            return self.__snapshot
+
     def RobotTimestamp(self):return self.dataDir['timestamp']
     def LastUpdateTimestamp(self):raise NotImplementedError('Function Not yet implemented')
     def RTDEConnectionState(self):raise NotImplementedError('Function Not yet implemented')
@@ -36,6 +36,19 @@ import time
 import os.path
 
 DEFAULT_TIMEOUT = 1.0
+SAMPLE_TIMEOUT = 0.05  # Seconds waitForSample waits by default (several control cycles at 125 Hz)
+RECEIVE_BUFFER_SIZE = 2 * 65536  # Packet size is a UINT16, so a partial packet plus one recv always fits
+
+# RTDE type -> (numpy type code, shape) used to compile output recipes into a structured dtype
+RTDE_NUMPY_TYPES = {'DOUBLE': ('f8', ()),
+                    'UINT64': ('u8', ()),
+                    'UINT32': ('u4', ()),
+                    'INT32': ('i4', ()),
+                    'UINT8': ('u1', ()),
+                    'VECTOR3D': ('f8', (3,)),
+                    'VECTOR6D': ('f8', (6,)),
+                    'VECTOR6INT32': ('i4', (6,)),
+                    'VECTOR6UINT32': ('u4', (6,))}
 
 class Command:
     RTDE_REQUEST_PROTOCOL_VERSION = 86        # ascii V
@@ -106,6 +119,11 @@ class RTDE(threading.Thread): #, metaclass=Singleton
         self.__controllerVersion = None
         self.__protocol_version = None
         self.__packageCounter = 0
+        self.__dataListeners = []
+        self.__recvBuffer = bytearray(RECEIVE_BUFFER_SIZE)
+        self.__recvView = memoryview(self.__recvBuffer)
+        self.__recvStart = 0  # First unparsed byte in the receive buffer
+        self.__recvEnd = 0    # One past the last received byte
         self.start()
         self._logger.info('RTDE constructor done')
 
@@ -143,6 +161,8 @@ class RTDE(threading.Thread): #, metaclass=Singleton
         if self.__sock:
             self.__sock.close()
             self.__sock = None
+        self.__recvStart = 0
+        self.__recvEnd = 0
         self.__conn_state = ConnectionState.DISCONNECTED
         return True
 
@@ -162,6 +182,23 @@ class RTDE(threading.Thread): #, metaclass=Singleton
 
         return self.__conn_state >= ConnectionState.STARTED
 
+    def addDataListener(self, callback):
+        '''
+        Register a function that is called from the receive thread with every decoded
+        data package (dict of tag name -> value), after the robot model is updated.
+        Callbacks run at the RTDE frequency and must return quickly.
+
+        Input parameters:
+        callback (function): callback(rtde_data_package)
+        '''
+        self.__dataListeners = self.__dataListeners + [callback]
+
+    def removeDataListener(self, callback):
+        '''
+        Unregister a function added with addDataListener.
+        '''
+        self.__dataListeners = [l for l in self.__dataListeners if l != callback]
+
     def __getControllerVersion(self):
         '''
         Returns the software version of the robot controller running the RTDE server.
@@ -398,79 +435,100 @@ class RTDE(threading.Thread): #, metaclass=Singleton
             return False
 
     def __receive(self):
-        byte_buffer = bytes()
-
+        '''
+        Read whatever is available into the receive buffer (recv_into, no per-read allocation)
+        and handle every complete packet in it. An incomplete packet at the end of the
+        buffer is kept and completed by the next read instead of being discarded.
+        '''
         (readable, _, _) = select.select([self.__sock], [], [], DEFAULT_TIMEOUT)
         if (len(readable)):
-            more = self.__sock.recv(16384)
-            if len(more) == 0:
+            if self.__recvStart > 0 and len(self.__recvBuffer) - self.__recvEnd < 65536:
+                # Move the partial packet to the front to make room for the next read
+                pending = self.__recvEnd - self.__recvStart
+                self.__recvBuffer[:pending] = self.__recvView[self.__recvStart:self.__recvEnd]
+                self.__recvStart = 0
+                self.__recvEnd = pending
+            nbytes = self.__sock.recv_into(self.__recvView[self.__recvEnd:])
+            if nbytes == 0:
                 self._logger.info("RTDE disconnected")
                 self.__disconnect()
                 return None
-            byte_buffer +=  more
-
-        while len(byte_buffer) >= 3:
-            (packet_size, packet_command) = struct.unpack_from('>HB', byte_buffer)
-            buffer_length = len(byte_buffer)
-
-            if ((buffer_length) >= packet_size):
-                packet, byte_buffer = byte_buffer[3:packet_size], byte_buffer[packet_size:]
-                data = self.__decodePayload(packet_command, packet)
-
-                if(packet_command == Command.RTDE_GET_URCONTROL_VERSION):
-                    self.__verifyControllerVersion(data)
-                elif(packet_command == Command.RTDE_REQUEST_PROTOCOL_VERSION):
-                    self.__verifyProtocolVersion(data)
-                elif(packet_command == Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS):
-                    self.__rtde_input_config = data
-                    self.__rtde_input_config.names = self.__rtde_input_names
-                    #self.__rtde_input_config[self.__rtde_input_config.id] = self.__rtde_input_config
-                    self.__dataSend = RTDEDataObject.create_empty(self.__rtde_input_names, self.__rtde_input_config.id)
-                    if self.__rtde_input_initValues is not None:
-                        for ii in range(len(self.__rtde_input_config.names)):
-                            if 'UINT8' == self.__rtde_input_config.types[ii]:
-                                self.setData(self.__rtde_input_config.names[ii], int(self.__rtde_input_initValues[ii]))
-                            elif 'UINT32' == self.__rtde_input_config.types[ii]:
-                                self.setData(self.__rtde_input_config.names[ii], int(self.__rtde_input_initValues[ii]))
-                            elif 'INT32' == self.__rtde_input_config.types[ii]:
-                                self.setData(self.__rtde_input_config.names[ii], int(self.__rtde_input_initValues[ii]))
-                            elif 'DOUBLE' == self.__rtde_input_config.types[ii]:
-                                self.setData(self.__rtde_input_config.names[ii], (self.__rtde_input_initValues[ii]))
-                            else:
-                                self._logger.error('Unknown data type')
-
-                elif(packet_command == Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS):
-                    self.__rtde_output_config = data
-                    self.__rtde_output_config.names = self.__rtde_output_names
-                elif(packet_command == Command.RTDE_CONTROL_PACKAGE_START):
-                    self._logger.info('RTDE started')
-                    self.__conn_state = ConnectionState.STARTED
-                elif(packet_command == Command.RTDE_CONTROL_PACKAGE_PAUSE):
-                    self._logger.info('RTDE paused')
-                    self.__conn_state = ConnectionState.PAUSED
-                elif(packet_command == Command.RTDE_DATA_PACKAGE):
-                    self.__updateModel(data)
-                elif(packet_command == 0):
-                    byte_buffer = bytes()
-            else:
-                print("skipping package - unexpected packet_size - length: " + str(len(byte_buffer)))
-                byte_buffer = bytes()
-
-        if len(byte_buffer) != 0:
-            self._logger.warning('skipping package - not a package but buffer was not empty')
-            byte_buffer = bytes()
+            self.__recvEnd += nbytes
+
+        while self.__recvEnd - self.__recvStart >= 3:
+            (packet_size, packet_command) = struct.unpack_from('>HB', self.__recvBuffer, self.__recvStart)
+
+            if packet_size < 3:
+                self._logger.warning("skipping buffer - invalid packet_size: " + str(packet_size))
+                self.__recvStart = self.__recvEnd
+                break
+            if self.__recvEnd - self.__recvStart < packet_size:
+                break  # Partial packet - wait for the rest
+
+            packet = self.__recvView[self.__recvStart + 3:self.__recvStart + packet_size]
+            self.__recvStart += packet_size
+            if packet_command != Command.RTDE_DATA_PACKAGE:
+                packet = bytes(packet)  # Setup replies are rare and may be kept, so detach them from the buffer
+            data = self.__decodePayload(packet_command, packet)
+
+            if(packet_command == Command.RTDE_GET_URCONTROL_VERSION):
+                self.__verifyControllerVersion(data)
+            elif(packet_command == Command.RTDE_REQUEST_PROTOCOL_VERSION):
+                self.__verifyProtocolVersion(data)
+            elif(packet_command == Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS):
+                self.__rtde_input_config = data
+                self.__rtde_input_config.names = self.__rtde_input_names
+                #self.__rtde_input_config[self.__rtde_input_config.id] = self.__rtde_input_config
+                self.__dataSend = RTDEDataObject.create_empty(self.__rtde_input_names, self.__rtde_input_config.id)
+                if self.__rtde_input_initValues is not None:
+                    for ii in range(len(self.__rtde_input_config.names)):
+                        if 'UINT8' == self.__rtde_input_config.types[ii]:
+                            self.setData(self.__rtde_input_config.names[ii], int(self.__rtde_input_initValues[ii]))
+                        elif 'UINT32' == self.__rtde_input_config.types[ii]:
+                            self.setData(self.__rtde_input_config.names[ii], int(self.__rtde_input_initValues[ii]))
+                        elif 'INT32' == self.__rtde_input_config.types[ii]:
+                            self.setData(self.__rtde_input_config.names[ii], int(self.__rtde_input_initValues[ii]))
+                        elif 'DOUBLE' == self.__rtde_input_config.types[ii]:
+                            self.setData(self.__rtde_input_config.names[ii], (self.__rtde_input_initValues[ii]))
+                        else:
+                            self._logger.error('Unknown data type')
+
+            elif(packet_command == Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS):
+                self.__rtde_output_config = data
+                self.__rtde_output_config.names = self.__rtde_output_names
+                self.__rtde_output_config.compile()
+            elif(packet_command == Command.RTDE_CONTROL_PACKAGE_START):
+                self._logger.info('RTDE started')
+                self.__conn_state = ConnectionState.STARTED
+            elif(packet_command == Command.RTDE_CONTROL_PACKAGE_PAUSE):
+                self._logger.info('RTDE paused')
+                self.__conn_state = ConnectionState.PAUSED
+            elif(packet_command == Command.RTDE_DATA_PACKAGE):
+                self.__updateModel(data)
+            elif(packet_command == 0):
+                self.__recvStart = self.__recvEnd
+                break
+
+        if self.__recvStart == self.__recvEnd:
+            self.__recvStart = 0
+            self.__recvEnd = 0
 
     def __updateModel(self, rtde_data_package):
         self.__packageCounter = self.__packageCounter + 1
         #print("got a rtde package nr " + str(self.__packageCounter))
         if(self.__packageCounter % 1000 == 0):
             self._logger.info("Total packages: " + str(self.__packageCounter))
-        if(self.__robotModel.dataDir['timestamp'] != None):
-            delta = rtde_data_package['timestamp'] - self.__robotModel.dataDir['timestamp']
+        lastTimestamp = self.__robotModel.snapshot().data['timestamp']
+        if(lastTimestamp != None):
+            delta = rtde_data_package['timestamp'] - lastTimestamp
             if(delta > 0.00800001):
                 self._logger.error("Lost some RTDE at " + str(rtde_data_package['timestamp']) + " - " + str(delta*1000) + " milliseconds since last package")
-        for tagname in rtde_data_package.keys():
-            self.__robotModel.dataDir[tagname] = rtde_data_package[tagname]
+        self.__robotModel.publishSample(rtde_data_package)
+        for listener in self.__dataListeners:
+            try:
+                listener(rtde_data_package)
+            except Exception:
+                self._logger.exception('RTDE data listener failed')
 
     def __verifyControllerVersion(self, data):
         self.__controllerVersion = data
@@ -577,19 +635,26 @@ class RTDE(threading.Thread): #, metaclass=Singleton
                 return False
         return True
 
-    def __wait(self):
-        '''Wait while the data receiving thread is receiving a new data set.'''
-        cnt = 0
-        while self.__conn_state < ConnectionState.STARTED:
-            time.sleep(1)
-            cnt +=1
-            if cnt>5:
-                self._logger.warning('wait_rtde timed out while RTDE interface not running')
-                return False
+    def waitForSample(self, timeout=SAMPLE_TIMEOUT, minSeq=None):
+        '''
+        Wait for a fresh data package from the receive thread.
 
-        with self.__dataEvent:
-            self.__dataEvent.wait()
-        return True
+        Input parameters:
+        timeout (float): max seconds to wait
+        minSeq (int): lowest acceptable snapshot sequence number,
+                      None means the next package after the current one
+
+        Return value:
+        RobotModelSnapshot with seq >= minSeq
+
+        Raises TimeoutError if no such package arrived within timeout.
+        '''
+        if minSeq is None:
+            minSeq = self.__robotModel.snapshot().seq + 1
+        snapshot = self.__robotModel.waitForSnapshot(minSeq - 1, timeout)
+        if snapshot is None:
+            raise TimeoutError('No RTDE data package within ' + str(timeout) + ' s (connection state ' + str(self.__conn_state) + ')')
+        return snapshot
 
 
 
@@ -597,14 +662,14 @@ class RTDE(threading.Thread): #, metaclass=Singleton
     def close(self):
         if self.__stop_event is False:
             self.__stop_event = True
-            self.__wait()
-            self.join()
+            # The receive loop checks the stop flag at least once per select timeout
+            self.join(2 * DEFAULT_TIMEOUT)
             self.__disconnect()
 
     def run(self):
         self.__stop_event = False
         t0 = time.time()
-        while (time.time()-t0<self.__reconnectTimeout) and self.__conn_state != ConnectionState.STARTED:
+        while (not self.__stop_event) and (time.time()-t0<self.__reconnectTimeout) and self.__conn_state != ConnectionState.STARTED:
             self.__connect()
             self.__disconnect()
             self.__connect()
@@ -657,7 +722,12 @@ class RTDE(threading.Thread): #, metaclass=Singleton
 
 
 class RTDE_IO_Config(object):
-    __slots__ = ['id', 'names', 'types', 'fmt']
+    __slots__ = ['id', 'names', 'types', 'fmt', 'dtype', 'record', 'recordBytes', 'scalarNames', 'scalarDtype', 'vectorPlan']
+
+    def __init__(self):
+        self.names = None
+        self.dtype = None
+
     @staticmethod
     def unpack_recipe(buf, has_recipe_id):
         rmd = RTDE_IO_Config();
@@ -703,9 +773,47 @@ class RTDE_IO_Config(object):
         l = state.pack(self.names, self.types)
         return struct.pack(self.fmt, *l)
 
+    def compile(self):
+        '''
+        Precompile the decode plan for an output recipe (names must be set):
+        a big-endian numpy structured dtype matching the package layout, a reusable
+        record that each package is copied into, a view of that record holding only
+        the scalar fields (converted to Python values in one call) and the native
+        dtype each vector field is converted to.
+        '''
+        if self.names is None or len(self.names) != len(self.types):
+            raise ValueError('List sizes are not identical.')
+        fields = []
+        for name, data_type in zip(self.names, self.types):
+            if data_type not in RTDE_NUMPY_TYPES:
+                raise ValueError('Unknown data type: ' + data_type)
+            code, shape = RTDE_NUMPY_TYPES[data_type]
+            if shape:
+                fields.append((name, '>' + code, shape))
+            else:
+                fields.append((name, '>' + code))
+        self.dtype = np.dtype(fields)
+        self.record = np.zeros(1, dtype=self.dtype)
+        self.recordBytes = self.record.view(np.uint8)
+
+        self.scalarNames = [name for name in self.names if self.dtype.fields[name][0].shape == ()]
+        self.scalarDtype = np.dtype({'names': self.scalarNames,
+                                     'formats': [self.dtype.fields[n][0] for n in self.scalarNames],
+                                     'offsets': [self.dtype.fields[n][1] for n in self.scalarNames],
+                                     'itemsize': self.dtype.itemsize})
+        self.vectorPlan = [(name, self.dtype.fields[name][0].base.newbyteorder('='))
+                           for name in self.names if self.dtype.fields[name][0].shape != ()]
+
     def unpack(self, data):
-        li =  struct.unpack_from(self.fmt, data)
-        return RTDEDataObject.unpack(li, self.names, self.types)
+        if self.dtype is None:
+            li =  struct.unpack_from(self.fmt, data)
+            return RTDEDataObject.unpack(li, self.names, self.types)
+        record = self.record
+        self.recordBytes[:] = np.frombuffer(data, dtype=np.uint8, count=self.dtype.itemsize)
+        obj = dict(zip(self.scalarNames, record.view(self.scalarDtype).tolist()[0]))
+        for name, native in self.vectorPlan:
+            obj[name] = record[name][0].astype(native)
+        return obj
 
 class RTDEDataObject(object):
     '''
@@ -47,6 +47,8 @@ class UrScript(object):
     host (string):  hostname or IP of UR Robot (RT CLient server)
     rtde_conf_filename (string):  Path to xml file describing what channels to activate
     logger (URBasis_DataLogging obj): A instance if a logger object if common logging is needed.
+    initTimeout (float): max seconds to wait for the first RTDE data, None waits forever;
+                         on timeout the connections are closed and TimeoutError is raised
 
     
     Example:
@@ -55,7 +57,7 @@ class UrScript(object):
     '''
 
 
-    def __init__(self, host, robotModel, hasForceTorque=False):
+    def __init__(self, host, robotModel, hasForceTorque=False, initTimeout=None):
         '''
         Constructor see class description for more info.
         '''
@@ -63,10 +65,17 @@ class UrScript(object):
         name = logger.AddEventLogging(__name__)        
         self.__logger = logger.__dict__[name]
         self.robotConnector = URBasic.robotConnector.RobotConnector(robotModel, host, hasForceTorque)
-        #time.sleep(200)
-        while(self.robotConnector.RobotModel.ActualTCPPose() is None):      ## check paa om vi er startet
+        # Block until the first RTDE package with a TCP pose arrives (woken by the RTDE thread, no polling)
+        snapshot = self.robotConnector.RobotModel.snapshot()
+        if snapshot.data['actual_TCP_pose'] is None:
             print("waiting for everything to be ready")
-            time.sleep(1)
+        deadline = None if initTimeout is None else time.monotonic() + initTimeout
+        while snapshot.data['actual_TCP_pose'] is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self.robotConnector.close()
+                raise TimeoutError('No RTDE data from {} within {}s'.format(host, initTimeout))
+            snapshot = self.robotConnector.RobotModel.waitForSnapshot(snapshot.seq, remaining) or snapshot
         self.__logger.info('Init done')
 #############   Module motion   ###############
 
@@ -773,7 +782,7 @@ end
         raise NotImplementedError('Function Not yet implemented')
 
         
-    def get_actual_joint_positions(self, wait=True):
+    def get_actual_joint_positions(self, wait=True, with_age=False):
         '''
         Returns the actual angular positions of all joints
         
@@ -782,13 +791,16 @@ end
         get target joint positions(), especially durring acceleration and heavy
         loads.
         
+        Parameters:
+        wait (bool): If True, waits for next data packet before returning. (Default True)
+        with_age (bool): If True, also return the age of the sample in seconds. (Default False)
+        
         Return Value:
         The current actual joint angular position vector in rad : [Base,
         Shoulder, Elbow, Wrist1, Wrist2, Wrist3]
+        or (vector, age) when with_age is True
         '''
-        if(wait):
-            self.sync()
-        return self.robotConnector.RobotModel.ActualQ() 
+        return self.__get_sample_value('actual_q', wait, with_age)
         c_pose = self.robotConnector.RobotModel.ActualQ
         
         pose = []
@@ -820,7 +832,7 @@ end
         return self.robotConnector.RobotModel.ActualQD
 
         
-    def get_actual_tcp_pose(self, wait=True):
+    def get_actual_tcp_pose(self, wait=True, with_age=False):
         '''
         Returns the current measured tool pose
         
@@ -828,12 +840,15 @@ end
         specified in the base frame. The calculation of this pose is based on
         the actual robot encoder readings.
         
+        Parameters:
+        wait (bool): If True, waits for next data packet before returning. (Default True)
+        with_age (bool): If True, also return the age of the sample in seconds. (Default False)
+        
         Return Value
         The current actual TCP vector : ([X, Y, Z, Rx, Ry, Rz])
+        or (vector, age) when with_age is True
         '''
-        if(wait):
-            self.sync()
-        return self.robotConnector.RobotModel.ActualTCPPose()
+        return self.__get_sample_value('actual_TCP_pose', wait, with_age)
         c_pose = self.robotConnector.RobotModel.ActualTCPPose
         
         pose = []
@@ -1222,14 +1237,43 @@ end
         '''
         time.sleep(t)
     
-    def sync(self):
+    def sync(self, timeout=URBasic.rtde.SAMPLE_TIMEOUT):
         '''
         Uses up the remaining "physical" time a thread has in the current
         frame/sample.
+        
+        Parameters:
+        timeout: max time to wait for the next sample [s]
+        
+        Return Value:
+        The new sample (RobotModelSnapshot), raises TimeoutError if none arrived
+        '''
+        return self.wait_for_sample(timeout)
+
+    def wait_for_sample(self, timeout=URBasic.rtde.SAMPLE_TIMEOUT, min_seq=None):
+        '''
+        Wait for a fresh RTDE sample. Wakes up as soon as the RTDE receive thread
+        has published it, so it normally returns within one control cycle.
+        
+        Parameters:
+        timeout: max time to wait [s]
+        min_seq: lowest acceptable sample sequence number (Default: the next sample)
+        
+        Return Value:
+        The sample (RobotModelSnapshot with seq, receivedTime and data),
+        raises TimeoutError if none arrived within timeout
         '''
-        initialRobotTime = self.robotConnector.RobotModel.RobotTimestamp()
-        while(self.robotConnector.RobotModel.RobotTimestamp() == initialRobotTime):
-            time.sleep(0.001)
+        return self.robotConnector.RTDE.waitForSample(timeout, min_seq)
+
+    def __get_sample_value(self, tagname, wait, with_age):
+        if(wait):
+            snapshot = self.sync()
+        else:
+            snapshot = self.robotConnector.RobotModel.snapshot()
+        value = snapshot.data[tagname]
+        if with_age:
+            return value, snapshot.age()
+        return value
 
     
     def textmsg(self, s1, s2=''):
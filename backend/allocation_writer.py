@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+from participant_store import participant_store, SAVE_PATH
+
+JOURNAL_PATH = "participant_data.journal.jsonl"
+META_HEADER = ["Participant ID", "Allocation Time", "Start Time", "Finish Time"]
+COMPACT_DELAY = 2.0  # Seconds to collect more rows before rewriting the workbook
+
+
+class AllocationWriter:
+    """
+    Writes /save allocation records to participant_data.xlsx without rewriting the
+    workbook inside the request:
+      - the header -> column map and the row count are kept in memory
+      - append() writes the row to a write-ahead journal (fsynced) and returns at once
+      - a background thread compacts journaled rows into the workbook in batches and
+        then drops them from the journal
+    Journal entries carry their data row number, so after a crash only rows the
+    workbook does not have yet are replayed.
+    """
+
+    def __init__(self, path=SAVE_PATH, journal_path=JOURNAL_PATH):
+        self.path = path
+        self.journal_path = journal_path
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.header = None   # Column names in workbook order, loaded on first use
+        self.columns = {}    # Column name -> index
+        self.row_count = 0   # Data rows in the workbook plus the journal
+        self.pending = []    # Journal entries not yet in the workbook
+        self.journal = None
+        self.thread = None
+
+    def _ensure_loaded(self):
+        """Read header and row count once, replay the journal and start the compactor (lock held)"""
+        if self.header is not None:
+            return
+
+        header, workbook_rows = list(META_HEADER), 0
+        if os.path.exists(self.path):
+            from openpyxl import load_workbook
+
+            wb = load_workbook(self.path, read_only=True)
+            try:
+                rows = wb.active.iter_rows(values_only=True)
+                first_row = list(next(rows, ()))
+                while first_row and first_row[-1] is None:
+                    first_row.pop()
+                header = first_row or header
+                workbook_rows = sum(1 for row in rows if row and any(cell not in (None, "") for cell in row))
+            finally:
+                wb.close()
+
+        self.header = header
+        self.columns = {name: i for i, name in enumerate(header)}
+        self.row_count = workbook_rows
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line - its request never got a response
+                    if entry["row_number"] > workbook_rows:
+                        self._add_columns(entry["values"])
+                        self.pending.append(entry)
+                        self.row_count = entry["row_number"]
+                        participant_store.record_allocation(self.header, self._row(entry["values"]))
+            if self.pending:
+                print(f"♻️ Replaying {len(self.pending)} journaled allocation rows into {self.path}")
+
+        self._rewrite_journal(self.pending)
+        self.thread = threading.Thread(target=self._compact_loop, name="AllocationCompactor", daemon=True)
+        self.thread.start()
+        if self.pending:
+            self.condition.notify_all()
+
+    def _add_columns(self, values):
+        for name in values:
+            if name not in self.columns:
+                self.columns[name] = len(self.header)
+                self.header.append(name)
+
+    def _row(self, values):
+        row = [""] * len(self.header)
+        for name, value in values.items():
+            row[self.columns[name]] = value
+        return row
+
+    def append(self, participant_id, meta_values, task_values):
+        """
+        Journal one allocation row and return its participant ID.
+
+        meta_values: [allocation time, start time, finish time] as written to the sheet
+        task_values: task name -> allocation value
+        """
+        with self.lock:
+            self._ensure_loaded()
+            row_number = self.row_count + 1
+            # Generate next available Participant ID if not provided
+            participant_id = participant_id or f"P{row_number}"
+
+            values = dict(zip(META_HEADER, [participant_id] + list(meta_values)))
+            values.update(task_values)
+            self._add_columns(values)
+            entry = {"row_number": row_number, "values": values}
+
+            self.journal.write(json.dumps(entry, default=str) + "\n")
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.pending.append(entry)
+            self.row_count = row_number
+
+            participant_store.record_allocation(self.header, self._row(values))
+            self.condition.notify_all()
+        return participant_id
+
+    def _compact_loop(self):
+        while True:
+            with self.lock:
+                self.condition.wait_for(lambda: self.pending)
+            time.sleep(COMPACT_DELAY)  # Let a burst of saves land in the same rewrite
+            with self.lock:
+                batch = list(self.pending)
+                header = list(self.header)
+            try:
+                self._write_workbook(header, batch)
+            except Exception as e:
+                print(f"❌ Error compacting {len(batch)} allocation rows into {self.path}: {e}")
+                time.sleep(COMPACT_DELAY)
+                continue
+            with self.lock:
+                del self.pending[:len(batch)]
+                self._rewrite_journal(self.pending)
+                self.condition.notify_all()
+            print(f"💾 Compacted {len(batch)} allocation rows into {self.path}")
+
+    def _write_workbook(self, header, batch):
+        from openpyxl import Workbook, load_workbook
+
+        signature_before = participant_store.file_signature()
+        if os.path.exists(self.path):
+            wb = load_workbook(self.path)
+            ws = wb.active
+        else:
+            wb = Workbook()
+            ws = wb.active
+        for i, name in enumerate(header, start=1):
+            if ws.cell(row=1, column=i).value != name:
+                ws.cell(row=1, column=i, value=name)
+        for entry in batch:
+            values = entry["values"]
+            ws.append([values.get(name, "") if name is not None else "" for name in header])
+
+        tmp_path = self.path + ".tmp"
+        wb.save(tmp_path)
+        wb.close()
+        os.replace(tmp_path, self.path)
+        participant_store.allocation_file_written(signature_before, len(batch))
+
+    def _rewrite_journal(self, entries):
+        """Atomically replace the journal with the given entries (lock held)"""
+        if self.journal is not None:
+            self.journal.close()
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def flush(self, timeout=30.0):
+        """Wait until every journaled row is in the workbook"""
+        with self.lock:
+            if self.header is None:
+                return True
+            return self.condition.wait_for(lambda: not self.pending, timeout)
+
+    def close(self):
+        self.flush()
+
+
+allocation_writer = AllocationWriter()
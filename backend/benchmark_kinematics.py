@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the URBasic kinematics.
+Compares per-pose forward kinematics with the batched version on random joint
+vectors and on the waypoints of Bridge_flat_roof_extracted.urscript, the
+Newton-Raphson inverse kinematics with the closed-form solver (and checks that it
+inverts the forward kinematics of ur5 and ur10, singular wrists included), IKinFixed/IKinBody
+with the preallocated damped least-squares IKinSolver, and the Jacobian providers.
+No robot needed.
+"""
+
+import contextlib
+import io
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from URBasic import kinematic, manipulation
+
+ROBOT = "ur10"
+BATCH_SIZE = 10000
+LOOP_SIZE = 500
+NEWTON_SIZE = 100
+WTHRESH, VTHRESH = 0.001, 0.0001  # Invkine_manip thresholds
+URSCRIPT_FILE = Path(__file__).resolve().parent.parent / "Bridge_flat_roof_extracted.urscript"
+
+
+def bench(label, fn, count, repeat=5):
+    fn()  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_pose = (time.perf_counter() - start) / repeat / count * 1e6
+    print(f"   {label:<28} {per_pose:8.2f} µs/pose")
+    return per_pose
+
+
+def urscript_joints(path):
+    """Joint vectors of all movej commands in a URScript file"""
+    pattern = re.compile(r"movej\(\[([^\]]+)\]")
+    return np.array([[float(x) for x in match.split(",")] for match in pattern.findall(path.read_text())])
+
+
+def bench_forward():
+    joints = np.random.default_rng(0).uniform(-np.pi, np.pi, (BATCH_SIZE, 6))
+    print(f"🧪 Forward kinematics ({ROBOT}), {BATCH_SIZE} random joint vectors")
+
+    # Both must agree before timing them
+    expected = np.array([kinematic.Forwardkin_manip(q, ROBOT) for q in joints[:LOOP_SIZE]])
+    actual = kinematic.Forwardkin_batch(joints[:LOOP_SIZE], ROBOT)
+    assert np.allclose(expected, actual, atol=1e-4)
+
+    before = bench("Forwardkin_manip loop", lambda: [kinematic.Forwardkin_manip(q, ROBOT) for q in joints[:LOOP_SIZE]], LOOP_SIZE)
+    after = bench("Forwardkin_batch", lambda: kinematic.Forwardkin_batch(joints, ROBOT), BATCH_SIZE)
+    print(f"✅ Speed-up: {before / after:.0f}x ({1e3 / after:.0f} poses/ms)")
+
+    if URSCRIPT_FILE.exists():
+        waypoints = urscript_joints(URSCRIPT_FILE)
+        start = time.perf_counter()
+        poses = kinematic.Forwardkin_batch(waypoints, ROBOT)
+        elapsed = (time.perf_counter() - start) * 1e3
+        print(f"📐 {URSCRIPT_FILE.name}: {len(waypoints)} waypoints in {elapsed:.3f} ms, "
+              f"TCP z range {poses[:, 2].min():.3f}..{poses[:, 2].max():.3f} m")
+
+
+def bench_inverse():
+    rng = np.random.default_rng(1)
+    joints = rng.uniform(-np.pi, np.pi, (BATCH_SIZE, 6))
+    poses = kinematic.Forwardkin_batch(joints, ROBOT)
+    seeds = joints + rng.normal(0, 0.1, joints.shape)
+    print(f"🧪 Inverse kinematics ({ROBOT}), seeds 0.1 rad off the target joints")
+
+    solved = kinematic.Invkine_analytic_batch(poses, seeds, ROBOT)
+    reached = ~np.isnan(solved[:, 0])
+    error = np.abs(kinematic.Forwardkin_batch(solved[reached], ROBOT) - poses[reached]).max()
+    assert reached.all() and error < 1e-5, (reached.sum(), error)
+    print(f"   {reached.sum()}/{BATCH_SIZE} poses solved, max pose error {error:.1e}")
+    # The scalar single-pose path must pick the same solutions as the batch
+    single = np.array([kinematic.Invkine_analytic(p, q, ROBOT) for p, q in zip(poses[:LOOP_SIZE], seeds)])
+    assert np.allclose(single, solved[:LOOP_SIZE], atol=1e-6)
+
+    def newton():
+        with contextlib.redirect_stdout(io.StringIO()):  # Invkine_manip prints every solve
+            for pose, seed in zip(poses[:LOOP_SIZE // 10], seeds):
+                kinematic.Invkine_manip(pose, seed, ROBOT)
+
+    before = bench("Invkine_manip (IKinFixed)", newton, LOOP_SIZE // 10, repeat=1)
+    single = bench("Invkine_analytic", lambda: [kinematic.Invkine_analytic(p, q, ROBOT) for p, q in zip(poses[:LOOP_SIZE], seeds)], LOOP_SIZE)
+    after = bench("Invkine_analytic_batch", lambda: kinematic.Invkine_analytic_batch(poses, seeds, ROBOT), BATCH_SIZE)
+    print(f"✅ Speed-up: {before / single:.0f}x single, {before / after:.0f}x batched")
+
+
+def check_round_trip():
+    """Forward then closed-form inverse kinematics with the exact joints as seed must give the joints back"""
+    rng = np.random.default_rng(4)
+    joints = rng.uniform(-np.pi, np.pi, (BATCH_SIZE, 6))
+    joints[:BATCH_SIZE // 10, 4] = rng.choice([0, 1e-7, -1e-7, np.pi, np.pi - 1e-7], BATCH_SIZE // 10)  # Singular wrists
+    for rob in ("ur5", "ur10"):
+        poses = kinematic.Forwardkin_batch(joints, rob)
+        solved = kinematic.Invkine_analytic_batch(poses, joints, rob)
+        reached = ~np.isnan(solved[:, 0])
+        error = np.abs(kinematic.Forwardkin_batch(solved[reached], rob) - poses[reached]).max()
+        drift = np.abs(solved[reached] - joints[reached]).max()
+        assert reached.all() and error < 1e-6 and drift < 1e-5, (rob, reached.sum(), error, drift)
+        print(f"✅ Round trip ({rob}): {BATCH_SIZE} poses, max pose error {error:.1e}, max joint drift {drift:.1e} rad")
+
+
+def bench_newton():
+    model = kinematic.getRobotKinematics(ROBOT)
+    rng = np.random.default_rng(2)
+    joints = rng.uniform(-np.pi, np.pi, (NEWTON_SIZE, 6))
+    targets = manipulation.FKinFixedBatch(model.M, model.Slist, joints)
+    seeds = joints + rng.normal(0, 0.3, joints.shape)
+    print(f"🧪 Iterative inverse kinematics ({ROBOT}), {NEWTON_SIZE} reachable poses, seeds 0.3 rad off")
+
+    def reached(thetalist, target):
+        return np.abs(manipulation.FKinFixed(model.M, model.Slist, thetalist) - target).max() < 1e-3
+
+    def run(label, solve):
+        start = time.perf_counter()
+        solved = sum(reached(solve(target, seed), target) for target, seed in zip(targets, seeds))
+        per_solve = (time.perf_counter() - start) / NEWTON_SIZE * 1e6
+        print(f"   {label:<28} {per_solve:8.0f} µs/solve, {solved}/{NEWTON_SIZE} reached")
+        return per_solve
+
+    solver = manipulation.IKinSolver(model.Slist, model.M)
+    fixed = run("IKinFixed", lambda target, seed: manipulation.IKinFixed(model.Slist, model.M, target, seed, WTHRESH, VTHRESH)[-1])
+    body = run("IKinBody", lambda target, seed: manipulation.IKinBody(model.Blist, model.M, target, seed, WTHRESH, VTHRESH)[-1])
+    new = run("IKinSolver", lambda target, seed: solver.solve(target, seed, WTHRESH, VTHRESH)[0])
+    print(f"✅ Speed-up: {fixed / new:.0f}x over IKinFixed, {body / new:.0f}x over IKinBody")
+
+    # Following a path: every solve warm starts from the previous solution
+    path = joints[0] + np.linspace(0, 0.5, NEWTON_SIZE)[:, np.newaxis]
+    path_targets = manipulation.FKinFixedBatch(model.M, model.Slist, path)
+    solver.solve(path_targets[0], path[0])
+    start = time.perf_counter()
+    iterations = 0
+    for target in path_targets[1:]:
+        solver.solve(target)
+        iterations += solver.iterations
+    per_solve = (time.perf_counter() - start) / (NEWTON_SIZE - 1) * 1e6
+    print(f"   {'IKinSolver warm start':<28} {per_solve:8.0f} µs/solve, {iterations / (NEWTON_SIZE - 1):.1f} iterations")
+
+
+def bench_jacobian():
+    model = kinematic.getRobotKinematics(ROBOT)
+    joints = np.random.default_rng(3).uniform(-np.pi, np.pi, (LOOP_SIZE, 6))
+    print(f"🧪 Jacobians ({ROBOT}), {LOOP_SIZE} joint vectors")
+
+    # The first run derives the symbolic Jacobian with sympy (tens of seconds), later runs load it from the cache
+    start = time.perf_counter()
+    jacobian = kinematic.Jacobian_Function(ROBOT)
+    print(f"   Jacobian_Function ready in {time.perf_counter() - start:.2f} s (cache: {kinematic.JACOBIAN_CACHE_DIR})")
+
+    # The geometric Jacobian's position rows at the flange match the symbolic (DH) derivatives
+    for q in joints[:10]:
+        space = kinematic.Jacobian_Analytic(ROBOT, q)
+        flange = kinematic.TransMatrix_DH_Numerical(ROBOT, q)[:3, 3].A1
+        linear = space[3:] + np.cross(space[:3].T, flange).T
+        assert np.allclose(linear.T[:, :3], jacobian(q)[:, :3], atol=1e-3)
+
+    before = bench("FixedJacobian", lambda: [manipulation.FixedJacobian(model.Slist, q) for q in joints], LOOP_SIZE)
+    bench("Jacobian_Function", lambda: [jacobian(q) for q in joints], LOOP_SIZE)
+    after = bench("Jacobian_Analytic", lambda: [kinematic.Jacobian_Analytic(ROBOT, q) for q in joints], LOOP_SIZE)
+    print(f"✅ Speed-up: {before / after:.0f}x over FixedJacobian")
+
+
+def main():
+    bench_forward()
+    bench_inverse()
+    check_round_trip()
+    bench_newton()
+    bench_jacobian()
+
+
+if __name__ == "__main__":
+    main()
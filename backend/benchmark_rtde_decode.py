@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for RTDE data package decoding.
+Compares the per-field struct/list decoder with the precompiled numpy plan
+using the output recipe from rtdeConfigurationDefault.xml. No robot needed.
+"""
+
+import struct
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from URBasic.rtde import RTDE_IO_Config, RTDEDataObject, RTDE_NUMPY_TYPES
+
+CONFIG_FILE = "rtdeConfigurationDefault.xml"
+ITERATIONS = 20000
+
+
+def load_recipe():
+    """Build an output config the same way the RTDE thread does"""
+    root = ET.parse(CONFIG_FILE).getroot()
+    names = ["timestamp"] + [child.attrib["name"] for child in root.find("receive")]
+    types = ["DOUBLE"] + [child.attrib["type"] for child in root.find("receive")]
+    config = RTDE_IO_Config.unpack_recipe(",".join(types).encode(), False)
+    config.names = names
+    return config
+
+
+def random_package(config):
+    values = []
+    rng = np.random.default_rng(0)
+    for data_type in config.types:
+        code, shape = RTDE_NUMPY_TYPES[data_type]
+        count = shape[0] if shape else 1
+        if code == "f8":
+            values.extend(rng.uniform(-3, 3, count).tolist())
+        else:
+            values.extend(rng.integers(0, 100, count).tolist())
+    return struct.pack(config.fmt, *values)
+
+
+def bench(label, fn, payload):
+    fn(payload)  # Warm up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(payload)
+    per_package = (time.perf_counter() - start) / ITERATIONS * 1e6
+    print(f"   {label:<28} {per_package:8.2f} µs/package")
+    return per_package
+
+
+def main():
+    config = load_recipe()
+    payload = random_package(config)
+    print(f"🧪 Decoding {len(config.names)} fields ({len(payload)} bytes), {ITERATIONS} iterations")
+
+    legacy = lambda data: RTDEDataObject.unpack(struct.unpack_from(config.fmt, data), config.names, config.types)
+    config.compile()
+    compiled = config.unpack
+
+    # Both decoders must agree before timing them
+    expected, actual = legacy(payload), compiled(payload)
+    for name in config.names:
+        assert np.allclose(expected[name], actual[name]), name
+
+    before = bench("struct + unpack_field", legacy, payload)
+    after = bench("precompiled numpy plan", compiled, payload)
+    print(f"✅ Speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import socket
+import threading
+
+DASHBOARD_PORT = 29999
+DEFAULT_TIMEOUT = 3.0
+
+
+class DashboardClient:
+    """
+    Long-lived, thread-safe connection to the UR dashboard server (port 29999).
+
+    Replies are read line by line (the dashboard answers every command with exactly
+    one newline-terminated line), so no fixed sleeps are needed. Several commands can
+    be pipelined in one write with send_many(). A connection found broken before the
+    commands were sent is re-opened once per call; once they were sent they are never
+    resent (a stop/load/play could run twice), a failure then is raised to the caller.
+    """
+
+    def __init__(self, host, port=DASHBOARD_PORT, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock = None
+        self.buffer = bytearray()
+        self.banner = None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.buffer = bytearray()
+        # The server greets every new connection with a single line
+        self.banner = self._read_line()
+        print(f"🔌 Dashboard connected to {self.host}:{self.port} ({self.banner})")
+
+    def _disconnect(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.buffer = bytearray()
+
+    def _read_line(self):
+        while True:
+            newline = self.buffer.find(b"\n")
+            if newline >= 0:
+                line = bytes(self.buffer[:newline])
+                del self.buffer[:newline + 1]
+                return line.decode(errors="replace").strip()
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("Dashboard server closed the connection")
+            self.buffer += chunk
+
+    def send_many(self, commands):
+        """Send all commands in a single write and return their replies in order"""
+        payload = "".join(f"{command}\n" for command in commands).encode()
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall(payload)
+                    break
+                except OSError as e:  # Includes socket.timeout and ConnectionError
+                    self._disconnect()
+                    if attempt == 1:
+                        raise
+                    print(f"⚠️ Dashboard connection lost ({e}), reconnecting...")
+            try:
+                return [self._read_line() for _ in commands]
+            except OSError:
+                self._disconnect()
+                raise
+
+    def send(self, command):
+        """Send one command and return its reply line"""
+        return self.send_many([command])[0]
+
+    def close(self):
+        with self.lock:
+            self._disconnect()
@@ -0,0 +1,334 @@
+import threading
+import time
+from collections import deque
+from state_stream import state_stream
+from task_catalog import task_catalog
+
+
+class TaskDag:
+    """
+    Dependency graph compiled from a TaskName -> [prerequisite TaskNames] map.
+    Tasks get integer IDs in map order; preds/succs are ID lists. Unknown task names a
+    task depends on get IDs after the catalog tasks (and are listed in warnings), so they
+    stay unmet until a task of that name finishes. A cycle raises ValueError.
+    """
+
+    def __init__(self, dependency_map):
+        self.names = list(dependency_map)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.preds = [[] for _ in self.names]
+        self.succs = [[] for _ in self.names]
+        self.warnings = []
+        for name, deps in dependency_map.items():
+            task_id = self.ids[name]
+            for dep in deps:
+                dep_id = self.ids.get(dep)
+                if dep_id is None:
+                    self.warnings.append(f"'{name}' depends on unknown task '{dep}'")
+                    dep_id = self.ids[dep] = len(self.names)
+                    self.names.append(dep)
+                    self.preds.append([])
+                    self.succs.append([])
+                if dep_id not in self.preds[task_id]:
+                    self.preds[task_id].append(dep_id)
+                    self.succs[dep_id].append(task_id)
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        in_degree = [len(p) for p in self.preds]
+        queue = [i for i, d in enumerate(in_degree) if d == 0]
+        for i in queue:
+            for s in self.succs[i]:
+                in_degree[s] -= 1
+                if in_degree[s] == 0:
+                    queue.append(s)
+        if len(queue) != len(self.names):
+            cyclic = [self.names[i] for i, d in enumerate(in_degree) if d > 0]
+            raise ValueError(f"Dependency cycle between tasks: {', '.join(cyclic)}")
+
+    def dependency_names(self, name):
+        task_id = self.ids.get(name)
+        return [self.names[p] for p in self.preds[task_id]] if task_id is not None else []
+
+
+class DependencyManager:
+    def __init__(self):
+        self.dependencies = {}
+        self.dag = TaskDag({})
+        self.load_error = None               # Why the catalog's dependencies are invalid; no task is ready meanwhile
+        self.robot_task_dependency = []      # Current robot task dependencies
+        self.human_task_dependency = []      # Current human task dependencies
+        self.robot_assigned_tasks = deque()  # Tasks assigned to robot
+        self.human_assigned_tasks = deque()  # Tasks assigned to human
+        self.all_finished_tasks = []         # All finished tasks, in completion order
+        self.human_finished_tasks = []
+        self.robot_finished_tasks = []
+        self.finished = set()                # Names of all finished tasks
+        self.unmet_counts = []               # Task ID -> number of unfinished dependencies
+        self.lock = threading.RLock()
+        self.completion_events = {}          # Task name -> threading.Event set when the task finishes
+        self.ready_listeners = []            # Called with the names of tasks that just became ready
+        self.load_dependencies()
+        self.publish_state()
+    
+    def load_dependencies(self):
+        """Load all task dependencies from the task catalog and compile them into a DAG"""
+        dependency_map = task_catalog.dependency_map()
+        try:
+            dag = TaskDag(dependency_map)
+        except ValueError as e:
+            print(f"❌ Invalid task dependencies, holding all tasks until tasks.xlsx is fixed: {e}")
+            with self.lock:
+                self.load_error = str(e)
+            return
+        for warning in dag.warnings:
+            print(f"⚠️ Unmet dependency: {warning}")
+        with self.lock:
+            self.dependencies = dependency_map
+            self.dag = dag
+            self.load_error = None
+            self._recount_unmet()
+        print("📎 Loaded all task dependencies:", self.dependencies)
+    
+    def _recount_unmet(self):
+        finished_ids = {self.dag.ids[name] for name in self.finished if name in self.dag.ids}
+        self.unmet_counts = [sum(1 for p in preds if p not in finished_ids) for preds in self.dag.preds]
+    
+    def is_ready(self, task_name):
+        """
+        True when every dependency of task_name has finished (tasks without dependencies are always ready).
+        Nothing is ready while the catalog's dependencies are invalid.
+        """
+        if self.load_error is not None:
+            return False
+        task_id = self.dag.ids.get(task_name)
+        return task_id is None or self.unmet_counts[task_id] == 0
+    
+    def add_ready_listener(self, callback):
+        self.ready_listeners = self.ready_listeners + [callback]
+    
+    def update_assigned_tasks(self, tasks):
+        """Update robot and human assigned task lists after Start button"""
+        self.load_dependencies()  # Pick up any edits to tasks.xlsx since the last run
+        self.robot_assigned_tasks = deque()
+        self.human_assigned_tasks = deque()
+        
+        for task in tasks:
+            if task.get("assignedTo") == "Robot":
+                self.robot_assigned_tasks.append(task["name"])
+            elif task.get("assignedTo") == "Human":
+                self.human_assigned_tasks.append(task["name"])
+        
+        print(f"📋 Updated assigned tasks:")
+        print(f"   Robot assigned tasks: {self.robot_assigned_tasks}")
+        print(f"   Human assigned tasks: {self.human_assigned_tasks}")
+        self.publish_state()
+    
+    def set_human_task_dependencies(self, task_name):
+        """Set dependencies for current human task"""
+        deps = self.dag.dependency_names(task_name)
+        self.human_task_dependency = deps
+        print(f"👤 Set human task dependencies for '{task_name}': {self.human_task_dependency}")
+        self.publish_state()
+    
+    def set_robot_task_dependencies(self, task_name):
+        """Set dependencies for current robot task"""
+        deps = self.dag.dependency_names(task_name)
+        self.robot_task_dependency = deps
+        print(f"🤖 Set robot task dependencies for '{task_name}': {self.robot_task_dependency}")
+        self.publish_state()
+    
+    def check_human_dependencies(self, task_name):
+        """Check if human task dependencies are met"""
+        if self.is_ready(task_name):
+            return True, ""
+        if self.load_error is not None:
+            return False, f"Task dependencies are invalid: {self.load_error}"
+        
+        unmet_deps = self.unmet_dependencies(task_name)
+        for dep in unmet_deps:
+            print(f"❌ Missing humanTask Dependency: '{dep}' for task '{task_name}'")
+        return False, f"Please wait till robot execute these tasks: {', '.join(unmet_deps)}"
+    
+    def check_robot_dependencies(self, task_name):
+        """Check if robot task dependencies are met"""
+        if self.is_ready(task_name):
+            return True, ""
+        if self.load_error is not None:
+            return False, f"Task dependencies are invalid: {self.load_error}"
+        
+        unmet_deps = self.unmet_dependencies(task_name)
+        for dep in unmet_deps:
+            print(f"🤖 Missing robotTaskDependency: '{dep}' for task '{task_name}'")
+        return False, f"I am waiting for my task dependencies, I will start after you execute: {', '.join(unmet_deps)}"
+    
+    def add_to_all_finished_tasks(self, task_name):
+        """
+        Add task to all finished tasks and release anything waiting on it.
+        Returns the names of tasks that became ready because of it.
+        """
+        with self.lock:
+            if task_name in self.finished:
+                print(f"⚠️ Task '{task_name}' already in all finished tasks")
+                return []
+            self.finished.add(task_name)
+            self.all_finished_tasks.append(task_name)
+            print(f"✅ Added '{task_name}' to all finished tasks")
+            
+            newly_ready = []
+            task_id = self.dag.ids.get(task_name)
+            if task_id is not None:
+                for succ in self.dag.succs[task_id]:
+                    self.unmet_counts[succ] -= 1
+                    if self.unmet_counts[succ] == 0:
+                        newly_ready.append(self.dag.names[succ])
+            if newly_ready:
+                print(f"🔓 Ready now: {newly_ready}")
+                for listener in self.ready_listeners:
+                    try:
+                        listener(newly_ready)
+                    except Exception as e:
+                        print(f"❌ Ready listener failed: {e}")
+            
+            self.completion_event(task_name).set()
+            self.publish_state()
+            return newly_ready
+    
+    def completion_event(self, task_name):
+        """Event that is set once task_name has finished"""
+        with self.lock:
+            event = self.completion_events.get(task_name)
+            if event is None:
+                event = self.completion_events[task_name] = threading.Event()
+                if task_name in self.finished:
+                    event.set()
+            return event
+    
+    def wait_for_dependencies(self, task_name, timeout=None):
+        """
+        Block until every dependency of task_name has finished or timeout seconds pass.
+        Returns True if all dependencies are met.
+        """
+        with self.lock:
+            events = [self.completion_event(dep) for dep in self.unmet_dependencies(task_name)]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for event in events:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not event.wait(remaining):
+                return False
+        return True
+    
+    def complete_human_task(self, task_name):
+        """Mark a human task finished and move on to the next human task; returns the next task"""
+        with self.lock:
+            if task_name not in self.finished:
+                self.human_finished_tasks.append(task_name)
+            self.add_to_all_finished_tasks(task_name)
+            self.remove_from_human_assigned_tasks(task_name)
+            next_human_task = self.get_current_human_task()
+            if next_human_task:
+                self.set_human_task_dependencies(next_human_task)
+            return next_human_task
+    
+    def complete_robot_task(self, task_name):
+        """Mark a robot task finished and move on to the next robot task; returns the next task"""
+        with self.lock:
+            if task_name not in self.finished:
+                self.robot_finished_tasks.append(task_name)
+            self.add_to_all_finished_tasks(task_name)
+            self.remove_from_robot_assigned_tasks(task_name)
+            next_robot_task = self.get_current_robot_task()
+            if next_robot_task:
+                self.set_robot_task_dependencies(next_robot_task)
+            return next_robot_task
+    
+    @staticmethod
+    def _remove_assigned(assigned, task_name):
+        """Remove task_name from an assigned queue; O(1) for the usual case of the current (first) task"""
+        if assigned and assigned[0] == task_name:
+            assigned.popleft()
+            return True
+        try:
+            assigned.remove(task_name)
+            return True
+        except ValueError:
+            return False
+    
+    def remove_from_human_assigned_tasks(self, task_name):
+        """Remove task from human assigned tasks list"""
+        if self._remove_assigned(self.human_assigned_tasks, task_name):
+            print(f"✅ Removed '{task_name}' from human assigned tasks")
+            self.publish_state()
+        else:
+            print(f"⚠️ Task '{task_name}' not found in human assigned tasks")
+    
+    def remove_from_robot_assigned_tasks(self, task_name):
+        """Remove task from robot assigned tasks list"""
+        if self._remove_assigned(self.robot_assigned_tasks, task_name):
+            print(f"✅ Removed '{task_name}' from robot assigned tasks")
+            self.publish_state()
+        else:
+            print(f"⚠️ Task '{task_name}' not found in robot assigned tasks")
+    
+    def get_current_human_task(self):
+        """Get the first task from human assigned tasks"""
+        if self.human_assigned_tasks:
+            return self.human_assigned_tasks[0]
+        return None
+    
+    def get_current_robot_task(self):
+        """Get the first task from robot assigned tasks"""
+        if self.robot_assigned_tasks:
+            return self.robot_assigned_tasks[0]
+        return None
+    
+    def reset(self):
+        """Reset all lists"""
+        with self.lock:
+            self.robot_task_dependency = []
+            self.human_task_dependency = []
+            self.robot_assigned_tasks = deque()
+            self.human_assigned_tasks = deque()
+            self.all_finished_tasks = []
+            self.human_finished_tasks = []
+            self.robot_finished_tasks = []
+            self.finished = set()
+            self._recount_unmet()
+            # Waiters hold the old events and re-check with a timeout, so it is safe to drop them
+            self.completion_events = {}
+        print("🔄 Dependency manager reset - cleared all lists")
+        self.publish_state()
+    
+    def unmet_dependencies(self, task_name):
+        """Return the dependencies of task_name that are not finished yet"""
+        if self.is_ready(task_name):
+            return []
+        return [dep for dep in self.dag.dependency_names(task_name) if dep not in self.finished]
+    
+    def publish_state(self):
+        """Push execution state and dependency gate status to event stream subscribers"""
+        current_human_task = self.get_current_human_task()
+        current_robot_task = self.get_current_robot_task()
+        human_unmet = self.unmet_dependencies(current_human_task) if current_human_task else []
+        robot_unmet = self.unmet_dependencies(current_robot_task) if current_robot_task else []
+        state_stream.publish("execution", {
+            "human_assigned_tasks": list(self.human_assigned_tasks),
+            "robot_assigned_tasks": list(self.robot_assigned_tasks),
+            "all_finished_tasks": list(self.all_finished_tasks),
+            "current_human_task": current_human_task,
+            "current_robot_task": current_robot_task,
+            "human_task_dependency": list(self.human_task_dependency),
+            "robot_task_dependency": list(self.robot_task_dependency),
+            "human_gate": {
+                "allowed": not human_unmet,
+                "message": f"Please wait till robot execute these tasks: {', '.join(human_unmet)}" if human_unmet else "",
+                "current_task": current_human_task,
+            },
+            "robot_gate": {
+                "allowed": not robot_unmet,
+                "message": f"I am waiting for my task dependencies, I will start after you execute: {', '.join(robot_unmet)}" if robot_unmet else "",
+                "current_task": current_robot_task,
+            },
+        })
+
+dependency_manager = DependencyManager()
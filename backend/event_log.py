@@ -0,0 +1,198 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+EVENT_LOG_FILE = "event_log.jsonl"
+LOG_XLSX_FILE = "Log.xlsx"
+EXPORT_HEADER = ["Participant ID", "Time (ms)", "Time (Readable)", "Event", "Details"]
+
+BATCH_SIZE = 256       # Max events written per batch
+FSYNC_POLICIES = ("always", "interval", "never")
+FSYNC_INTERVAL = 1.0   # Seconds between fsyncs with the "interval" policy
+
+
+class EventLog:
+    """
+    Append-only JSONL event store. log() only timestamps the event and queues it,
+    a background thread appends queued events in batches (one write per batch) and
+    fsyncs according to the fsync policy:
+      "always"   - fsync after every batch
+      "interval" - fsync at most every FSYNC_INTERVAL seconds (default)
+      "never"    - leave it to the OS
+    Excel output is produced on demand with export_xlsx().
+    """
+
+    def __init__(self, path=EVENT_LOG_FILE, fsync_policy="interval"):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}', expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.queue = queue.Queue()
+        self.condition = threading.Condition()
+        self.enqueued = 0  # Events accepted by log()
+        self.written = 0   # Events appended to the file
+        self.last_fsync = time.monotonic()
+        self.file = None
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.listeners = []  # Called with every logged record on the logging thread
+
+    def start(self):
+        """Open the log file and start the writer thread (only once)"""
+        with self.start_lock:
+            if self.thread is not None:
+                return
+            if not os.path.exists(self.path):
+                self._import_legacy_logs()
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.thread = threading.Thread(target=self._writer_loop, name="EventLogWriter", daemon=True)
+            self.thread.start()
+            print(f"📝 Event log writing to {self.path} (fsync: {self.fsync_policy})")
+
+    def log(self, participant_id, event, details=None):
+        """Queue one event; never blocks on disk I/O"""
+        if self.thread is None:
+            self.start()
+        now = datetime.now()
+        record = {
+            "participantId": participant_id,
+            "time_ms": int(now.timestamp() * 1000),
+            "time_readable": now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "event": event,
+            "details": details or {},
+        }
+        with self.condition:
+            self.enqueued += 1
+        self.queue.put(record)
+        for listener in self.listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                print(f"❌ Event log listener failed: {e}")
+        return record
+
+    def add_listener(self, callback):
+        self.listeners = self.listeners + [callback]
+
+    def remove_listener(self, callback):
+        self.listeners = [listener for listener in self.listeners if listener is not callback]
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.file.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+                self.file.flush()
+                now = time.monotonic()
+                if self.fsync_policy == "always" or (
+                        self.fsync_policy == "interval" and now - self.last_fsync >= FSYNC_INTERVAL):
+                    os.fsync(self.file.fileno())
+                    self.last_fsync = now
+            except Exception as e:
+                print(f"❌ Error writing {len(batch)} events to {self.path}: {e}")
+            with self.condition:
+                self.written += len(batch)
+                self.condition.notify_all()
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued event is written and synced to disk"""
+        if self.thread is None:
+            return True
+        with self.condition:
+            target = self.enqueued
+            if not self.condition.wait_for(lambda: self.written >= target, timeout):
+                return False
+        os.fsync(self.file.fileno())
+        self.last_fsync = time.monotonic()
+        return True
+
+    def read_events(self):
+        """Yield all events written so far, oldest first"""
+        self.flush()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written last line after a crash
+                    print(f"⚠️ Skipping malformed event log line: {line[:80]}")
+
+    def export_xlsx(self, path=LOG_XLSX_FILE):
+        """Write every event to an Excel workbook with the classic Log.xlsx columns"""
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(EXPORT_HEADER)
+        count = 0
+        for record in self.read_events():
+            details = record.get("details")
+            ws.append([
+                record.get("participantId"),
+                record.get("time_ms"),
+                record.get("time_readable"),
+                record.get("event"),
+                details if isinstance(details, str) else str(details),
+            ])
+            count += 1
+        wb.save(path)
+        print(f"📤 Exported {count} events to {path}")
+        return count
+
+    def _import_legacy_logs(self):
+        """One-time import of Log.xlsx and its rotated log_N.xlsx files into the JSONL store"""
+        legacy_files = sorted(
+            (f for f in os.listdir(".") if re.match(r"log_\d+\.xlsx$", f)),
+            key=lambda f: int(re.search(r"\d+", f).group()),
+        )
+        if os.path.exists(LOG_XLSX_FILE):
+            legacy_files.append(LOG_XLSX_FILE)
+        if not legacy_files:
+            return
+
+        from openpyxl import load_workbook
+
+        count = 0
+        with open(self.path, "w", encoding="utf-8") as out:
+            for filename in legacy_files:
+                try:
+                    wb = load_workbook(filename, read_only=True)
+                    for row in wb.active.iter_rows(min_row=2, values_only=True):
+                        if not row or row[0] is None:
+                            continue
+                        row = list(row) + [None] * (5 - len(row))
+                        record = {
+                            "participantId": row[0],
+                            "time_ms": row[1],
+                            "time_readable": row[2],
+                            "event": row[3],
+                            "details": row[4] or "",
+                        }
+                        out.write(json.dumps(record, default=str) + "\n")
+                        count += 1
+                    wb.close()
+                except Exception as e:
+                    print(f"❌ Could not import legacy log {filename}: {e}")
+            out.flush()
+            os.fsync(out.fileno())
+        print(f"📥 Imported {count} events from {len(legacy_files)} legacy log file(s)")
+
+    def close(self):
+        self.flush()
+
+
+event_log = EventLog()
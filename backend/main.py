@@ -1,12 +1,24 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import Response
 import pandas as pd
-from urp_trigger import send_dashboard_command
+import robot_io
 from robot_executor import robot_executor
+from robot_dispatcher import robot_dispatcher
+from task_catalog import task_catalog
+from task_scheduler import schedule_tasks
+from state_stream import state_stream
+from dependency_manager import dependency_manager
+from event_log import event_log, LOG_XLSX_FILE
+from participant_store import participant_store, ORDER_PATH, SAVE_PATH
+from allocation_writer import allocation_writer
+from robot_session import robot_session
 from fastapi import Request
 from pydantic import BaseModel
 from typing import List
 from openpyxl import Workbook, load_workbook
+import asyncio
 import os
 import time
 import re
@@ -18,140 +30,6 @@ ROBOT_CONNECTED = True
 if not ROBOT_CONNECTED:
     print("⚠️ Robot is in SIMULATED mode — no real commands will be sent.")
 
-# Global dependency management
-class DependencyManager:
-    def __init__(self):
-        self.dependencies = {}
-        self.robot_task_dependency = []  # Current robot task dependencies
-        self.human_task_dependency = []  # Current human task dependencies
-        self.robot_assigned_tasks = []   # Tasks assigned to robot
-        self.human_assigned_tasks = []   # Tasks assigned to human
-        self.all_finished_tasks = []     # All finished tasks
-        self.load_dependencies()
-    
-    def load_dependencies(self):
-        """Load all task dependencies from tasks.xlsx"""
-        try:
-            df = pd.read_excel("tasks.xlsx")
-            for _, row in df.iterrows():
-                task_name = str(row["TaskName"]).strip()
-                robot_code = str(row["RobotCode"]).strip()
-                dep = str(row.get("Dependency", "")).strip()
-                
-                if dep and dep.lower() != "nan":
-                    self.dependencies[task_name] = [d.strip() for d in dep.split(",")]
-                else:
-                    self.dependencies[task_name] = []
-                    
-            print("📎 Loaded all task dependencies:", self.dependencies)
-        except Exception as e:
-            print(f"❌ Failed to load dependencies: {e}")
-            self.dependencies = {}
-    
-    def update_assigned_tasks(self, tasks):
-        """Update robot and human assigned task lists after Start button"""
-        self.robot_assigned_tasks = []
-        self.human_assigned_tasks = []
-        
-        for task in tasks:
-            if task.get("assignedTo") == "Robot":
-                self.robot_assigned_tasks.append(task["name"])
-            elif task.get("assignedTo") == "Human":
-                self.human_assigned_tasks.append(task["name"])
-        
-        print(f"📋 Updated assigned tasks:")
-        print(f"   Robot assigned tasks: {self.robot_assigned_tasks}")
-        print(f"   Human assigned tasks: {self.human_assigned_tasks}")
-    
-    def set_human_task_dependencies(self, task_name):
-        """Set dependencies for current human task"""
-        deps = self.dependencies.get(task_name, [])
-        self.human_task_dependency = deps
-        print(f"👤 Set human task dependencies for '{task_name}': {self.human_task_dependency}")
-    
-    def set_robot_task_dependencies(self, task_name):
-        """Set dependencies for current robot task"""
-        deps = self.dependencies.get(task_name, [])
-        self.robot_task_dependency = deps
-        print(f"🤖 Set robot task dependencies for '{task_name}': {self.robot_task_dependency}")
-    
-    def check_human_dependencies(self, task_name):
-        """Check if human task dependencies are met"""
-        deps = self.dependencies.get(task_name, [])
-        unmet_deps = []
-        
-        for dep in deps:
-            if dep not in self.all_finished_tasks:
-                unmet_deps.append(dep)
-                print(f"❌ Missing humanTask Dependency: '{dep}' for task '{task_name}'")
-        
-        if unmet_deps:
-            return False, f"Please wait till robot execute these tasks: {', '.join(unmet_deps)}"
-        else:
-            return True, ""
-    
-    def check_robot_dependencies(self, task_name):
-        """Check if robot task dependencies are met"""
-        deps = self.dependencies.get(task_name, [])
-        unmet_deps = []
-        
-        for dep in deps:
-            if dep not in self.all_finished_tasks:
-                unmet_deps.append(dep)
-                print(f"🤖 Missing robotTaskDependency: '{dep}' for task '{task_name}'")
-        
-        if unmet_deps:
-            return False, f"I am waiting for my task dependencies, I will start after you execute: {', '.join(unmet_deps)}"
-        else:
-            return True, ""
-    
-    def add_to_all_finished_tasks(self, task_name):
-        """Add task to all finished tasks list"""
-        if task_name not in self.all_finished_tasks:
-            self.all_finished_tasks.append(task_name)
-            print(f"✅ Added '{task_name}' to all finished tasks")
-        else:
-            print(f"⚠️ Task '{task_name}' already in all finished tasks")
-    
-    def remove_from_human_assigned_tasks(self, task_name):
-        """Remove task from human assigned tasks list"""
-        if task_name in self.human_assigned_tasks:
-            self.human_assigned_tasks.remove(task_name)
-            print(f"✅ Removed '{task_name}' from human assigned tasks")
-        else:
-            print(f"⚠️ Task '{task_name}' not found in human assigned tasks")
-    
-    def remove_from_robot_assigned_tasks(self, task_name):
-        """Remove task from robot assigned tasks list"""
-        if task_name in self.robot_assigned_tasks:
-            self.robot_assigned_tasks.remove(task_name)
-            print(f"✅ Removed '{task_name}' from robot assigned tasks")
-        else:
-            print(f"⚠️ Task '{task_name}' not found in robot assigned tasks")
-    
-    def get_current_human_task(self):
-        """Get the first task from human assigned tasks"""
-        if self.human_assigned_tasks:
-            return self.human_assigned_tasks[0]
-        return None
-    
-    def get_current_robot_task(self):
-        """Get the first task from robot assigned tasks"""
-        if self.robot_assigned_tasks:
-            return self.robot_assigned_tasks[0]
-        return None
-    
-    def reset(self):
-        """Reset all lists"""
-        self.robot_task_dependency = []
-        self.human_task_dependency = []
-        self.robot_assigned_tasks = []
-        self.human_assigned_tasks = []
-        self.all_finished_tasks = []
-        print("🔄 Dependency manager reset - cleared all lists")
-
-# Initialize dependency manager
-dependency_manager = DependencyManager()
 
 app = FastAPI()
 
@@ -168,44 +46,73 @@ app.add_middleware(
 async def root():
     return {"message": "Robot backend is running!"}
 
-@app.get("/tasks")
-def get_tasks(optimizationMode: str = Query("no-optimization")):
-    df = pd.read_excel("tasks.xlsx")
-    task_list = []
-    for _, row in df.iterrows():
-        task = {
-            "TaskID": int(row["TaskID"]),
-            "TaskName": row["TaskName"],
-            "Instruction": row["Instruction"],
-            "ImageName": row["ImageName"],
-            "Time_Human": int(row["Time_Human"]),
-            "Time_Robot": int(row["Time_Robot"]),
-            "RobotCode": row["RobotCode"],
-            "fixedToHuman": str(row["RobotCode"]).strip().lower() == "cannot" if "RobotCode" in df.columns else False
-        }
-        task_list.append(task)
+def _build_schedule(mode, tasks=None):
+    try:
+        return schedule_tasks(task_catalog.tasks() if tasks is None else tasks, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Note: optimize_tasks function is not implemented
-    tasks = [{**task, "assignedTo": "Unassigned", "sliderValue": 5} for task in task_list]
+@app.get("/tasks")
+def get_tasks(response: Response, optimizationMode: str = Query("no-optimization")):
+    tasks = task_catalog.tasks()  # One snapshot, so a tasks.xlsx reload cannot split schedule and list
+    schedule = None
+    if optimizationMode != "no-optimization":
+        schedule = _build_schedule(optimizationMode, tasks)
+        response.headers["X-Predicted-Makespan"] = str(schedule.makespan)
+        print(f"🧮 {schedule.mode} schedule via {schedule.method}: makespan {schedule.makespan}s ({schedule.elapsed_ms:.1f} ms)")
 
     formatted_tasks = []
     for task in tasks:
         formatted_tasks.append({
-            "id": str(task["TaskID"]),
-            "name": task["TaskName"],
-            "description": task["Instruction"],
-            "image": f"/{task['ImageName']}",
-            "time_human": task["Time_Human"],
-            "time_robot": task["Time_Robot"],
-            "assignedTo": task["assignedTo"],
-            "sliderValue": task["sliderValue"],
-            "RobotCode": task["RobotCode"],
-            "fixedToHuman": str(task["RobotCode"]).strip().lower() == "cannot"
+            "id": str(task.task_id),
+            "name": task.name,
+            "description": task.instruction,
+            "image": f"/{task.image_name}",
+            "time_human": task.time_human,
+            "time_robot": task.time_robot,
+            "assignedTo": "Unassigned",
+            "sliderValue": 5,
+            "RobotCode": task.robot_code,
+            "fixedToHuman": task.fixed_to_human
 
         })
 
+    if schedule is not None:
+        slots = {t.name: t for t in schedule.tasks}
+        for formatted in formatted_tasks:
+            slot = slots[formatted["name"]]
+            formatted["assignedTo"] = slot.agent
+            formatted["sliderValue"] = 0 if slot.agent == "Human" else 10
+            formatted["scheduledStart"] = slot.start
+            formatted["scheduledFinish"] = slot.finish
+
     return formatted_tasks
 
+@app.get("/schedule")
+def get_schedule(optimizationMode: str = Query("makespan")):
+    """Human/robot allocation with per-task start/finish times and the predicted makespan"""
+    schedule = _build_schedule(optimizationMode)
+    return {
+        "mode": schedule.mode,
+        "method": schedule.method,
+        "predictedMakespan": schedule.makespan,
+        "elapsedMs": round(schedule.elapsed_ms, 2),
+        "assignments": schedule.assignments(),
+        "schedule": [
+            {"name": t.name, "assignedTo": t.agent, "start": t.start, "finish": t.finish}
+            for t in schedule.tasks
+        ],
+    }
+
+@app.get("/events")
+async def execution_events(request: Request):
+    """Server-Sent-Events stream of execution state: a full snapshot on connect, then deltas on every change"""
+    return StreamingResponse(
+        state_stream.events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/robot/message")
 def get_robot_message():
     message = robot_executor.robot_message
@@ -232,8 +139,8 @@ def start_execution(tasks: List[dict]):
     
     return {
         "status": "success",
-        "human_assigned": dependency_manager.human_assigned_tasks,
-        "robot_assigned": dependency_manager.robot_assigned_tasks,
+        "human_assigned": list(dependency_manager.human_assigned_tasks),
+        "robot_assigned": list(dependency_manager.robot_assigned_tasks),
         "current_human_task": current_human_task,
         "current_robot_task": current_robot_task
     }
@@ -241,43 +148,25 @@ def start_execution(tasks: List[dict]):
 @app.post("/complete-human-task")
 def complete_human_task(task_name: str):
     """Complete a human task"""
-    # Add to all finished tasks
-    dependency_manager.add_to_all_finished_tasks(task_name)
-    
-    # Remove from human assigned tasks
-    dependency_manager.remove_from_human_assigned_tasks(task_name)
-    
-    # Set dependencies for next human task
-    next_human_task = dependency_manager.get_current_human_task()
-    if next_human_task:
-        dependency_manager.set_human_task_dependencies(next_human_task)
+    next_human_task = dependency_manager.complete_human_task(task_name)
     
     return {
         "status": "success", 
         "task": task_name,
         "next_human_task": next_human_task,
-        "human_assigned": dependency_manager.human_assigned_tasks
+        "human_assigned": list(dependency_manager.human_assigned_tasks)
     }
 
 @app.post("/complete-robot-task")
 def complete_robot_task(task_name: str):
     """Complete a robot task"""
-    # Add to all finished tasks
-    dependency_manager.add_to_all_finished_tasks(task_name)
-    
-    # Remove from robot assigned tasks
-    dependency_manager.remove_from_robot_assigned_tasks(task_name)
-    
-    # Set dependencies for next robot task
-    next_robot_task = dependency_manager.get_current_robot_task()
-    if next_robot_task:
-        dependency_manager.set_robot_task_dependencies(next_robot_task)
+    next_robot_task = dependency_manager.complete_robot_task(task_name)
     
     return {
         "status": "success", 
         "task": task_name,
         "next_robot_task": next_robot_task,
-        "robot_assigned": dependency_manager.robot_assigned_tasks
+        "robot_assigned": list(dependency_manager.robot_assigned_tasks)
     }
 
 @app.get("/check-human-dependency")
@@ -334,8 +223,8 @@ def check_robot_dependency():
 def get_execution_state():
     """Get current execution state"""
     return {
-        "human_assigned_tasks": dependency_manager.human_assigned_tasks,
-        "robot_assigned_tasks": dependency_manager.robot_assigned_tasks,
+        "human_assigned_tasks": list(dependency_manager.human_assigned_tasks),
+        "robot_assigned_tasks": list(dependency_manager.robot_assigned_tasks),
         "all_finished_tasks": dependency_manager.all_finished_tasks,
         "current_human_task": dependency_manager.get_current_human_task(),
         "current_robot_task": dependency_manager.get_current_robot_task(),
@@ -356,36 +245,14 @@ def debug_dependencies():
 @app.get("/get-task-dependencies")
 def get_task_dependencies():
     """Get all task dependencies for frontend grouping"""
-    try:
-        df = pd.read_excel("tasks.xlsx")
-        dependencies = {}
-        group_names = {}
-        for _, row in df.iterrows():
-            task_name = str(row["TaskName"]).strip()
-            dep = str(row.get("Dependency", "")).strip()
-            group_name = str(row.get("GroupName", "")).strip()
-            
-            if dep and dep.lower() != "nan":
-                dependencies[task_name] = [d.strip() for d in dep.split(",")]
-            else:
-                dependencies[task_name] = []
-            
-            if group_name and group_name.lower() != "nan":
-                group_names[task_name] = group_name
-            else:
-                group_names[task_name] = ""
-        
-        return {"dependencies": dependencies, "group_names": group_names}
-    except Exception as e:
-        print(f"❌ Error loading task dependencies: {e}")
-        return {"dependencies": {}, "group_names": {}}
+    return {"dependencies": task_catalog.dependency_map(), "group_names": task_catalog.group_names()}
 
 
 @app.get("/robot/state")
 async def robot_state():
     try:
         if ROBOT_CONNECTED:
-            return robot_executor.get_state()
+            return robot_dispatcher.get_state()
         else:
             return {"state": "SIMULATED"}
     except Exception as e:
@@ -433,7 +300,7 @@ async def get_current_robot_task():
 @app.get("/robot/pause")
 async def pause_robot():
     if ROBOT_CONNECTED:
-        send_dashboard_command("pause")
+        await robot_io.send_dashboard_command("pause")
         return {"status": "success", "detail": "Robot paused"}
     else:
         return {"status": "bypassed", "detail": "Pause simulated"}
@@ -442,7 +309,7 @@ async def pause_robot():
 @app.get("/robot/resume")
 async def resume_robot():
     if ROBOT_CONNECTED:
-        send_dashboard_command("play")
+        await robot_io.send_dashboard_command("play")
         return {"status": "success", "detail": "Robot resumed"}
     else:
         return {"status": "bypassed", "detail": "Resume simulated"}
@@ -450,7 +317,7 @@ async def resume_robot():
 @app.get("/robot/pause_processing")
 async def pause_robot_processing():
     if ROBOT_CONNECTED:
-        robot_executor.pause_processing()
+        robot_dispatcher.pause_processing()
         return {"status": "success", "detail": "Robot processing paused"}
     else:
         return {"status": "bypassed", "detail": "Pause processing simulated"}
@@ -458,7 +325,7 @@ async def pause_robot_processing():
 @app.get("/robot/resume_processing")
 async def resume_robot_processing():
     if ROBOT_CONNECTED:
-        robot_executor.resume_processing()
+        robot_dispatcher.resume_processing()
         return {"status": "success", "detail": "Robot processing resumed"}
     else:
         return {"status": "bypassed", "detail": "Resume processing simulated"}
@@ -483,20 +350,17 @@ async def get_current_robot_task_image():
     """Get the image name for the current robot task from Excel"""
     if ROBOT_CONNECTED:
         try:
-            df = pd.read_excel("tasks.xlsx")
             current_task_name = robot_executor.get_current_task_name()
             
             if current_task_name:
-                # Find the row with matching task name
-                for _, row in df.iterrows():
-                    if str(row["TaskName"]).strip() == current_task_name:
-                        # Get ImageNameRobot if it exists, otherwise fallback to ImageName
-                        image_name = row.get("ImageNameRobot", row.get("ImageName", "UR3e.png"))
-                        return {
-                            "task_name": current_task_name,
-                            "image_name": image_name,
-                            "has_image": True
-                        }
+                task = task_catalog.get_by_name(current_task_name)
+                if task:
+                    # ImageNameRobot falls back to ImageName in the catalog
+                    return {
+                        "task_name": current_task_name,
+                        "image_name": task.image_name_robot,
+                        "has_image": True
+                    }
             
             return {
                 "task_name": current_task_name,
@@ -521,7 +385,7 @@ async def get_current_robot_task_image():
 @app.post("/robot/reset")
 async def reset_robot_state():
     if ROBOT_CONNECTED:
-        robot_executor.reset()
+        robot_dispatcher.reset()
         dependency_manager.reset()
         return {"status": "success", "detail": "Robot state and dependency manager reset"}
     else:
@@ -537,7 +401,7 @@ async def reset_dependencies():
 async def reset_pause_waiting():
     """Reset the pause waiting time logic"""
     if ROBOT_CONNECTED:
-        robot_executor.pause_reset_flag = True
+        robot_dispatcher.reset_pause_waiting()
         return {"status": "success", "detail": "Pause waiting time reset flag set"}
     else:
         return {"status": "bypassed", "detail": "Pause waiting time reset simulated"}
@@ -545,7 +409,6 @@ async def reset_pause_waiting():
 
 
 # Save features
-SAVE_PATH = "participant_data.xlsx"
 
 class TaskRecord(BaseModel):
     taskName: str
@@ -562,31 +425,7 @@ class SaveRequest(BaseModel):
 @app.get("/participant-count")
 def participant_count():
     try:
-        # Check if log file exists
-        if not os.path.exists(LOG_FILE):
-            return {"count": 0}
-        
-        # Read the log file to get unique participant IDs
-        df = pd.read_excel(LOG_FILE)
-        
-        if df.empty:
-            return {"count": 0}
-        
-        # Get unique participant IDs (excluding header)
-        unique_participants = df['Participant ID'].dropna().unique()
-        
-        # Filter out non-participant entries (like "Robot")
-        valid_participants = [p for p in unique_participants if str(p).startswith('P') and str(p)[1:].isdigit()]
-        
-        # Get the highest participant number
-        if valid_participants:
-            participant_numbers = [int(str(p)[1:]) for p in valid_participants]
-            max_number = max(participant_numbers)
-            print(f"🔍 Debug: Found participants: {valid_participants}, max number: {max_number}")
-            return {"count": max_number}
-        else:
-            return {"count": 0}
-            
+        return {"count": participant_store.participant_count()}
     except Exception as e:
         print(f"❌ Error getting participant count: {e}")
         return {"count": 0}
@@ -595,33 +434,29 @@ def participant_count():
 @app.get("/previous-allocation")
 def get_previous_allocation():
     try:
-        print(f"🔍 Loading previous allocation from: {SAVE_PATH}")
-        
-        if not os.path.exists(SAVE_PATH):
-            print(f"❌ File not found: {SAVE_PATH}")
-            raise HTTPException(status_code=404, detail="participant_data.xlsx not found")
-
-        df = pd.read_excel(SAVE_PATH)
-        print(f"🔍 Excel file loaded, shape: {df.shape}")
-        print(f"🔍 Columns: {list(df.columns)}")
+        latest = participant_store.get_latest_allocation()
+        if latest is None:
+            if not os.path.exists(SAVE_PATH):
+                print(f"❌ File not found: {SAVE_PATH}")
+                raise HTTPException(status_code=404, detail="participant_data.xlsx not found")
+            raise HTTPException(status_code=404, detail="No valid previous allocations found")
 
-        if df.empty or len(df.columns) <= 3:
-            print(f"❌ No valid data found. Empty: {df.empty}, Columns: {len(df.columns)}")
+        header, last_row = latest
+        if len(header) <= 3:
+            print(f"❌ No valid data found. Columns: {len(header)}")
             raise HTTPException(status_code=404, detail="No valid previous allocations found")
 
-        last_row = df.iloc[-1]
-        print(f"🔍 Last row data: {last_row.to_dict()}")
+        print(f"🔍 Previous allocation: {last_row[0]}")
         tasks = []
 
         # Only iterate over task columns. The first 4 columns are metadata:
         # ["Participant ID", "Allocation Time", "Start Time", "Finish Time"]
-        for col in df.columns[4:]:
+        for col, raw in zip(header[4:], last_row[4:]):
             try:
-                value = float(last_row[col])
-                if not (0 <= value <= 10):  # Ensure it's within slider range
+                value = float("nan") if raw is None else float(raw)
+                if not (0 <= value <= 10):  # Ensure it's within slider range (also catches empty cells)
                     value = 5  # Default if invalid
                 assigned_to = "Human" if value <= 5 else "Robot"
-                print(f"🔍 Task: {col}, Value: {value}, Assigned: {assigned_to}")
             except (ValueError, TypeError):
                 value = 5
                 assigned_to = "Unassigned"
@@ -633,11 +468,6 @@ def get_previous_allocation():
                 "sliderValue": value
             })
 
-        # Filter out any invalid values
-        for t in tasks:
-            if t["sliderValue"] is None or t["sliderValue"] != t["sliderValue"]:  # Check NaN
-                t["sliderValue"] = 5
-
         print(f"✅ Loaded {len(tasks)} tasks from previous allocation")
         return tasks
 
@@ -671,62 +501,20 @@ def save_to_excel(data: SaveRequest):
             raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
         else:
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    if os.path.exists(SAVE_PATH):
-        wb = load_workbook(SAVE_PATH)
-        ws = wb.active
-    else:
-        wb = Workbook()
-        ws = wb.active
-        ws.append(["Participant ID", "Allocation Time", "Start Time", "Finish Time"])  # Header
 
-    # 🔹 Generate next available Participant ID if not provided
-    if not data.participantId:
-        next_id = f"P{ws.max_row}" if ws.max_row > 1 else "P1"
-    else:
-        next_id = data.participantId
-    
-    # Check & add any new task names to header
-    existing_headers = [cell.value for cell in ws[1]]
-    task_names = [t.taskName for t in data.tasks]
-    for name in task_names:
-        if name not in existing_headers:
-            ws.cell(row=1, column=len(existing_headers)+1, value=name)
-            existing_headers.append(name)
-
-    # Build the new row
-    row = [""] * len(existing_headers)
-    row[0] = next_id
-    row[1] = time.strftime("%H:%M:%S", time.localtime(data.allocationTime / 1000))
-    row[2] = time.strftime("%H:%M:%S", time.localtime(data.startTime / 1000))
-    row[3] = time.strftime("%H:%M:%S", time.localtime(data.finishTime / 1000))
-
-    for task in data.tasks:
-        idx = existing_headers.index(task.taskName)
-        row[idx] = task.allocationValue
-
-    ws.append(row)
-    wb.save(SAVE_PATH)
+    # Journaled right away; the workbook itself is rewritten in the background
+    meta_values = [
+        time.strftime("%H:%M:%S", time.localtime(data.allocationTime / 1000)),
+        time.strftime("%H:%M:%S", time.localtime(data.startTime / 1000)),
+        time.strftime("%H:%M:%S", time.localtime(data.finishTime / 1000)),
+    ]
+    task_values = {task.taskName: task.allocationValue for task in data.tasks}
+    next_id = allocation_writer.append(data.participantId, meta_values, task_values)
     return {"status": "success", "participantId": next_id}
 
 
 # Backend Logging
 from pydantic import BaseModel
-from openpyxl import Workbook, load_workbook
-from datetime import datetime
-from threading import Lock
-import re
-
-# Global variables
-log_lock = Lock()
-LOG_FILE = "Log.xlsx"
-
-# Helper function to find the next log filename
-def get_next_log_filename():
-    files = [f for f in os.listdir('.') if re.match(r'log_\d+\.xlsx$', f)]
-    if not files:
-        return "log_1.xlsx"
-    numbers = [int(re.search(r'log_(\d+)\.xlsx', f).group(1)) for f in files]
-    return f"log_{max(numbers)+1}.xlsx"
 
 # Pydantic model for logging event data
 class LogEvent(BaseModel):
@@ -736,58 +524,30 @@ class LogEvent(BaseModel):
 
 @app.post("/log-event")
 def log_event(data: LogEvent):
-    from openpyxl import Workbook, load_workbook
-    import shutil
-
-    with log_lock:  # Ensure single write access
-        try:
-            now = datetime.now()
-            time_readable = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            time_ms = int(now.timestamp() * 1000)
-
-            # Create log.xlsx if missing
-            if not os.path.exists(LOG_FILE):
-                wb = Workbook()
-                ws = wb.active
-                ws.append(["Participant ID", "Time (ms)", "Time (Readable)", "Event", "Details"])
-                wb.save(LOG_FILE)
-                wb.close()
-
-            # Open existing log
-            try:
-                wb = load_workbook(LOG_FILE)
-            except Exception as e:
-                print(f"❌ Log file corrupted: {e}. Starting fresh.")
-                wb = Workbook()
-                ws = wb.active
-                ws.append(["Participant ID", "Time (ms)", "Time (Readable)", "Event", "Details"])
-                wb.save(LOG_FILE)
-                wb.close()
-                wb = load_workbook(LOG_FILE)
-
-            ws = wb.active
-            ws.append([data.participantId, time_ms, time_readable, data.event, str(data.details)])
-            wb.save(LOG_FILE)
-
-            # Check for rotation
-            if ws.max_row > 100:  # Rotate after 100 entries
-                new_filename = get_next_log_filename()
-                shutil.move(LOG_FILE, new_filename)
-                print(f"ℹ Log rotated: {new_filename}")
-
-                # Start new log.xlsx
-                wb_new = Workbook()
-                ws_new = wb_new.active
-                ws_new.append(["Participant ID", "Time (ms)", "Time (Readable)", "Event", "Details"])
-                wb_new.save(LOG_FILE)
-                wb_new.close()
+    """Queue the event for the background writer; returns without touching the disk"""
+    try:
+        event_log.log(data.participantId, data.event, data.details)
+        return {"status": "logged"}
+    except Exception as e:
+        print("❌ Error logging event:", e)
+        raise HTTPException(status_code=500, detail=f"Failed to log event: {e}")
 
-            wb.close()
-            return {"status": "logged"}
+@app.get("/export-log")
+def export_log():
+    """Export the whole event log to Log.xlsx and download it"""
+    try:
+        event_log.export_xlsx(LOG_XLSX_FILE)
+        return FileResponse(LOG_XLSX_FILE, filename=LOG_XLSX_FILE,
+                            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    except Exception as e:
+        print("❌ Error exporting event log:", e)
+        raise HTTPException(status_code=500, detail=f"Failed to export event log: {e}")
 
-        except Exception as e:
-            print("❌ Error logging event:", e)
-            raise HTTPException(status_code=500, detail=f"Failed to log event: {e}")
+@app.on_event("shutdown")
+def flush_pending_writes():
+    event_log.close()
+    allocation_writer.close()
+    robot_session.close()
 
 @app.post("/save-participant-order")
 def save_participant_order(data: dict):
@@ -810,7 +570,8 @@ def save_participant_order(data: dict):
         if task_mode != "First: Yellow":
             return {"status": "skipped", "reason": "Not yellow mode"}
         
-        filename = "Participant_order.xlsx"
+        filename = ORDER_PATH
+        signature_before = participant_store.order_file_signature()
         
         # Create file if it doesn't exist
         if not os.path.exists(filename):
@@ -838,6 +599,7 @@ def save_participant_order(data: dict):
         ws.append(row_data)
         wb.save(filename)
         wb.close()
+        participant_store.record_participant_order(row_data, signature_before)
         
         print(f"✅ Saved participant block order for {participant_id}: {[b.get('name', '') for b in block_order]}")
         return {"status": "saved", "participant_id": participant_id, "block_count": len(block_order)}
@@ -849,29 +611,15 @@ def save_participant_order(data: dict):
 @app.get("/get-most-recent-participant")
 def get_most_recent_participant():
     """Get the most recent participant ID from the Participant_order.xlsx file"""
-    from openpyxl import load_workbook
-    
     try:
-        filename = "Participant_order.xlsx"
-        
-        if not os.path.exists(filename):
+        if not os.path.exists(ORDER_PATH):
             raise HTTPException(status_code=404, detail="Participant order file not found")
         
-        # Open existing file
-        wb = load_workbook(filename)
-        ws = wb.active
-        
-        # Find the last row with data (most recent participant)
-        last_row = ws.max_row
-        while last_row > 1:  # Skip header row
-            participant_id = ws.cell(row=last_row, column=1).value
-            if participant_id and str(participant_id).strip():
-                wb.close()
-                return {"participant_id": str(participant_id).strip()}
-            last_row -= 1
-        
-        wb.close()
-        raise HTTPException(status_code=404, detail="No participant data found")
+        # Served from the index kept by /save-participant-order
+        participant_id = participant_store.get_last_participant()
+        if participant_id is None:
+            raise HTTPException(status_code=404, detail="No participant data found")
+        return {"participant_id": participant_id}
         
     except HTTPException:
         raise
@@ -882,54 +630,27 @@ def get_most_recent_participant():
 @app.get("/load-participant-order/{participant_id}")
 def load_participant_order(participant_id: str):
     """Load participant block order from Excel file - finds the last Yellow mode row"""
-    from openpyxl import load_workbook
-    
     try:
-        filename = "Participant_order.xlsx"
-        
         print(f"🔍 Loading block order from last Yellow mode row (ignoring participant_id: {participant_id})")
-        print(f"🔍 Looking for file: {filename}")
         
-        if not os.path.exists(filename):
-            print(f"❌ File not found: {filename}")
+        if not os.path.exists(ORDER_PATH):
+            print(f"❌ File not found: {ORDER_PATH}")
             raise HTTPException(status_code=404, detail="Participant order file not found")
         
-        # Open existing file
-        wb = load_workbook(filename)
-        ws = wb.active
-        
-        print(f"🔍 Excel file opened, max row: {ws.max_row}, max column: {ws.max_column}")
-        
-        # Find the last row with "Yellow" mode in the second column
-        participant_row = None
-        for row_num in range(ws.max_row, 1, -1):  # Start from last row and go backwards, skip header
-            row = list(ws.iter_rows(min_row=row_num, max_row=row_num, values_only=True))[0]
-            print(f"🔍 Checking row {row_num}: {row}")
-            
-            # Check if the second column (index 1) contains "Yellow"
-            if len(row) > 1 and row[1] == "Yellow":
-                participant_row = row
-                print(f"✅ Found Yellow mode row: {participant_row}")
-                break
-        
+        # Last row with "Yellow" mode in the second column, from the index
+        participant_row = participant_store.get_last_yellow_order()
         if participant_row is None:
             print(f"❌ No Yellow mode row found in Excel file")
             raise HTTPException(status_code=404, detail="No Yellow mode data found")
         
         # Extract block names (skip first two columns: participant ID and mode)
         block_names = []
-        print(f"🔍 Extracting block names from row: {participant_row}")
-        for i in range(2, len(participant_row)):  # Start from index 2 to skip participant ID and mode
-            cell_value = participant_row[i]
-            print(f"🔍 Column {i}: '{cell_value}'")
+        for cell_value in participant_row[2:]:
             if cell_value and str(cell_value).strip():  # Check if cell is not empty
                 block_names.append(str(cell_value).strip())
             else:
-                print(f"🔍 Empty cell at column {i}, stopping extraction")
                 break  # Stop at first empty cell
         
-        wb.close()
-        
         print(f"✅ Loaded block order from Yellow mode: {block_names}")
         return {"status": "loaded", "participant_id": participant_id, "block_order": block_names}
         
@@ -942,15 +663,41 @@ def load_participant_order(participant_id: str):
 @app.post("/robot/set_mode")
 async def set_robot_mode(mode: str = Body(..., embed=True)):
     if mode.lower() == "orange":
-        robot_executor.orange_mode = True
+        robot_dispatcher.set_orange_mode(True)
         print("🟠 Robot mode set to ORANGE")
     else:
-        robot_executor.orange_mode = False
+        robot_dispatcher.set_orange_mode(False)
         print("🟡 Robot mode set to YELLOW")
     return {"status": "success", "orange_mode": robot_executor.orange_mode}
 
 
 
+@app.post("/robot/completion_mode")
+async def set_robot_completion_mode(mode: str = Body(..., embed=True)):
+    """Select program completion detection: "rtde" (runtime_state stream) or "dashboard" (programState polling)"""
+    try:
+        robot_dispatcher.set_completion_mode(mode.lower())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "completion_mode": robot_executor.completion_mode}
+
+
+@app.get("/robot/dispatch_mode")
+async def get_robot_dispatch_mode():
+    return {"dispatch_mode": robot_dispatcher.mode, "cells": [e.name for e in robot_dispatcher.active_executors()]}
+
+
+@app.post("/robot/dispatch_mode")
+async def set_robot_dispatch_mode(mode: str = Body(..., embed=True)):
+    """Select "single" (primary robot, queue in order) or "multi" (ready tasks go to any idle robot cell)"""
+    try:
+        robot_dispatcher.set_mode(mode.lower())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "dispatch_mode": robot_dispatcher.mode,
+            "cells": [e.name for e in robot_dispatcher.active_executors()]}
+
+
 @app.post("/robot/start")
 async def start_robot_tasks(request: Request):
     data = await request.json()
@@ -963,18 +710,23 @@ async def start_robot_tasks(request: Request):
     print(f"🔍 Debug - Robot tasks: {[t.get('name', 'Unknown') for t in robot_tasks]}")
     print(f"🔍 Debug - Robot codes: {[t.get('RobotCode', 'Unknown') for t in robot_tasks]}")
 
+    # Refuse to run ungated tasks while tasks.xlsx has a dependency cycle
+    dependency_manager.load_dependencies()
+    if dependency_manager.load_error is not None:
+        raise HTTPException(status_code=400, detail=f"Invalid task dependencies: {dependency_manager.load_error}")
+
     for task in robot_tasks:
-        robot_executor.add_task(task["RobotCode"])
+        robot_dispatcher.add_task(task["RobotCode"])
 
     # Start processing tasks (this will begin dependency checking and execution)
-    robot_executor.start_processing()
+    robot_dispatcher.start_processing()
 
     return {"status": "success", "queued_tasks": [t["RobotCode"] for t in robot_tasks]}
 
 
 @app.get("/robot/all_completed")
 async def robot_all_completed():
-    return {"all_completed": robot_executor.all_tasks_completed}
+    return {"all_completed": robot_dispatcher.all_tasks_completed()}
 
 @app.post("/robot/initialize")
 async def initialize_robot(request: Request):
@@ -1004,36 +756,35 @@ async def initialize_robot(request: Request):
             joint_positions = [-79.98, -91.20, -87.97, -91.69, 84.67, 815.51]
             task_type = "default"
         
-        # Send joint positions to robot using multiple methods
-        from urp_trigger import send_joint_positions_improved, send_joint_positions_urbasic, send_joint_positions_urbasic_simple, activate_gripper, test_robot_connection_detailed, check_robot_state, ROBOT_IP
+        # Robot I/O runs on the event loop (robot_io) so other requests are served meanwhile
+        from urp_trigger import send_joint_positions_urbasic, send_joint_positions_urbasic_simple, ROBOT_IP
         
         # Test robot connection first with detailed diagnostics
-        if not test_robot_connection_detailed():
+        if not await robot_io.test_connection():
             return {"status": "error", "message": f"Robot connection test failed at {ROBOT_IP}. Check console for detailed diagnostics."}
         
         # Check robot state
         print("🔍 Checking robot state before sending commands...")
-        check_robot_state()
+        await robot_io.check_robot_state()
         
-        # Try URBasic method first (most reliable)
-        print("🔧 Attempting movement via URBasic...")
-        success = send_joint_positions_urbasic(joint_positions)
+        # movej over the secondary interface, confirmed from the realtime joint stream
+        print("🔧 Attempting movement via the secondary interface...")
+        success = await robot_io.movej(joint_positions)
         
-        # If URBasic fails, try simple URBasic
+        # Fall back to the (blocking) URBasic methods in a worker thread
         if not success:
-            print("🔧 URBasic failed, trying simple URBasic...")
-            success = send_joint_positions_urbasic_simple(joint_positions)
+            print("🔧 Secondary interface failed, trying URBasic...")
+            success = await asyncio.to_thread(send_joint_positions_urbasic, joint_positions)
         
-        # If both URBasic methods fail, try socket method
         if not success:
-            print("🔧 URBasic methods failed, trying socket method...")
-            success = send_joint_positions_improved(joint_positions)
+            print("🔧 URBasic failed, trying simple URBasic...")
+            success = await asyncio.to_thread(send_joint_positions_urbasic_simple, joint_positions)
         
         if not success:
             return {"status": "error", "message": "All movement methods failed. Check robot connection and try again."}
         
         # Activate gripper
-        gripper_success = activate_gripper()
+        gripper_success = await robot_io.activate_gripper()
         if not gripper_success:
             print("⚠️ Warning: Failed to activate gripper")
         
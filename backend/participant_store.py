@@ -0,0 +1,235 @@
+import os
+import re
+import threading
+
+from event_log import event_log
+
+SAVE_PATH = "participant_data.xlsx"
+ORDER_PATH = "Participant_order.xlsx"
+PARTICIPANT_ID_PATTERN = re.compile(r"^P(\d+)$")
+
+
+def participant_number(participant_id):
+    """Return N for a participant ID "PN", None for anything else (e.g. "Robot")"""
+    match = PARTICIPANT_ID_PATTERN.match(str(participant_id).strip()) if participant_id is not None else None
+    return int(match.group(1)) if match else None
+
+
+def _file_signature(path):
+    """(mtime, size) of a file, None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class ParticipantStore:
+    """
+    In-memory index over the study records so lookups don't re-read the files:
+      - participant numbers seen in the event log (kept current through an event_log
+        listener), answering /participant-count with the highest number
+      - allocation rows of participant_data.xlsx by participant ID plus a pointer to
+        the latest row, answering /previous-allocation
+      - the last participant and the last Yellow row of Participant_order.xlsx,
+        answering /get-most-recent-participant and /load-participant-order
+    The xlsx files stay the storage/export format; each is re-indexed in one streaming
+    pass only when it was changed by someone other than the record_*() methods.
+    Allocation rows still waiting in the AllocationWriter journal are kept as an
+    overlay on top of the workbook until allocation_file_written() confirms them.
+    """
+
+    def __init__(self, allocation_path=SAVE_PATH, order_path=ORDER_PATH):
+        self.allocation_path = allocation_path
+        self.order_path = order_path
+        self.lock = threading.RLock()
+        self.participants = None  # participant number -> participant ID, built on first use
+        self.max_number = 0
+        self.allocation_header = []
+        self.allocations = {}  # participant ID -> row (list of cell values)
+        self.latest_allocation = None
+        self.unsaved_allocations = []  # (header, row) recorded but not yet in the workbook
+        self._allocation_signature = None
+        self.last_participant_id = None
+        self.last_yellow_order = None  # Last row with mode "Yellow"
+        self._order_signature = None
+        event_log.add_listener(self._on_event)
+
+    # ---- Participants ------------------------------------------------------
+
+    def _on_event(self, record):
+        with self.lock:
+            if self.participants is not None:
+                self._add_participant(record.get("participantId"))
+
+    def _add_participant(self, participant_id):
+        number = participant_number(participant_id)
+        if number is None:
+            return
+        self.participants[number] = str(participant_id).strip()
+        if number > self.max_number:
+            self.max_number = number
+
+    def _ensure_participants(self):
+        if self.participants is not None:
+            return
+        with self.lock:
+            if self.participants is not None:
+                return
+            self.participants = {}
+            for record in event_log.read_events():
+                self._add_participant(record.get("participantId"))
+            print(f"📇 Indexed {len(self.participants)} participants from the event log")
+
+    def participant_count(self):
+        """Highest participant number seen so far (0 if none)"""
+        self._ensure_participants()
+        return self.max_number
+
+    # ---- Allocations -------------------------------------------------------
+
+    def file_signature(self):
+        """(mtime, size) of the allocation workbook, None if it doesn't exist"""
+        return _file_signature(self.allocation_path)
+
+    def _ensure_allocations(self):
+        signature = self.file_signature()
+        if signature == self._allocation_signature:
+            return
+        with self.lock:
+            if signature != self._allocation_signature:
+                self._load_allocations(signature)
+
+    def _load_allocations(self, signature):
+        self.allocation_header = []
+        self.allocations = {}
+        self.latest_allocation = None
+        self._allocation_signature = signature
+        if signature is not None:
+            from openpyxl import load_workbook
+
+            wb = load_workbook(self.allocation_path, read_only=True)
+            try:
+                rows = wb.active.iter_rows(values_only=True)
+                self.allocation_header = [cell for cell in next(rows, ())]
+                for row in rows:
+                    if not row or all(cell in (None, "") for cell in row):
+                        continue
+                    self._index_allocation(list(row))
+            finally:
+                wb.close()
+            print(f"📇 Indexed {len(self.allocations)} allocations from {self.allocation_path}")
+
+        for header, row in self.unsaved_allocations:
+            if len(header) > len(self.allocation_header):
+                self.allocation_header = list(header)
+            self._index_allocation(list(row))
+
+    def _index_allocation(self, row):
+        row = [None if cell == "" else cell for cell in row]
+        row += [None] * (len(self.allocation_header) - len(row))
+        if row[0] is not None:
+            self.allocations[str(row[0]).strip()] = row
+        self.latest_allocation = row
+
+    def record_allocation(self, header, row):
+        """Called by the AllocationWriter when a row is journaled (before it reaches the workbook)"""
+        with self.lock:
+            self._ensure_allocations()
+            self.unsaved_allocations.append((list(header), list(row)))
+            self.allocation_header = list(header)
+            self._index_allocation(list(row))
+
+    def allocation_file_written(self, signature_before, row_count):
+        """
+        Called after the AllocationWriter appended the oldest row_count unsaved rows to
+        the workbook. signature_before is file_signature() from before the write; if the
+        index did not match the file at that point it is rebuilt on the next lookup.
+        """
+        with self.lock:
+            del self.unsaved_allocations[:row_count]
+            if signature_before == self._allocation_signature:
+                self._allocation_signature = self.file_signature()
+            else:
+                self._allocation_signature = "stale"
+
+    def get_latest_allocation(self):
+        """(header, row) of the most recently saved allocation, or None"""
+        self._ensure_allocations()
+        with self.lock:
+            if self.latest_allocation is None:
+                return None
+            return list(self.allocation_header), list(self.latest_allocation)
+
+    def get_allocation(self, participant_id):
+        """(header, row) saved for a participant, or None"""
+        self._ensure_allocations()
+        with self.lock:
+            row = self.allocations.get(str(participant_id).strip())
+            if row is None:
+                return None
+            return list(self.allocation_header), list(row)
+
+    # ---- Participant block order ------------------------------------------
+
+    def order_file_signature(self):
+        """(mtime, size) of the participant order workbook, None if it doesn't exist"""
+        return _file_signature(self.order_path)
+
+    def _ensure_order_index(self):
+        signature = self.order_file_signature()
+        if signature == self._order_signature:
+            return
+        with self.lock:
+            if signature != self._order_signature:
+                self._load_order_index(signature)
+
+    def _load_order_index(self, signature):
+        """Streaming read-only pass that keeps the last matching rows"""
+        self.last_participant_id = None
+        self.last_yellow_order = None
+        self._order_signature = signature
+        if signature is None:
+            return
+
+        from openpyxl import load_workbook
+
+        wb = load_workbook(self.order_path, read_only=True)
+        try:
+            for row in wb.active.iter_rows(min_row=2, values_only=True):
+                self._index_order(row)
+        finally:
+            wb.close()
+        print(f"📇 Indexed {self.order_path}: last participant {self.last_participant_id}")
+
+    def _index_order(self, row):
+        if not row:
+            return
+        participant_id = row[0]
+        if participant_id is not None and str(participant_id).strip():
+            self.last_participant_id = str(participant_id).strip()
+        if len(row) > 1 and row[1] == "Yellow":
+            self.last_yellow_order = list(row)
+
+    def record_participant_order(self, row, signature_before):
+        """Called after a row was appended to the participant order workbook"""
+        with self.lock:
+            if signature_before != self._order_signature:
+                self._order_signature = "stale"
+                return
+            self._index_order(row)
+            self._order_signature = self.order_file_signature()
+
+    def get_last_participant(self):
+        """Most recent participant ID in the participant order workbook, or None"""
+        self._ensure_order_index()
+        return self.last_participant_id
+
+    def get_last_yellow_order(self):
+        """Most recent row saved in Yellow mode, or None"""
+        self._ensure_order_index()
+        with self.lock:
+            return list(self.last_yellow_order) if self.last_yellow_order is not None else None
+
+
+participant_store = ParticipantStore()
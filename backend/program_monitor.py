@@ -0,0 +1,103 @@
+import threading
+import time
+
+# RTDE runtime_state values
+RUNTIME_STOPPING = 0
+RUNTIME_STOPPED = 1
+RUNTIME_PLAYING = 2
+RUNTIME_PAUSING = 3
+RUNTIME_PAUSED = 4
+RUNTIME_RESUMING = 5
+
+RUNTIME_STATE_NAMES = {
+    RUNTIME_STOPPING: "STOPPING",
+    RUNTIME_STOPPED: "STOPPED",
+    RUNTIME_PLAYING: "PLAYING",
+    RUNTIME_PAUSING: "PAUSING",
+    RUNTIME_PAUSED: "PAUSED",
+    RUNTIME_RESUMING: "RESUMING",
+}
+
+STALE_SAMPLE_TIMEOUT = 0.5  # Seconds without an RTDE package before the stream is considered down
+
+
+class ProgramStateMonitor:
+    """
+    Follows the program runtime_state streamed by URBasic's RTDE receiver (125 Hz / 500 Hz)
+    and signals program completion on the first PLAYING -> STOPPED transition after arm().
+    Only a transition into PLAYING counts as the armed program running, so the previous
+    program winding down (STOPPING -> STOPPED) cannot complete it.
+    Replaces polling the dashboard programState every 0.5 s.
+    """
+
+    def __init__(self, host, conf_filename=None):
+        self.host = host
+        self.conf_filename = conf_filename
+        self.rtde = None
+        self.condition = threading.Condition()
+        self.runtime_state = None
+        self.last_sample_time = None
+        self.seen_running = False  # Program entered PLAYING since arm()
+        self.finished = False      # Program returned to STOPPED after running
+        self.finished_time = None
+
+    def start(self):
+        """Connect the RTDE receiver (lazily, only once)"""
+        if self.rtde is not None:
+            return
+        import URBasic
+
+        robot_model = URBasic.robotModel.RobotModel()
+        robot_model.ipAddress = self.host
+        self.rtde = URBasic.rtde.RTDE(robot_model, self.conf_filename)
+        self.rtde.addDataListener(self._on_package)
+        print(f"📡 RTDE program monitor connecting to {self.host}")
+
+    def close(self):
+        if self.rtde is not None:
+            self.rtde.removeDataListener(self._on_package)
+            self.rtde.close()
+            self.rtde = None
+
+    def is_streaming(self):
+        """True when RTDE packages are arriving"""
+        last = self.last_sample_time
+        return last is not None and time.monotonic() - last < STALE_SAMPLE_TIMEOUT
+
+    def state_name(self):
+        return RUNTIME_STATE_NAMES.get(self.runtime_state, str(self.runtime_state))
+
+    def _on_package(self, package):
+        """Called from the RTDE receive thread for every data package"""
+        state = package.get("runtime_state")
+        if state is None:
+            return
+        with self.condition:
+            self.last_sample_time = time.monotonic()
+            if state == self.runtime_state:
+                return
+            self.runtime_state = state
+            if state == RUNTIME_PLAYING:
+                self.seen_running = True
+            elif state == RUNTIME_STOPPED and self.seen_running and not self.finished:
+                # PAUSING/PAUSED/RESUMING (UI Pause button) keep the program running
+                self.finished = True
+                self.finished_time = time.perf_counter()
+            self.condition.notify_all()
+
+    def arm(self):
+        """Start watching for the next program run; call after the stop/load and just before sending play"""
+        with self.condition:
+            self.seen_running = False
+            self.finished = False
+            self.finished_time = None
+
+    def wait_for_completion(self, timeout):
+        """Block until the armed program has stopped; returns True if it did within timeout"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.finished, timeout)
+
+    def wait_for_start(self, timeout):
+        """Block until the armed program is PLAYING; returns True if it did within timeout"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.seen_running, timeout)
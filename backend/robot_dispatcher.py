@@ -0,0 +1,184 @@
+import threading
+from dataclasses import dataclass
+
+from dependency_manager import dependency_manager
+from robot_executor import RobotExecutor, robot_executor
+from task_catalog import task_catalog
+from urp_trigger import PROGRAM_FOLDER
+
+DISPATCH_MODES = ("single", "multi")
+
+
+@dataclass
+class RobotCell:
+    name: str
+    host: str
+    program_folder: str = PROGRAM_FOLDER
+
+
+# UR cells that run the same task catalog next to the primary robot (ROBOT_IP), e.g.
+# RobotCell("Cell 2", "192.168.1.16"). Only used in "multi" dispatch mode.
+EXTRA_ROBOT_CELLS = []
+
+
+class RobotDispatcher:
+    """
+    Front for the robot executors, one per UR cell (each with its own dashboard
+    connection, RTDE monitor and program folder):
+      "single" - only the primary robot_executor runs, working through its queue in
+                 order (default, the study setup)
+      "multi"  - robot tasks go into one shared pool; every idle cell claims the first
+                 pooled task whose dependencies are met, so independent tasks run in
+                 parallel. Idle cells are woken when the dependency DAG reports newly
+                 ready tasks.
+    """
+
+    def __init__(self, primary, cells=EXTRA_ROBOT_CELLS):
+        self.primary = primary
+        self.cells = list(cells)
+        self.executors = [primary]
+        self.mode = "single"
+        self.pending = []  # URP names not yet claimed by a cell (multi mode)
+        self.lock = threading.Lock()
+        dependency_manager.add_ready_listener(self._on_tasks_ready)
+
+    def set_mode(self, mode):
+        """Switch between "single" and "multi"; only allowed while no robot task is queued or running"""
+        if mode not in DISPATCH_MODES:
+            raise ValueError(f"Unknown dispatch mode '{mode}', expected one of {DISPATCH_MODES}")
+        if mode == self.mode:
+            return
+        if self.pending or any(e.queue or e.is_running for e in self.executors):
+            raise ValueError("Cannot change dispatch mode while robot tasks are queued or running")
+
+        if mode == "multi":
+            if len(self.executors) == 1:
+                for cell in self.cells:
+                    self.executors.append(RobotExecutor(cell.name, cell.host, cell.program_folder, f"robot:{cell.name}"))
+            for executor in self.executors:
+                executor.dispatcher = self
+                executor.orange_mode = self.primary.orange_mode
+                executor.completion_mode = self.primary.completion_mode
+        else:
+            for executor in self.executors:
+                executor.dispatcher = None
+        self.mode = mode
+        print(f"🔧 Robot dispatch mode: {mode} ({len(self.active_executors())} cell(s))")
+
+    def active_executors(self):
+        return self.executors if self.mode == "multi" else [self.primary]
+
+    # ---- Shared pool (called by the executors in multi mode) -----------------
+
+    @staticmethod
+    def _task_name(urp_name):
+        return task_catalog.robot_task_names().get(urp_name.lower(), urp_name)
+
+    def has_ready_task(self):
+        with self.lock:
+            return any(dependency_manager.is_ready(self._task_name(urp)) for urp in self.pending)
+
+    def claim(self, executor):
+        """Remove and return the first pooled task whose dependencies are met, None if there is none"""
+        with self.lock:
+            for i, urp_name in enumerate(self.pending):
+                if dependency_manager.is_ready(self._task_name(urp_name)):
+                    del self.pending[i]
+                    print(f"📤 {executor.name} claimed task: {urp_name}")
+                    return urp_name
+            return None
+
+    def peek(self):
+        """First pooled task (the likeliest next one), None if the pool is empty"""
+        with self.lock:
+            return self.pending[0] if self.pending else None
+
+    def requeue(self, urp_name, front=False):
+        """Put a failed task back at the end of the pool (front=True: at the head, e.g. one that never ran)"""
+        with self.lock:
+            if front:
+                self.pending.insert(0, urp_name)
+            else:
+                self.pending.append(urp_name)
+        self._wake_all()
+
+    def all_done(self):
+        with self.lock:
+            if self.pending:
+                return False
+        return not any(e.is_running for e in self.executors)
+
+    def _on_tasks_ready(self, task_names):
+        if self.mode == "multi":
+            self._wake_all()
+
+    def _wake_all(self):
+        for executor in self.active_executors():
+            executor.wake()
+
+    # ---- Controls used by the API --------------------------------------------
+
+    def add_task(self, urp_name):
+        if self.mode != "multi":
+            self.primary.add_task(urp_name)
+            return
+        with self.lock:
+            self.pending.append(urp_name)
+            print(f"🧾 Added task to pool: {urp_name} (pool: {self.pending})")
+        for executor in self.executors:
+            executor.all_tasks_completed = False
+        self._wake_all()
+
+    def start_processing(self):
+        for executor in self.active_executors():
+            executor.start_processing()
+
+    def pause_processing(self):
+        for executor in self.active_executors():
+            executor.pause_processing()
+
+    def resume_processing(self):
+        for executor in self.active_executors():
+            executor.resume_processing()
+
+    def reset(self):
+        with self.lock:
+            self.pending = []
+        for executor in self.executors:
+            executor.reset()
+
+    def reset_pause_waiting(self):
+        for executor in self.active_executors():
+            executor.pause_reset_flag = True
+            executor.wake()
+
+    def set_orange_mode(self, orange_mode):
+        for executor in self.executors:
+            executor.orange_mode = orange_mode
+            executor.publish_state()
+
+    def set_completion_mode(self, mode):
+        for executor in self.active_executors():
+            executor.set_completion_mode(mode)
+        for executor in self.executors:
+            executor.completion_mode = mode
+
+    def all_tasks_completed(self):
+        if self.mode != "multi":
+            return self.primary.all_tasks_completed
+        return self.all_done() and any(e.all_tasks_completed for e in self.executors)
+
+    def get_state(self):
+        """Primary robot state plus the dispatch mode and, in multi mode, every cell's state"""
+        state = self.primary.get_state()
+        state["dispatch_mode"] = self.mode
+        if self.mode == "multi":
+            with self.lock:
+                state["queue"] = list(self.pending)
+                state["queue_length"] = len(self.pending)
+            state["all_tasks_completed"] = self.all_tasks_completed()
+            state["cells"] = [dict(e.get_state(), name=e.name, host=e.host) for e in self.executors]
+        return state
+
+
+robot_dispatcher = RobotDispatcher(robot_executor)
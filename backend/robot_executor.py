@@ -1,31 +1,87 @@
 import threading
 import time
-import pandas as pd
-from urp_trigger import send_dashboard_command, trigger_urp_program
+from dependency_manager import dependency_manager
+from event_log import event_log
+from state_stream import state_stream
+from task_catalog import task_catalog
+from dashboard_client import DashboardClient
+from program_monitor import ProgramStateMonitor
+from urp_trigger import PROGRAM_FOLDER, ROBOT_IP, dashboard, prefetch_program, send_dashboard_command, trigger_urp_program
+
+COMPLETION_MODES = ("rtde", "dashboard")
 
 
 class RobotExecutor:
-    def __init__(self):
+    def __init__(self, name="Robot", host=ROBOT_IP, program_folder=PROGRAM_FOLDER, state_section="robot"):
+        self.name = name
+        self.host = host
+        self.program_folder = program_folder
+        self.state_section = state_section  # state_stream section this executor publishes to
+        self.dashboard = dashboard if host == ROBOT_IP else DashboardClient(host)
+        self.dispatcher = None  # Set by RobotDispatcher in multi-cell mode: tasks come from its shared pool
         self.queue = []
         self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)  # Wakes the worker when there may be work
         self.is_running = False
         self.current_task = None
-        self.worker_thread = threading.Thread(target=self.worker_loop)
-        self.worker_thread.daemon = True
-        self.worker_thread.start()
         self.executed_tasks = []
         self.orange_mode = False
         self.all_tasks_completed = False
-        self.robot_message = ""
+        self._robot_message = ""
         self.task_mapping = {}  # Map URP names to task names
         self.current_task_name = None  # Store the actual task name for UI
         self.last_activity_time = time.time()  # Track last activity
         self.stuck_timeout = 60  # 60 seconds to detect stuck robot
         self.started = False  # Flag to control when robot starts processing tasks
         self.task_times = {}  # Cache for Time_Robot values
-        self.execution_message = "Robot idle."  # Track execution-specific messages
+        self._execution_message = "Robot idle."  # Track execution-specific messages
         self.pause_reset_flag = False  # Flag to reset pause waiting time
+        self.reset_generation = 0  # Bumped by reset(); work taken before a reset is dropped
+        self.wake_time = time.perf_counter()  # When the worker was last signalled
+        self.dispatch_count = 0
+        self.last_dispatch_latency = None  # Seconds from wake-up signal to task dispatch
+        self.max_dispatch_latency = 0.0
+        self.total_dispatch_latency = 0.0
+        self.last_launch_timings = {}  # Per-stage durations of the last program launch
+        self.completion_mode = "rtde"  # "rtde": runtime_state stream, "dashboard": programState polling
+        self.program_monitor = ProgramStateMonitor(host)
+        self.publish_state()
+        self.worker_thread = threading.Thread(target=self.worker_loop, name=f"RobotExecutor-{name}")
+        self.worker_thread.daemon = True
+        self.worker_thread.start()
 
+    @property
+    def robot_message(self):
+        return self._robot_message
+
+    @robot_message.setter
+    def robot_message(self, value):
+        self._robot_message = value
+        self.publish_state()
+
+    @property
+    def execution_message(self):
+        return self._execution_message
+
+    @execution_message.setter
+    def execution_message(self, value):
+        self._execution_message = value
+        self.publish_state()
+
+    def publish_state(self):
+        """Push the current executor state to event stream subscribers (only changed fields are sent)"""
+        state_stream.publish(self.state_section, {
+            "message": self._robot_message,
+            "executionMessage": self._execution_message,
+            "state": "RUNNING" if self.is_running else "IDLE",
+            "current_task": self.current_task,
+            "current_task_name": self.current_task_name,
+            "queue": list(self.queue),
+            "executed_tasks": list(self.executed_tasks),
+            "started": self.started,
+            "orange_mode": self.orange_mode,
+            "all_tasks_completed": self.all_tasks_completed,
+        })
 
     def reset(self):
         with self.lock:
@@ -40,8 +96,11 @@ class RobotExecutor:
             self.execution_message = "Robot idle."
             self.started = False
             self.pause_reset_flag = True  # Set flag to reset pause waiting time
+            self.reset_generation += 1
             self.all_tasks_completed = False  # Reset completion flag
             self.orange_mode = False  # Reset orange mode flag
+            self._notify()
+        self.publish_state()
         print("🔄 Robot executor fully reset.")
 
 
@@ -54,6 +113,23 @@ class RobotExecutor:
             print(f"🧾 Queue length: {len(self.queue)}")
             print(f"🧾 Orange mode: {self.orange_mode}")
             print(f"🧾 Started flag: {self.started}")
+            self._notify()
+        self.publish_state()
+
+    def _notify(self):
+        """Wake the worker; caller must hold self.lock"""
+        self.wake_time = time.perf_counter()
+        self.condition.notify_all()
+
+    def wake(self):
+        """Wake the worker from outside (e.g. a dependency was completed or the pause flag was reset)"""
+        with self.condition:
+            self._notify()
+
+    def wait_for_wake(self, timeout):
+        """Sleep for up to timeout seconds, returning early when the worker is woken"""
+        with self.condition:
+            self.condition.wait(timeout)
 
     def start_processing(self):
         """Start processing tasks (called when Start button is pressed)"""
@@ -62,42 +138,52 @@ class RobotExecutor:
             self.robot_message = "Robot processing started - checking dependencies..."
             self.execution_message = "🚀 Robot processing started..."
             print("🚀 Robot processing started!")
+            self._notify()
+        # Connect RTDE now so the stream is live by the time the first program is played
+        self.start_program_monitor()
+
+    def set_completion_mode(self, mode):
+        """Select how program completion is detected ("rtde" or "dashboard")"""
+        if mode not in COMPLETION_MODES:
+            raise ValueError(f"Unknown completion mode '{mode}', expected one of {COMPLETION_MODES}")
+        self.completion_mode = mode
+        print(f"🔧 Program completion detection mode: {mode}")
+        self.start_program_monitor()
+
+    def start_program_monitor(self):
+        """Start the RTDE program monitor if RTDE completion detection is selected"""
+        if self.completion_mode != "rtde":
+            return
+        try:
+            self.program_monitor.start()
+        except Exception as e:
+            print(f"⚠️ Could not start RTDE program monitor, using dashboard polling: {e}")
 
     def pause_processing(self):
         """Pause processing tasks"""
         with self.lock:
             self.started = False
             print("⏸️ Robot processing paused!")
+            self._notify()
+        self.publish_state()
 
     def resume_processing(self):
         """Resume processing tasks"""
         with self.lock:
             self.started = True
             print("▶️ Robot processing resumed!")
+            self._notify()
+        self.publish_state()
 
     def load_task_mapping(self):
-        """Load mapping between URP names and task names from Excel"""
-        try:
-            df = pd.read_excel("tasks.xlsx")
-            for _, row in df.iterrows():
-                robot_code = str(row["RobotCode"]).strip()
-                task_name = str(row["TaskName"]).strip()
-                time_robot = int(row["Time_Robot"]) if pd.notna(row["Time_Robot"]) else 30
-                
-                if robot_code.lower() != "cannot":
-                    self.task_mapping[robot_code.lower()] = task_name
-                    self.task_times[robot_code.lower()] = time_robot
-                    self.task_times[task_name.lower()] = time_robot  # Also map by task name
-                    
-            print(f"📋 Loaded task mapping: {self.task_mapping}")
-            print(f"⏱️ Loaded task times: {self.task_times}")
-        except Exception as e:
-            print(f"❌ Error loading task mapping: {e}")
+        """Load mapping between URP names and task names from the task catalog"""
+        self.task_mapping = task_catalog.robot_task_names()
+        self.task_times = task_catalog.robot_task_times()
 
     def get_current_task_name(self):
         """Get the human-readable task name for the current URP task"""
-        if self.current_task and self.task_mapping:
-            return self.task_mapping.get(self.current_task.lower(), self.current_task)
+        if self.current_task:
+            return task_catalog.robot_task_names().get(self.current_task.lower(), self.current_task)
         return self.current_task
 
     def get_task_time(self, urp_name):
@@ -121,152 +207,260 @@ class RobotExecutor:
             print(f"❌ Error getting task time for '{urp_name}': {e}")
             return 40  # Default 30 + 10 buffer
 
+    def _ready_to_dispatch(self):
+        if not self.started or self.is_running:
+            return False
+        if self.dispatcher is not None:
+            return self.dispatcher.has_ready_task()
+        return bool(self.queue)
+
+    def _take_next_task(self):
+        """Next URP to run: the head of our own queue, or a ready task claimed from the dispatcher pool"""
+        if self.dispatcher is not None:
+            return self.dispatcher.claim(self)
+        return self.queue.pop(0)
+
+    def _peek_next_task(self):
+        if self.dispatcher is not None:
+            return self.dispatcher.peek()
+        with self.lock:
+            return self.queue[0] if self.queue else None
+
+    def prefetch_next_program(self):
+        """Validate the next queued program's path while the current one runs"""
+        next_urp = self._peek_next_task()
+        if next_urp is None:
+            return
+        problem = prefetch_program(next_urp, self.orange_mode, self.program_folder)
+        if problem:
+            print(f"⚠️ Next queued program will not load: {problem}")
+
+    def _tasks_remaining(self):
+        if self.dispatcher is not None:
+            return not self.dispatcher.all_done()
+        return bool(self.queue)
+
+    def _stuck_wait_timeout(self):
+        """How long the idle worker may sleep before it has to check for a stuck task (None = until notified)"""
+        if not self.current_task:
+            return None
+        return max(0.0, self.stuck_timeout - (time.time() - self.last_activity_time))
+
+    def _record_dispatch_latency(self):
+        latency = time.perf_counter() - self.wake_time
+        self.dispatch_count += 1
+        self.last_dispatch_latency = latency
+        self.total_dispatch_latency += latency
+        self.max_dispatch_latency = max(self.max_dispatch_latency, latency)
+
+    def get_dispatch_metrics(self):
+        """Dispatch latency (wake-up signal -> task popped from queue) in milliseconds"""
+        count = self.dispatch_count
+        return {
+            "count": count,
+            "last_ms": round(self.last_dispatch_latency * 1000, 3) if self.last_dispatch_latency is not None else None,
+            "avg_ms": round(self.total_dispatch_latency / count * 1000, 3) if count else None,
+            "max_ms": round(self.max_dispatch_latency * 1000, 3),
+        }
+
     def worker_loop(self):
         print("✅ Robot executor worker loop running")
         while True:
-            if self.started and not self.is_running and self.queue:
-                print(f"🔍 Debug: Worker loop - started: {self.started}, is_running: {self.is_running}, queue length: {len(self.queue)}")
-                with self.lock:
-                    urp_name = self.queue.pop(0)
+            with self.condition:
+                while not self._ready_to_dispatch():
+                    timeout = self._stuck_wait_timeout()
+                    if timeout == 0.0:
+                        break
+                    self.condition.wait(timeout)
+
+                if self._ready_to_dispatch():
+                    urp_name = self._take_next_task()
+                    if urp_name is None:
+                        continue  # Another cell claimed the task first
+                    self._record_dispatch_latency()
+                    generation = self.reset_generation
                     self.current_task = urp_name
                     self.current_task_name = self.get_current_task_name()
                     self.last_activity_time = time.time()
                     self.pause_reset_flag = False  # Clear reset flag for new task
+                else:
+                    urp_name = None
 
-                print(f"[EXECUTOR] Starting task: {urp_name} (Task: {self.current_task_name})")
-                print(f"[QUEUE] Tasks remaining: {self.queue}")
+            if urp_name is None:
+                self.recover_stuck_task()
+                continue
 
-                # Step 1: Set running state
-                self.is_running = True
-                
-                # Step 2: Check dependencies before starting
-                self.check_and_wait_for_dependencies(urp_name)
+            print(f"[EXECUTOR] Starting task: {urp_name} (Task: {self.current_task_name})")
+            print(f"[QUEUE] Tasks remaining: {self.queue}")
+
+            # Step 1: Set running state
+            self.is_running = True
+            self.publish_state()
+            
+            # Step 2: Check dependencies before starting
+            if not self.check_and_wait_for_dependencies(urp_name, generation):
+                self.requeue_front(urp_name, generation)  # Paused while waiting: run it first once resumed
+                with self.condition:
+                    self.current_task = None
+                    self.current_task_name = None
+                    self.is_running = False
+                    self._notify()
+                self.publish_state()
+                continue
 
-                # Step 3: Set message for task execution
+            # Step 3: Set message for task execution
+            task_name = self.get_current_task_name()
+            self.robot_message = f"I am executing task: {task_name}"
+            self.execution_message = f"🤖 Executing: {task_name}"
+            print(f"🔍 Debug: Robot message set to: '{self.robot_message}'")
+
+            # Step 4: Execute the task
+            print(f"🔍 Debug: About to execute task '{urp_name}'")
+            execution_success = self.execute_task(urp_name)
+            print(f"🔍 Debug: execute_task returned {execution_success} for '{urp_name}'")
+            print(f"🔍 Debug: execution_success type: {type(execution_success)}")
+
+            # Step 5: Mark task as completed only if execution was successful
+            if execution_success:
+                print(f"🔍 Debug: Task '{urp_name}' succeeded, marking as completed")
                 task_name = self.get_current_task_name()
-                self.robot_message = f"I am executing task: {task_name}"
-                self.execution_message = f"🤖 Executing: {task_name}"
+                self.robot_message = f"Task {task_name} completed successfully"
+                self.execution_message = f"✅ Completed: {task_name}"
                 print(f"🔍 Debug: Robot message set to: '{self.robot_message}'")
-
-                # Step 4: Execute the task
-                print(f"🔍 Debug: About to execute task '{urp_name}'")
-                execution_success = self.execute_task(urp_name)
-                print(f"🔍 Debug: execute_task returned {execution_success} for '{urp_name}'")
-                print(f"🔍 Debug: execution_success type: {type(execution_success)}")
-
-                # Step 5: Mark task as completed only if execution was successful
-                if execution_success:
-                    print(f"🔍 Debug: Task '{urp_name}' succeeded, marking as completed")
-                    task_name = self.get_current_task_name()
-                    self.robot_message = f"Task {task_name} completed successfully"
-                    self.execution_message = f"✅ Completed: {task_name}"
-                    print(f"🔍 Debug: Robot message set to: '{self.robot_message}'")
-                    print(f"🔍 Debug: About to call mark_task_completed for '{urp_name}'")
-                    self.mark_task_completed(urp_name)
-                    print(f"🔍 Debug: mark_task_completed completed for '{urp_name}'")
+                print(f"🔍 Debug: About to call mark_task_completed for '{urp_name}'")
+                self.mark_task_completed(urp_name)
+                print(f"🔍 Debug: mark_task_completed completed for '{urp_name}'")
+            else:
+                print(f"❌ Task '{urp_name}' failed - not marking as completed")
+                task_name = self.get_current_task_name()
+                self.robot_message = f"Error: Task {task_name} failed to execute"
+                self.execution_message = f"❌ Failed: {task_name}"
+                print(f"🔍 Debug: Robot message set to: '{self.robot_message}'")
+                # Put the task back in the queue to retry later
+                if self.dispatcher is not None:
+                    self.dispatcher.requeue(urp_name)
                 else:
-                    print(f"❌ Task '{urp_name}' failed - not marking as completed")
-                    task_name = self.get_current_task_name()
-                    self.robot_message = f"Error: Task {task_name} failed to execute"
-                    self.execution_message = f"❌ Failed: {task_name}"
-                    print(f"🔍 Debug: Robot message set to: '{self.robot_message}'")
-                    # Put the task back in the queue to retry later
                     with self.lock:
                         self.queue.append(urp_name)
 
-                # Step 4: Clear current task
-                self.current_task = None
-                self.current_task_name = None
-                self.is_running = False
-                self.last_activity_time = time.time()
-
-                # Check if all tasks are done
-                if not self.queue:
-                    self.all_tasks_completed = True
-                    self.robot_message = "All robot tasks completed!"
-                    self.execution_message = "🎉 All robot tasks finished!"
-                    print("🎉 All robot tasks completed!")
-
-            # Check for stuck robot
-            elif self.current_task and time.time() - self.last_activity_time > self.stuck_timeout:
-                print(f"⚠️ Robot appears stuck on task: {self.current_task}")
-                self.robot_message = f"Robot appears stuck on {self.current_task_name or self.current_task}"
-                
-                # Try to recover by stopping the robot
-                try:
-                    send_dashboard_command("stop")
-                    print("🛑 Attempting to stop stuck robot...")
-                except Exception as e:
-                    print(f"❌ Could not stop stuck robot: {e}")
-                
-                # Reset current task and continue
+            # Step 4: Clear current task
+            with self.condition:
                 self.current_task = None
                 self.current_task_name = None
                 self.is_running = False
                 self.last_activity_time = time.time()
+                self._notify()
+
+            # Check if all tasks are done
+            if not self._tasks_remaining():
+                self.all_tasks_completed = True
+                self.robot_message = "All robot tasks completed!"
+                self.execution_message = "🎉 All robot tasks finished!"
+                print("🎉 All robot tasks completed!")
+            self.publish_state()
+
+    def requeue_front(self, urp_name, generation):
+        """Put a task that was taken but not run back at the head of the queue, unless the executor was reset since"""
+        with self.condition:
+            if self.reset_generation != generation:
+                return
+            if self.dispatcher is None:
+                self.queue.insert(0, urp_name)
+                self._notify()
+        if self.dispatcher is not None:
+            self.dispatcher.requeue(urp_name, front=True)
+        self.publish_state()
+
+    def recover_stuck_task(self):
+        """Stop the robot and clear a task that has shown no activity for stuck_timeout seconds"""
+        print(f"⚠️ Robot appears stuck on task: {self.current_task}")
+        self.robot_message = f"Robot appears stuck on {self.current_task_name or self.current_task}"
+        
+        # Try to recover by stopping the robot
+        try:
+            send_dashboard_command("stop", self.dashboard)
+            print("🛑 Attempting to stop stuck robot...")
+        except Exception as e:
+            print(f"❌ Could not stop stuck robot: {e}")
+        
+        # Reset current task and continue
+        self.current_task = None
+        self.current_task_name = None
+        self.is_running = False
+        self.last_activity_time = time.time()
+        self.publish_state()
 
-            time.sleep(0.1)
-
-    def check_and_wait_for_dependencies(self, urp_name):
-        """Check dependencies and wait if not met"""
+    def check_and_wait_for_dependencies(self, urp_name, generation):
+        """Wait until the task's dependencies are met; returns False if the executor was reset or paused meanwhile"""
         print(f"🔍 Checking dependencies for: {urp_name}")
         
-        # Load task mapping if not already loaded
-        if not self.task_mapping:
-            self.load_task_mapping()
+        # Refresh task mapping from the catalog (cheap, picks up tasks.xlsx edits)
+        self.load_task_mapping()
 
         # Get the task name for dependency checking
         task_name = self.task_mapping.get(urp_name.lower(), urp_name)
         
         while True:
-            try:
-                import requests
-                response = requests.get("http://127.0.0.1:8000/check-robot-dependency")
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["allowed"]:
-                        print(f"✅ Dependencies met for {task_name}")
-                        self.robot_message = ""
-                        print(f"🔍 Debug: Robot message cleared")
-                        break
-                    else:
-                        # Dependencies not met - show message and wait
-                        self.robot_message = data.get('message', 'Waiting for dependencies')
-                        print(f"⏳ Waiting for dependencies: {self.robot_message}")
-                        print(f"🔍 Debug: Robot message set to: '{self.robot_message}'")
-                        time.sleep(2)  # Wait before checking again
-                else:
-                    print(f"❌ Error checking dependencies: {response.status_code}")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"❌ Error checking dependencies: {e}")
-                time.sleep(2)
+            allowed, message = dependency_manager.check_robot_dependencies(task_name)
+            if allowed:
+                print(f"✅ Dependencies met for {task_name}")
+                self.robot_message = ""
+                print(f"🔍 Debug: Robot message cleared")
+                return True
+
+            # Dependencies not met - show message and block on the prerequisites' completion events.
+            # The timeout only bounds how long a page refresh/reset takes to be noticed.
+            self.robot_message = message or 'Waiting for dependencies'
+            print(f"⏳ Waiting for dependencies: {self.robot_message}")
+            dependency_manager.wait_for_dependencies(task_name, timeout=1.0)
+            if self.reset_generation != generation:
+                print(f"🔄 Dependency wait for '{task_name}' abandoned due to reset")
+                return False
+            if not self.started:
+                print(f"⏸️ Dependency wait for '{task_name}' abandoned due to pause")
+                return False
 
     def execute_task(self, urp_name):
         """Execute a URP program and monitor its completion"""
         print(f"🚀 Executing URP program: {urp_name}")
         
-        # Load task mapping if not already loaded
-        if not self.task_mapping:
-            self.load_task_mapping()
+        # Refresh task mapping from the catalog (cheap, picks up tasks.xlsx edits)
+        self.load_task_mapping()
         
         # Get the task name for better logging
         task_name = self.get_current_task_name()
         print(f"📋 Task name: {task_name}")
         
+        # Use the RTDE runtime_state stream when it is live, otherwise poll the dashboard
+        self.start_program_monitor()
+        use_rtde = self.completion_mode == "rtde" and self.program_monitor.is_streaming()
+        print(f"🔍 Debug: Completion detection for '{urp_name}': {'RTDE runtime_state' if use_rtde else 'dashboard programState'}")
+        
         # Trigger the URP program
-        success = trigger_urp_program(urp_name, self.orange_mode)
+        timings = {}
+        # Arm after the previous program was stopped but before play, so only this run's PLAYING -> STOPPED counts
+        before_play = self.program_monitor.arm if use_rtde else None
+        success = trigger_urp_program(urp_name, self.orange_mode, self.dashboard, self.program_folder, timings, before_play)
+        self.last_launch_timings = timings
         if not success:
             print(f"❌ Failed to trigger URP program: {urp_name}")
             return False
         
+        self.prefetch_next_program()
+
         # Check initial state after starting
         try:
-            initial_state = send_dashboard_command("programState")
-            if initial_state and ("PLAYING" in initial_state.upper() or "RUNNING" in initial_state.upper()):
-                print(f"✅ Task '{urp_name}' started successfully")
+            if use_rtde:
+                if self.program_monitor.wait_for_start(2.0):
+                    print(f"✅ Task '{urp_name}' started successfully")
+                else:
+                    print(f"⚠️ Task '{urp_name}' may not have started properly: '{self.program_monitor.state_name()}'")
             else:
-                print(f"⚠️ Task '{urp_name}' may not have started properly: '{initial_state}'")
+                initial_state = send_dashboard_command("programState", self.dashboard)
+                if initial_state and ("PLAYING" in initial_state.upper() or "RUNNING" in initial_state.upper()):
+                    print(f"✅ Task '{urp_name}' started successfully")
+                else:
+                    print(f"⚠️ Task '{urp_name}' may not have started properly: '{initial_state}'")
         except Exception as e:
             print(f"⚠️ Error checking initial state: {e}")
         
@@ -299,7 +493,7 @@ class RobotExecutor:
                     last_pause_check = time.time()
                     
                     while not self.started:
-                        time.sleep(0.5)
+                        self.wait_for_wake(0.5)
                         
                         # Check if pause reset flag is set (page refresh)
                         if self.pause_reset_flag:
@@ -321,12 +515,27 @@ class RobotExecutor:
                         pause_start_time = None
                         
                         # Give the robot a moment to transition from paused to running state
-                        print(f"⏳ Waiting for robot to transition to running state...")
-                        time.sleep(1)  # Wait 1 second for state transition
+                        # (not needed with RTDE, where only a transition to STOPPED counts as completion)
+                        if not use_rtde:
+                            print(f"⏳ Waiting for robot to transition to running state...")
+                            time.sleep(1)  # Wait 1 second for state transition
                     else:
                         print(f"▶️ Task '{urp_name}' execution resumed")
                 
-                state = send_dashboard_command("programState")
+                if use_rtde:
+                    if not self.program_monitor.is_streaming():
+                        print(f"⚠️ RTDE stream lost, falling back to dashboard polling for task '{urp_name}'")
+                        use_rtde = False
+                        continue
+                    # Returns as soon as runtime_state goes back to STOPPED; the timeout only
+                    # bounds how quickly pause/reset requests are noticed
+                    remaining = max_wait_time - (time.time() - execution_start_time)
+                    if self.program_monitor.wait_for_completion(max(0.0, min(check_interval, remaining))):
+                        print(f"✅ Task '{urp_name}' finished (RTDE runtime_state STOPPED)")
+                        return True
+                    continue
+                
+                state = send_dashboard_command("programState", self.dashboard)
                 print(f"🔍 Debug: Robot state: '{state}' for task '{urp_name}'")
                 
                 # If robot is in STOPPED or IDLE state, task is finished
@@ -359,9 +568,8 @@ class RobotExecutor:
         print(f"✅ Marking task '{urp_name}' as completed")
         print(f"🔍 Debug: Called mark_task_completed for '{urp_name}'")
         
-        # Load task mapping if not already loaded
-        if not self.task_mapping:
-            self.load_task_mapping()
+        # Refresh task mapping from the catalog (cheap, picks up tasks.xlsx edits)
+        self.load_task_mapping()
 
         # Get the task name for tracking
         task_name = self.task_mapping.get(urp_name.lower(), urp_name)
@@ -376,33 +584,22 @@ class RobotExecutor:
         print(f"📝 Updated executed_tasks list: {self.executed_tasks}")
         print(f"🔍 Debug: Added to executed_tasks - URP: '{urp_name.strip().lower()}', Task: '{task_name.strip().lower()}'")
 
-        # Complete robot task in dependency manager
+        # Complete robot task in dependency manager (releases tasks waiting on it)
         try:
-            import requests
-            print(f"🔍 Debug: Making HTTP request to complete robot task: '{task_name}'")
-            response = requests.post(f"http://127.0.0.1:8000/complete-robot-task?task_name={task_name}")
-            print(f"🔍 Debug: HTTP response status: {response.status_code}")
-            print(f"🔍 Debug: HTTP response content: {response.text}")
-            if response.status_code == 200:
-                print(f"✅ Completed robot task '{task_name}' in dependency manager")
-            else:
-                print(f"❌ Failed to complete robot task '{task_name}': {response.status_code}")
-                
+            next_robot_task = dependency_manager.complete_robot_task(task_name)
+            print(f"✅ Completed robot task '{task_name}' in dependency manager, next: {next_robot_task}")
         except Exception as e:
             print(f"❌ Error completing robot task: {e}")
-            print(f"🔍 Debug: Exception details: {type(e).__name__}: {str(e)}")
 
         # Clear robot message when task is completed
         self.robot_message = ""
 
-        # Log robot task completion
+        # Log robot task completion (queued, written by the event log thread)
         try:
-            from main import log_event, LogEvent
-            log_event(LogEvent(
-                participantId="Robot",
-                event="Robot Task Completed",
-                details={"task_name": task_name, "urp_name": urp_name}
-            ))
+            details = {"task_name": task_name, "urp_name": urp_name}
+            if self.dispatcher is not None:
+                details["robot_cell"] = self.name
+            event_log.log("Robot", "Robot Task Completed", details)
         except Exception as e:
             print(f"❌ Error logging task completion: {e}")
 
@@ -420,7 +617,11 @@ class RobotExecutor:
             "started": self.started,
             "orange_mode": self.orange_mode,
             "all_tasks_completed": self.all_tasks_completed,
-            "queue": self.queue
+            "queue": self.queue,
+            "dispatch_latency": self.get_dispatch_metrics(),
+            "launch_timings": self.last_launch_timings,
+            "completion_mode": self.completion_mode,
+            "program_runtime_state": self.program_monitor.state_name() if self.program_monitor.is_streaming() else None
         }
 
 
@@ -0,0 +1,293 @@
+import asyncio
+import math
+import struct
+
+from urp_trigger import CONTROL_PORT, DASHBOARD_PORT, ROBOT_IP
+
+REALTIME_PORT = 30003  # Streams the joint state at 125/500 Hz
+GRIPPER_PORT = 63352   # Robotiq URCap socket
+
+CONNECT_TIMEOUT = 3.0
+REPLY_TIMEOUT = 3.0
+MOVE_TIMEOUT = 15.0
+GRIPPER_TIMEOUT = 10.0
+JOINT_TOLERANCE = 0.01     # rad; a joint within this of its target counts as arrived
+STOPPED_VELOCITY = 0.001   # rad/s
+
+# Realtime (30003) packets: int32 length, then big-endian doubles starting with the
+# timestamp and the target q/qd/qdd/I/M vectors; q_actual and qd_actual follow those
+_Q_ACTUAL_OFFSET = 8 + 5 * 48
+_JOINT_VECTOR = struct.Struct(">6d")
+
+
+async def _open(host, port, timeout=CONNECT_TIMEOUT):
+    return await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+class AsyncDashboardClient:
+    """
+    asyncio counterpart of DashboardClient for the event loop: one connection per
+    event loop, replies read line by line, every read bounded by REPLY_TIMEOUT.
+    Like DashboardClient, only a failure before the commands were written is retried.
+    """
+
+    def __init__(self, host=ROBOT_IP, port=DASHBOARD_PORT, timeout=REPLY_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.loop = None
+        self.lock = None
+
+    def _bind_loop(self):
+        # Streams and locks belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.lock = asyncio.Lock()
+            self.reader = self.writer = None
+
+    async def _read_line(self):
+        line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        if not line:
+            raise ConnectionError("Dashboard server closed the connection")
+        return line.decode(errors="replace").strip()
+
+    async def _connect(self):
+        self.reader, self.writer = await _open(self.host, self.port, self.timeout)
+        banner = await self._read_line()
+        print(f"🔌 Async dashboard connected to {self.host}:{self.port} ({banner})")
+
+    async def _disconnect(self):
+        if self.writer is not None:
+            await _close(self.writer)
+        self.reader = self.writer = None
+
+    async def send_many(self, commands):
+        """Send all commands in one write and return their replies in order"""
+        self._bind_loop()
+        payload = "".join(f"{command}\n" for command in commands).encode()
+        async with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.writer is None:
+                        await self._connect()
+                    self.writer.write(payload)
+                    await self.writer.drain()
+                    break
+                except (OSError, asyncio.TimeoutError) as e:
+                    await self._disconnect()
+                    if attempt == 1:
+                        raise
+                    print(f"⚠️ Async dashboard connection lost ({e!r}), reconnecting...")
+            # Once written the commands are never resent (a play/pause/load could run twice)
+            try:
+                return [await self._read_line() for _ in commands]
+            except (OSError, asyncio.TimeoutError):
+                await self._disconnect()
+                raise
+
+    async def send(self, command):
+        return (await self.send_many([command]))[0]
+
+
+async def send_dashboard_command(command):
+    """Send one command over the shared async dashboard connection; None if it failed"""
+    try:
+        response = await dashboard.send(command)
+        print(f"Dashboard response: {response}")
+        return response
+    except (OSError, asyncio.TimeoutError) as e:
+        print(f"Dashboard command failed: {e!r}")
+        return None
+
+
+async def port_open(host, port, timeout=CONNECT_TIMEOUT):
+    try:
+        _, writer = await _open(host, port, timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        print(f"  ❌ Port {port} failed: {e!r}")
+        return False
+    await _close(writer)
+    print(f"  ✅ Port {port} accessible")
+    return True
+
+
+async def test_connection(host=ROBOT_IP):
+    """Check the dashboard and control ports concurrently; True if both accept connections"""
+    print(f"🔍 Detailed robot connection test for {host}")
+    dashboard_ok, control_ok = await asyncio.gather(port_open(host, DASHBOARD_PORT), port_open(host, CONTROL_PORT))
+    if dashboard_ok and control_ok:
+        print("✅ Both ports accessible - robot should be ready for commands")
+    elif dashboard_ok:
+        print("⚠️ Dashboard accessible but control port blocked. Robot might need to be in the right mode.")
+    elif control_ok:
+        print("⚠️ Control port accessible but dashboard blocked. Unusual configuration.")
+    else:
+        print("❌ Neither port accessible. Check robot power and network connection.")
+    return dashboard_ok and control_ok
+
+
+async def check_robot_state():
+    """Log robot mode and program state; False if the dashboard did not answer"""
+    try:
+        robot_mode, program_state = await dashboard.send_many(["robotmode", "programState"])
+    except (OSError, asyncio.TimeoutError) as e:
+        print(f"❌ Failed to check robot state: {e!r}")
+        return False
+    print(f"🔍 Robot mode: {robot_mode}")
+    print(f"🔍 Program state: {program_state}")
+    return True
+
+
+async def _read_joint_state(reader):
+    """(q_actual, qd_actual) from the next realtime packet"""
+    size, = struct.unpack(">i", await reader.readexactly(4))
+    body = await reader.readexactly(size - 4)
+    q = _JOINT_VECTOR.unpack_from(body, _Q_ACTUAL_OFFSET)
+    qd = _JOINT_VECTOR.unpack_from(body, _Q_ACTUAL_OFFSET + 48)
+    return q, qd
+
+
+async def movej(joint_positions, a=0.4, v=0.5, host=ROBOT_IP, timeout=MOVE_TIMEOUT):
+    """
+    Move to joint_positions (degrees) with a movej sent to the secondary interface and
+    wait until the realtime stream shows the robot at rest at the target.
+    Returns False on connection errors or if the robot is not there within timeout.
+    """
+    target = [math.radians(pos) for pos in joint_positions]
+    joint_str = ", ".join(f"{q:.5f}" for q in target)
+    script = f"def taskmind_movej():\n  movej([{joint_str}], a={a}, v={v})\nend\n"
+    realtime_writer = control_writer = None
+    try:
+        # Subscribe to the joint state before moving so arrival can't be missed
+        realtime_reader, realtime_writer = await _open(host, REALTIME_PORT)
+        _, control_writer = await _open(host, CONTROL_PORT)
+        print(f"🔧 movej to {joint_positions} via {host}:{CONTROL_PORT}")
+        control_writer.write(script.encode())
+        await control_writer.drain()
+
+        async def wait_until_arrived():
+            moved = False
+            while True:
+                q, qd = await _read_joint_state(realtime_reader)
+                at_rest = max(abs(x) for x in qd) < STOPPED_VELOCITY
+                moved = moved or not at_rest
+                if at_rest and max(abs(x - t) for x, t in zip(q, target)) < JOINT_TOLERANCE:
+                    return moved
+
+        moved = await asyncio.wait_for(wait_until_arrived(), timeout)
+        print(f"✅ Robot at target position{'' if moved else ' (already there)'}")
+        return True
+    except asyncio.TimeoutError:
+        print(f"❌ Robot did not reach {joint_positions} within {timeout}s")
+        return False
+    except (OSError, asyncio.IncompleteReadError) as e:
+        print(f"❌ movej via {host} failed: {e!r}")
+        return False
+    finally:
+        for writer in (control_writer, realtime_writer):
+            if writer is not None:
+                await _close(writer)
+
+
+class AsyncGripper:
+    """asyncio version of the RobotiqGripper GET/SET protocol used for activation"""
+
+    ACTIVE = 3          # STA value of an activated gripper
+    OBJ_MOVING = 0
+    OBJ_AT_DEST = 3
+
+    def __init__(self, host=ROBOT_IP, port=GRIPPER_PORT):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.max_position = 255
+
+    async def connect(self):
+        self.reader, self.writer = await _open(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            await _close(self.writer)
+            self.writer = None
+
+    async def _command(self, cmd):
+        self.writer.write(cmd.encode())
+        await self.writer.drain()
+        return await asyncio.wait_for(self.reader.read(1024), REPLY_TIMEOUT)
+
+    async def set_vars(self, **values):
+        cmd = "SET" + "".join(f" {name} {value}" for name, value in values.items()) + "\n"
+        return await self._command(cmd) == b"ack"
+
+    async def get_var(self, name):
+        name_reply, value = (await self._command(f"GET {name}\n")).decode().split()
+        if name_reply != name:
+            raise ValueError(f"Unexpected gripper reply for {name}: {name_reply} {value}")
+        return int(value)
+
+    async def move_and_wait(self, position, speed, force):
+        position = max(0, min(self.max_position, position))
+        if not await self.set_vars(POS=position, SPE=speed, FOR=force, GTO=1):
+            raise RuntimeError("Failed to set variables for move.")
+        while await self.get_var("PRE") != position:
+            await asyncio.sleep(0.001)
+        status = await self.get_var("OBJ")
+        while status == self.OBJ_MOVING:
+            status = await self.get_var("OBJ")
+        return await self.get_var("POS"), status
+
+    async def activate(self, auto_calibrate=True):
+        """Same sequence as RobotiqGripper.activate(), without blocking the event loop"""
+        if await self.get_var("STA") != self.ACTIVE:
+            await self.set_vars(ACT=0)
+            await self.set_vars(ATR=0)
+            while await self.get_var("ACT") != 0 or await self.get_var("STA") != 0:
+                await self.set_vars(ACT=0)
+                await self.set_vars(ATR=0)
+            await asyncio.sleep(0.5)
+            await self.set_vars(ACT=1)
+            await asyncio.sleep(1.0)
+            while await self.get_var("ACT") != 1 or await self.get_var("STA") != self.ACTIVE:
+                await asyncio.sleep(0.01)
+
+        if auto_calibrate:
+            for target in (0, self.max_position, 0):
+                position, status = await self.move_and_wait(target, 64, 1)
+                if status != self.OBJ_AT_DEST:
+                    raise RuntimeError(f"Calibration failed moving to {target}: object status {status}")
+                if target:
+                    self.max_position = position
+
+
+async def activate_gripper(host=ROBOT_IP, timeout=GRIPPER_TIMEOUT):
+    """Connect to and activate the gripper; False on error or timeout"""
+    gripper = AsyncGripper(host)
+    try:
+        print("🤏 Activating gripper...")
+        await asyncio.wait_for(gripper.connect(), CONNECT_TIMEOUT)
+        await asyncio.wait_for(gripper.activate(), timeout)
+        print("✅ Gripper activated successfully")
+        return True
+    except asyncio.TimeoutError:
+        print("❌ Gripper operation timed out")
+        return False
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ Gripper operation failed: {e!r}")
+        return False
+    finally:
+        await gripper.close()
+
+
+dashboard = AsyncDashboardClient()
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from urp_trigger import ROBOT_IP
+
+CONNECT_TIMEOUT = 15.0  # Seconds a caller waits for the first connection
+INIT_TIMEOUT = 20.0     # Seconds the connect thread waits for the first RTDE data before giving up
+STALE_SAMPLE_AGE = 1.0  # Seconds without an RTDE package before the session counts as broken
+
+
+class RobotSession:
+    """
+    One long-lived URBasic UrScriptExt connection (RTDE, real-time client, dashboard)
+    shared by all callers instead of building and tearing down a new one per move.
+      - connects lazily on first use, in a background thread so a caller can give up
+        after a timeout without leaking a half-built connection; an attempt that gets no
+        RTDE data within INIT_TIMEOUT is closed and the next get() starts a new one
+      - health-checks the connection on every get() and reconnects when RTDE stopped
+        streaming or the real-time client dropped
+      - close() shuts everything down (called on app shutdown)
+    """
+
+    def __init__(self, host=ROBOT_IP):
+        self.host = host
+        self.lock = threading.Lock()
+        self.robot = None
+        self.connect_thread = None
+        self.connect_error = None
+        self.connected = threading.Event()
+
+    def is_healthy(self):
+        robot = self.robot
+        if robot is None:
+            return False
+        connector = robot.robotConnector
+        age = connector.RobotModel.snapshot().age()
+        return (connector.RTDE.isRunning() and connector.RealTimeClient.IsRtcConnected()
+                and age is not None and age < STALE_SAMPLE_AGE)
+
+    def _connect(self):
+        try:
+            import URBasic
+
+            started = time.perf_counter()
+            robot_model = URBasic.robotModel.RobotModel()
+            # Bounded, so an unreachable robot ends the attempt (connections closed) and the next get() retries
+            robot = URBasic.urScriptExt.UrScriptExt(host=self.host, robotModel=robot_model, initTimeout=INIT_TIMEOUT)
+            with self.lock:
+                self.robot = robot
+            print(f"🔗 Robot session connected to {self.host} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            self.connect_error = e
+            print(f"❌ Robot session could not connect to {self.host}: {e}")
+        finally:
+            with self.lock:
+                self.connect_thread = None
+            self.connected.set()
+
+    def get(self, timeout=CONNECT_TIMEOUT):
+        """
+        Return the connected UrScriptExt, (re)connecting if needed.
+        Raises TimeoutError if no connection is ready within timeout.
+        """
+        if self.is_healthy():
+            return self.robot
+
+        with self.lock:
+            if self.robot is not None:
+                print("⚠️ Robot session unhealthy, reconnecting...")
+                self._close_robot()
+            if self.connect_thread is None:
+                self.connect_error = None
+                self.connected.clear()
+                self.connect_thread = threading.Thread(target=self._connect, name="RobotSessionConnect", daemon=True)
+                self.connect_thread.start()
+
+        if not self.connected.wait(timeout):
+            raise TimeoutError(f"Robot session to {self.host} not ready within {timeout}s")
+        if self.robot is None:
+            raise ConnectionError(f"Robot session to {self.host} failed: {self.connect_error}")
+        return self.robot
+
+    def invalidate(self):
+        """Drop the connection after an error so the next get() reconnects"""
+        with self.lock:
+            self._close_robot()
+
+    def _close_robot(self):
+        robot, self.robot = self.robot, None
+        if robot is not None:
+            try:
+                robot.close()
+            except Exception as e:
+                print(f"⚠️ Error closing robot session: {e}")
+
+    def close(self):
+        with self.lock:
+            self._close_robot()
+
+
+robot_session = RobotSession()
@@ -0,0 +1,100 @@
+import asyncio
+import copy
+import json
+import threading
+
+KEEPALIVE_INTERVAL = 15  # Seconds between SSE comments so proxies/browsers keep the stream open
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+
+class StateStream:
+    """
+    Holds the latest execution state published by RobotExecutor and DependencyManager
+    and fans out only the changed fields to every Server-Sent-Events subscriber.
+    Each change is serialized once, so the cost scales with the number of changes,
+    not with the number of open browser tabs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.state = {}  # section -> {field: value}
+        self.subscribers = set()
+
+    def publish(self, section, values):
+        """Merge values into a state section and push the changed fields to subscribers"""
+        with self.lock:
+            current = self.state.setdefault(section, {})
+            changes = {k: copy.deepcopy(v) for k, v in values.items() if current.get(k, object()) != v}
+            if not changes:
+                return
+            current.update(changes)
+            self.version += 1
+            message = self._format("delta", self.version, {"section": section, "changes": changes})
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, message)
+            except RuntimeError:
+                # Event loop already closed - the subscriber is gone
+                self.unsubscribe(subscriber)
+
+    def snapshot(self):
+        with self.lock:
+            return self.version, copy.deepcopy(self.state)
+
+    def subscribe(self):
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.add(subscriber)
+            message = self._format("snapshot", self.version, {"state": self.state})
+        subscriber.queue.put_nowait(message)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def _deliver(self, subscriber, message):
+        """Runs on the subscriber's event loop"""
+        try:
+            subscriber.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client - drop its backlog and resynchronise with a full snapshot
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            with self.lock:
+                resync = self._format("snapshot", self.version, {"state": self.state})
+            subscriber.queue.put_nowait(resync)
+
+    @staticmethod
+    def _format(event, version, payload):
+        payload = dict(payload, version=version)
+        return f"id: {version}\nevent: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+    async def events(self, request):
+        """Async generator producing the SSE byte stream for one client"""
+        subscriber = self.subscribe()
+        print(f"📡 Event stream client connected ({len(self.subscribers)} total)")
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    message = ": keepalive\n\n"
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+            print(f"📡 Event stream client disconnected ({len(self.subscribers)} remaining)")
+
+
+state_stream = StateStream()
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+TASKS_FILE = "tasks.xlsx"
+
+
+def _clean_str(value, default=""):
+    """Return a stripped string for an Excel cell, mapping empty/NaN cells to default"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return default
+    text = str(value).strip()
+    if not text or text.lower() == "nan":
+        return default
+    return text
+
+
+def _clean_int(value, default=None):
+    """Return an int for an Excel cell, mapping empty/NaN cells to default"""
+    try:
+        if value is None or pd.isna(value):
+            return default
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class CatalogTask:
+    """One row of tasks.xlsx"""
+    task_id: int
+    name: str
+    instruction: str
+    image_name: str
+    image_name_robot: str
+    time_human: Optional[int]
+    time_robot: Optional[int]
+    robot_code: str
+    dependencies: Tuple[str, ...]
+    group_name: str
+
+    @property
+    def fixed_to_human(self):
+        return self.robot_code.lower() == "cannot"
+
+
+@dataclass
+class _CatalogIndex:
+    tasks: List[CatalogTask] = field(default_factory=list)
+    by_name: Dict[str, CatalogTask] = field(default_factory=dict)
+    by_id: Dict[int, CatalogTask] = field(default_factory=dict)
+    by_robot_code: Dict[str, CatalogTask] = field(default_factory=dict)  # lower-case RobotCode
+    dependencies: Dict[str, List[str]] = field(default_factory=dict)
+    group_names: Dict[str, str] = field(default_factory=dict)
+    robot_task_names: Dict[str, str] = field(default_factory=dict)  # lower-case RobotCode -> TaskName
+    robot_task_times: Dict[str, int] = field(default_factory=dict)  # lower-case RobotCode/TaskName -> Time_Robot
+
+
+class TaskCatalog:
+    """
+    Parsed, indexed view of tasks.xlsx shared by every consumer in the backend.
+    The workbook is parsed once and re-parsed only when its mtime/size change and
+    the content hash differs from the last parsed version. A workbook that fails to
+    parse (e.g. half-saved) is not retried until it changes again.
+    """
+
+    def __init__(self, path=TASKS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.version = 0  # Incremented each time the workbook is re-parsed
+        self._index = _CatalogIndex()
+        self._stat_signature = None
+        self._content_hash = None
+
+    def _current_index(self):
+        """Return the index, re-parsing the workbook first if it changed on disk"""
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError as e:
+            if self._stat_signature is not None:
+                print(f"❌ Task catalog file unavailable: {e}")
+            return self._index
+
+        if signature == self._stat_signature:
+            return self._index
+
+        with self.lock:
+            if signature != self._stat_signature:
+                self._reload(signature)
+            return self._index
+
+    def _reload(self, signature):
+        try:
+            with open(self.path, "rb") as f:
+                content_hash = hashlib.sha1(f.read()).hexdigest()
+            if content_hash == self._content_hash:
+                # Touched but unchanged - keep the parsed index
+                self._stat_signature = signature
+                return
+
+            df = pd.read_excel(self.path)
+            self._index = self._build_index(df)
+            self._stat_signature = signature
+            self._content_hash = content_hash
+            self.version += 1
+            print(f"📚 Loaded task catalog v{self.version}: {len(self._index.tasks)} tasks from {self.path}")
+        except Exception as e:
+            # Keep serving the last good index; retry only once the file changes again (e.g. a save completes)
+            self._stat_signature = signature
+            print(f"❌ Failed to load task catalog, keeping v{self.version}: {e}")
+
+    @staticmethod
+    def _build_index(df):
+        index = _CatalogIndex()
+        for record in df.to_dict("records"):
+            name = _clean_str(record.get("TaskName"))
+            task_id = _clean_int(record.get("TaskID"))
+            if not name or task_id is None:
+                continue
+
+            dep = _clean_str(record.get("Dependency"))
+            image_name = _clean_str(record.get("ImageName"))
+            task = CatalogTask(
+                task_id=task_id,
+                name=name,
+                instruction=_clean_str(record.get("Instruction")),
+                image_name=image_name,
+                image_name_robot=_clean_str(record.get("ImageNameRobot"), image_name or "UR3e.png"),
+                time_human=_clean_int(record.get("Time_Human")),
+                time_robot=_clean_int(record.get("Time_Robot")),
+                robot_code=_clean_str(record.get("RobotCode")),
+                dependencies=tuple(d.strip() for d in dep.split(",")) if dep else (),
+                group_name=_clean_str(record.get("GroupName")),
+            )
+
+            index.tasks.append(task)
+            index.by_name[task.name] = task
+            index.by_id[task.task_id] = task
+            index.dependencies[task.name] = list(task.dependencies)
+            index.group_names[task.name] = task.group_name
+
+            if task.robot_code and not task.fixed_to_human:
+                code = task.robot_code.lower()
+                time_robot = task.time_robot if task.time_robot is not None else 30
+                index.by_robot_code[code] = task
+                index.robot_task_names[code] = task.name
+                index.robot_task_times[code] = time_robot
+                index.robot_task_times[task.name.lower()] = time_robot
+        return index
+
+    def tasks(self):
+        """All tasks in workbook order"""
+        return self._current_index().tasks
+
+    def get_by_name(self, task_name):
+        return self._current_index().by_name.get(str(task_name).strip())
+
+    def get_by_id(self, task_id):
+        return self._current_index().by_id.get(_clean_int(task_id))
+
+    def get_by_robot_code(self, robot_code):
+        return self._current_index().by_robot_code.get(str(robot_code).strip().lower())
+
+    def dependency_map(self):
+        """TaskName -> list of prerequisite TaskNames"""
+        return self._current_index().dependencies
+
+    def group_names(self):
+        """TaskName -> GroupName ("" when not grouped)"""
+        return self._current_index().group_names
+
+    def robot_task_names(self):
+        """Lower-case RobotCode -> TaskName, for tasks the robot can execute"""
+        return self._current_index().robot_task_names
+
+    def robot_task_times(self):
+        """Lower-case RobotCode and TaskName -> Time_Robot (defaults to 30s)"""
+        return self._current_index().robot_task_times
+
+
+task_catalog = TaskCatalog()
@@ -0,0 +1,225 @@
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+HUMAN = "Human"
+ROBOT = "Robot"
+AGENTS = (HUMAN, ROBOT)
+SCHEDULING_MODES = ("makespan", "balanced")
+
+DEFAULT_TASK_TIME = 30         # Seconds assumed when the catalog has no time for an agent
+BNB_MAX_FLEXIBLE_TASKS = 16    # Branch-and-bound is tried only below this many free choices
+BNB_TIME_LIMIT = 0.05          # Seconds; the best schedule found so far is kept after that
+
+
+@dataclass
+class ScheduledTask:
+    name: str
+    agent: str
+    start: float
+    finish: float
+
+
+@dataclass
+class ScheduleResult:
+    mode: str
+    makespan: float
+    method: str
+    elapsed_ms: float
+    tasks: List[ScheduledTask] = field(default_factory=list)  # Ordered by start time
+
+    def assignments(self):
+        return {t.name: t.agent for t in self.tasks}
+
+
+class _Dag:
+    """Index-based view of the catalog tasks used by the schedulers"""
+
+    def __init__(self, tasks):
+        self.names = [t.name for t in tasks]
+        index = {name: i for i, name in enumerate(self.names)}
+        n = len(tasks)
+        # durations[i] = (human seconds, robot seconds or None if the robot can't do it)
+        self.durations = []
+        for t in tasks:
+            human = t.time_human if t.time_human is not None else DEFAULT_TASK_TIME
+            robot_capable = bool(t.robot_code) and not t.fixed_to_human
+            robot = (t.time_robot if t.time_robot is not None else DEFAULT_TASK_TIME) if robot_capable else None
+            self.durations.append((human, robot))
+
+        self.preds = [[] for _ in range(n)]
+        self.succs = [[] for _ in range(n)]
+        for i, t in enumerate(tasks):
+            for dep in t.dependencies:
+                j = index.get(dep)
+                if j is None:
+                    print(f"⚠️ Scheduler ignoring unknown dependency '{dep}' of '{t.name}'")
+                    continue
+                self.preds[i].append(j)
+                self.succs[j].append(i)
+
+        topo = self._topological_order()
+        # Upward rank: mean duration plus the longest path to any exit task
+        rank = [0.0] * n
+        for i in reversed(topo):
+            mean = sum(d for d in self.durations[i] if d is not None) / sum(1 for d in self.durations[i] if d is not None)
+            rank[i] = mean + max((rank[s] for s in self.succs[i]), default=0.0)
+        position = {i: p for p, i in enumerate(topo)}
+        # Higher rank first; ties keep topological order so predecessors always come first
+        self.priority = sorted(range(n), key=lambda i: (-rank[i], position[i]))
+
+    def _topological_order(self):
+        in_degree = [len(p) for p in self.preds]
+        order = [i for i, d in enumerate(in_degree) if d == 0]
+        for i in order:
+            for s in self.succs[i]:
+                in_degree[s] -= 1
+                if in_degree[s] == 0:
+                    order.append(s)
+        if len(order) != len(self.names):
+            cyclic = sorted(self.names[i] for i, d in enumerate(in_degree) if d > 0)
+            raise ValueError(f"Task dependencies contain a cycle involving: {', '.join(cyclic)}")
+        return order
+
+
+def _place(dag, i, agent, free, finish):
+    """Earliest (start, finish) of task i on agent given agent availability and predecessor finishes"""
+    ready = max((finish[p] for p in dag.preds[i]), default=0.0)
+    start = max(free[agent], ready)
+    return start, start + dag.durations[i][agent]
+
+
+def _list_schedule(dag, mode):
+    """Greedy list scheduling in priority order; returns (agents, starts, finishes)"""
+    n = len(dag.names)
+    free = [0.0, 0.0]
+    load = [0.0, 0.0]
+    agents, starts, finish = [0] * n, [0.0] * n, [0.0] * n
+    for i in dag.priority:
+        options = []
+        for agent in (0, 1):
+            if dag.durations[i][agent] is None:
+                continue
+            start, end = _place(dag, i, agent, free, finish)
+            if mode == "balanced":
+                # Keep the two agents' total work even, then finish as early as possible
+                key = (load[agent] + dag.durations[i][agent], end)
+            else:
+                key = (end, dag.durations[i][agent])
+            options.append((key, agent, start, end))
+        _, agent, start, end = min(options)
+        agents[i], starts[i], finish[i] = agent, start, end
+        free[agent] = end
+        load[agent] += dag.durations[i][agent]
+    return agents, starts, finish
+
+
+def _branch_and_bound(dag, incumbent):
+    """
+    Exhaustive search over the agent choice of every flexible task (processed in
+    priority order), pruned with lower bounds. Returns (best, completed) where best is
+    (makespan, agents, starts, finishes) and completed is False if the time limit hit.
+    """
+    n = len(dag.names)
+    order = dag.priority
+    deadline = time.perf_counter() + BNB_TIME_LIMIT
+    best = [incumbent]
+
+    # Remaining forced work per agent and minimum flexible work from each position on
+    rest_forced = [[0.0, 0.0] for _ in range(n + 1)]
+    rest_flexible = [0.0] * (n + 1)
+    for pos in range(n - 1, -1, -1):
+        human, robot = dag.durations[order[pos]]
+        forced = list(rest_forced[pos + 1])
+        flexible = rest_flexible[pos + 1]
+        if robot is None:
+            forced[0] += human
+        else:
+            flexible += min(human, robot)
+        rest_forced[pos], rest_flexible[pos] = forced, flexible
+
+    def search(pos, free, agents, starts, finish, makespan):
+        if time.perf_counter() > deadline:
+            return False
+        # Forced tasks don't branch - place them until the next choice
+        while pos < n and dag.durations[order[pos]][1] is None:
+            i = order[pos]
+            starts[i], finish[i] = _place(dag, i, 0, free, finish)
+            agents[i] = 0
+            free = [finish[i], free[1]]
+            makespan = max(makespan, finish[i])
+            pos += 1
+        if pos == n:
+            if makespan < best[0][0]:
+                best[0] = (makespan, list(agents), list(starts), list(finish))
+            return True
+
+        forced_h, forced_r = rest_forced[pos]
+        bound = max(makespan, free[0] + forced_h, free[1] + forced_r,
+                    (free[0] + free[1] + forced_h + forced_r + rest_flexible[pos]) / 2)
+        if bound >= best[0][0]:
+            return True
+
+        i = order[pos]
+        completed = True
+        choices = [a for a in (0, 1) if dag.durations[i][a] is not None]
+        # Try the agent that finishes first before the other one
+        choices.sort(key=lambda a: _place(dag, i, a, free, finish)[1])
+        for agent in choices:
+            start, end = _place(dag, i, agent, free, finish)
+            child_free = list(free)
+            child_free[agent] = end
+            child_agents, child_starts, child_finish = list(agents), list(starts), list(finish)
+            child_agents[i], child_starts[i], child_finish[i] = agent, start, end
+            completed = search(pos + 1, child_free, child_agents, child_starts, child_finish,
+                               max(makespan, end)) and completed
+            if not completed:
+                break
+        return completed
+
+    completed = search(0, [0.0, 0.0], [0] * n, [0.0] * n, [0.0] * n, 0.0)
+    return best[0], completed
+
+
+def schedule_tasks(tasks, mode="makespan"):
+    """
+    Two-agent (human + robot) schedule for catalog tasks over their dependency DAG.
+
+    "makespan": best of the two list schedules, refined by branch-and-bound when
+                there are at most BNB_MAX_FLEXIBLE_TASKS tasks both agents can do
+    "balanced": list scheduling that keeps the human's and robot's total work even
+
+    Raises ValueError for an unknown mode or cyclic dependencies.
+    """
+    if mode not in SCHEDULING_MODES:
+        raise ValueError(f"Unknown optimization mode '{mode}', expected one of {SCHEDULING_MODES}")
+    started = time.perf_counter()
+    tasks = list(tasks)
+    dag = _Dag(tasks)
+
+    agents, starts, finish = _list_schedule(dag, mode)
+    makespan = max(finish, default=0.0)
+    method = "list scheduling"
+    if mode == "makespan":
+        # Neither greedy rule dominates the other, so keep the better of the two
+        alternative = _list_schedule(dag, "balanced")
+        if max(alternative[2], default=0.0) < makespan:
+            agents, starts, finish = alternative
+            makespan = max(finish, default=0.0)
+
+    flexible = sum(1 for _, robot in dag.durations if robot is not None)
+    if mode == "makespan" and 0 < flexible <= BNB_MAX_FLEXIBLE_TASKS:
+        (makespan, agents, starts, finish), completed = _branch_and_bound(dag, (makespan, agents, starts, finish))
+        method = "branch and bound" if completed else "branch and bound (time limit)"
+
+    scheduled = sorted(
+        (ScheduledTask(dag.names[i], AGENTS[agents[i]], starts[i], finish[i]) for i in range(len(tasks))),
+        key=lambda t: (t.start, t.finish),
+    )
+    return ScheduleResult(
+        mode=mode,
+        makespan=makespan,
+        method=method,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        tasks=scheduled,
+    )
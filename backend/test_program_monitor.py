@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the RTDE program completion detection without a robot.
+Feeds runtime_state sequences into ProgramStateMonitor the way the RTDE receive thread does.
+"""
+
+from program_monitor import (ProgramStateMonitor, RUNTIME_PAUSED, RUNTIME_PAUSING, RUNTIME_PLAYING,
+                             RUNTIME_RESUMING, RUNTIME_STOPPED, RUNTIME_STOPPING, RUNTIME_STATE_NAMES)
+
+
+def run_sequence(states, armed_from=RUNTIME_STOPPED):
+    """Arm the monitor in state armed_from, feed states and return (finished after each state)"""
+    monitor = ProgramStateMonitor("127.0.0.1")
+    monitor._on_package({"runtime_state": armed_from})
+    monitor.arm()
+    finished = []
+    for state in states:
+        monitor._on_package({"runtime_state": state})
+        finished.append(monitor.finished)
+    return finished
+
+
+def check(label, states, expected, armed_from=RUNTIME_STOPPED):
+    finished = run_sequence(states, armed_from)
+    names = " -> ".join(RUNTIME_STATE_NAMES[s] for s in states)
+    if finished == expected:
+        print(f"   ✅ {label}: {names}")
+        return True
+    print(f"   ❌ {label}: {names} gave finished={finished}, expected {expected}")
+    return False
+
+
+def test_program_monitor():
+    print("🧪 Testing RTDE program completion detection...")
+    results = [
+        check("Pause and resume is not completion",
+              [RUNTIME_PLAYING, RUNTIME_PAUSING, RUNTIME_PAUSED, RUNTIME_RESUMING, RUNTIME_PLAYING, RUNTIME_STOPPED],
+              [False, False, False, False, False, True]),
+        check("PLAYING -> PAUSED -> PLAYING -> STOPPED",
+              [RUNTIME_PLAYING, RUNTIME_PAUSED, RUNTIME_PLAYING, RUNTIME_STOPPED],
+              [False, False, False, True]),
+        check("Previous program stopping is not completion",
+              [RUNTIME_STOPPING, RUNTIME_STOPPED, RUNTIME_PLAYING, RUNTIME_STOPPING, RUNTIME_STOPPED],
+              [False, False, False, False, True], armed_from=RUNTIME_PLAYING),
+    ]
+    if all(results):
+        print("✅ Program completion detection works")
+    else:
+        print("❌ Program completion detection is broken")
+    return all(results)
+
+
+if __name__ == "__main__":
+    test_program_monitor()
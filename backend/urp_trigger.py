@@ -1,50 +1,54 @@
 import socket
 import time
 import math
+from dashboard_client import DashboardClient
 
 ROBOT_IP = "192.168.1.15"  # Robot IP address
 DASHBOARD_PORT = 29999
 CONTROL_PORT = 30002  # Port for sending joint positions
+PROGRAM_FOLDER = "Zahra"  # URP folder on the robot; orange programs are in its Orange/ subfolder
+LAUNCH_CONFIRM_TIMEOUT = 3.0  # Seconds to wait for the controller to confirm a stop/load
+STATE_POLL_INTERVAL = 0.05
 
-def send_dashboard_command(command):
+# Shared dashboard connection (opened lazily, re-opened on failure)
+dashboard = DashboardClient(ROBOT_IP, DASHBOARD_PORT)
+
+# Program path -> dashboard reply of its last failed load (reported by prefetch_program)
+unloadable_programs = {}
+
+def send_dashboard_command(command, client=None):
+    """Send one command over client (default: the shared ROBOT_IP dashboard connection)"""
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((ROBOT_IP, DASHBOARD_PORT))
-            time.sleep(0.1)
-            s.recv(1024)
-            s.sendall((command + "\n").encode())
-            time.sleep(0.1)
-            response = s.recv(1024).decode().strip()
-            print(f"Dashboard response: {response}")
-            return response
+        response = (client or dashboard).send(command)
+        print(f"Dashboard response: {response}")
+        return response
     except Exception as e:
         print(f"Dashboard command failed: {e}")
         return None
 
+def send_dashboard_commands(commands, client=None):
+    """
+    Pipeline several dashboard commands over client (default: the shared connection).
+    Returns the replies in order, or None for every command if the connection failed.
+    """
+    try:
+        responses = (client or dashboard).send_many(commands)
+        print(f"Dashboard responses: {responses}")
+        return responses
+    except Exception as e:
+        print(f"Dashboard commands failed: {e}")
+        return [None] * len(commands)
+
 def check_robot_state():
     """
     Check if robot is ready to accept commands
     """
     try:
         print(f"🔍 Checking robot state at {ROBOT_IP}:{DASHBOARD_PORT}")
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(3.0)
-            s.connect((ROBOT_IP, DASHBOARD_PORT))
-            time.sleep(0.1)
-            
-            # Send robotmode command
-            s.sendall("robotmode\n".encode())
-            time.sleep(0.1)
-            response = s.recv(1024).decode().strip()
-            print(f"🔍 Robot mode: {response}")
-            
-            # Send programState command
-            s.sendall("programState\n".encode())
-            time.sleep(0.1)
-            response = s.recv(1024).decode().strip()
-            print(f"🔍 Program state: {response}")
-            
-            return True
+        robot_mode, program_state = dashboard.send_many(["robotmode", "programState"])
+        print(f"🔍 Robot mode: {robot_mode}")
+        print(f"🔍 Program state: {program_state}")
+        return True
     except Exception as e:
         print(f"❌ Failed to check robot state: {e}")
         return False
@@ -116,8 +120,8 @@ def send_joint_positions_urbasic(joint_positions):
         result = {"success": False, "error": None}
         
         def urbasic_operation():
+            from robot_session import robot_session
             try:
-                import URBasic
                 import math
                 
                 # Convert joint positions to radians (URBasic expects radians)
@@ -125,9 +129,8 @@ def send_joint_positions_urbasic(joint_positions):
                 
                 print(f"🔧 Joint positions in radians: {joint_positions_rad}")
                 
-                # Create robot model and connection (following working pattern)
-                robotModel = URBasic.robotModel.RobotModel()
-                robot = URBasic.urScriptExt.UrScriptExt(host=ROBOT_IP, robotModel=robotModel)
+                # Reuse the long-lived robot session (connects on first use)
+                robot = robot_session.get()
                 robot.reset_error()
                 
                 print('🔧 movej with joint specification')
@@ -136,12 +139,10 @@ def send_joint_positions_urbasic(joint_positions):
                 print("✅ Robot movement command sent via URBasic")
                 result["success"] = True
                 
-                # Close the robot connection
-                robot.close()
-                
             except Exception as e:
                 print(f"❌ URBasic operation failed: {e}")
                 result["error"] = str(e)
+                robot_session.invalidate()
         
         # Run URBasic operation in a thread with timeout
         thread = threading.Thread(target=urbasic_operation)
@@ -175,13 +176,12 @@ def send_joint_positions_urbasic_simple(joint_positions):
         result = {"success": False, "error": None}
         
         def urbasic_simple_operation():
+            from robot_session import robot_session
             try:
-                import URBasic
                 import math
                 
-                # Create robot model and connection
-                robotModel = URBasic.robotModel.RobotModel()
-                robot = URBasic.urScriptExt.UrScriptExt(host=ROBOT_IP, robotModel=robotModel)
+                # Reuse the long-lived robot session (connects on first use)
+                robot = robot_session.get()
                 
                 # Reset any errors
                 robot.reset_error()
@@ -198,6 +198,7 @@ def send_joint_positions_urbasic_simple(joint_positions):
             except Exception as e:
                 print(f"❌ Simple URBasic operation failed: {e}")
                 result["error"] = str(e)
+                robot_session.invalidate()
         
         # Run URBasic operation in a thread with timeout
         thread = threading.Thread(target=urbasic_simple_operation)
@@ -266,71 +267,146 @@ def activate_gripper():
         print(f"❌ Failed to activate gripper: {e}")
         return False
 
-def trigger_urp_program(urp_name, orange_mode=False):
+def program_path(urp_name, orange_mode=False, program_folder=PROGRAM_FOLDER):
+    """Dashboard load path of a URP program; raises ValueError for names the dashboard can't load"""
+    name = str(urp_name)
+    if not name.strip() or any(c in name for c in "\r\n\\"):
+        raise ValueError(f"Invalid URP program name: {urp_name!r}")
+    folder = f"{program_folder}/Orange" if orange_mode else program_folder
+    program_name = f"orange_{name}" if orange_mode else name
+    return f"{folder}/{program_name}.urp"
+
+def prefetch_program(urp_name, orange_mode=False, program_folder=PROGRAM_FOLDER):
+    """
+    Check the next queued program ahead of time (while the current one runs).
+    Returns None if it looks loadable, otherwise a description of the problem.
+    """
+    try:
+        file_path = program_path(urp_name, orange_mode, program_folder)
+    except ValueError as e:
+        return str(e)
+    if file_path in unloadable_programs:
+        return f"{file_path} failed to load before: {unloadable_programs[file_path]}"
+    return None
+
+def _is_loaded(loaded_reply, file_path):
+    """True if a 'get loaded program' reply names file_path"""
+    if not loaded_reply:
+        return False
+    loaded = loaded_reply.strip()
+    return loaded.endswith("/" + file_path) or loaded.endswith(" " + file_path)
+
+def _wait_for_program_state(client, state, timeout=LAUNCH_CONFIRM_TIMEOUT):
+    """Poll programState until it starts with state; returns False on timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        reply = send_dashboard_command("programState", client)
+        if reply and reply.upper().startswith(state):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(STATE_POLL_INTERVAL)
+
+def trigger_urp_program(urp_name, orange_mode=False, client=None, program_folder=PROGRAM_FOLDER, timings=None, before_play=None):
     """
     Loads and runs a URP program from Zahra/ or Zahra/Orange/ depending on orange_mode.
     If orange_mode is True, it will prefix 'orange_' to the URP name.
+    client/program_folder select another robot cell (default: ROBOT_IP and Zahra/).
+
+    Every step is confirmed from the dashboard replies instead of fixed sleeps: the
+    robot is only stopped if a program is not STOPPED, and the load is skipped when
+    the same .urp is already loaded. Per-stage durations (ms) are written to timings.
+    before_play is called once the robot is stopped and loaded, right before play
+    (e.g. to arm a completion monitor that must not see the previous program stop).
     """
-    print(f"🔄 Loading URP program: {urp_name}")
-    
-    # First, ensure robot is stopped
-    print("🛑 Stopping robot...")
-    send_dashboard_command("stop")
-    time.sleep(0.5)  # Wait for stop to take effect
-    
-    # Check current state
-    current_state = send_dashboard_command("programState")
-    print(f"📊 Current robot state: {current_state}")
-    
-    if current_state and "RUNNING" in current_state.upper():
-        print("⚠️ Robot is still running, forcing stop...")
-        send_dashboard_command("stop")
-        time.sleep(1.0)  # Wait longer for forced stop
+    timings = timings if timings is not None else {}
+    launch_start = time.perf_counter()
 
-    # Determine folder and URP name
-    folder = "Zahra/Orange" if orange_mode else "Zahra"
-    program_name = f"orange_{urp_name}" if orange_mode else urp_name
-    file_path = f"{folder}/{program_name}.urp"
+    def record(stage, since):
+        timings[f"{stage}_ms"] = round((time.perf_counter() - since) * 1000, 1)
 
-    print(f"📁 Loading from: {file_path}")
-    
-    # Load the program - handle spaces in file names
-    load_command = f"load {file_path}"
-    print(f"🔍 Debug: Sending load command: '{load_command}'")
-    response = send_dashboard_command(load_command)
-    
-    # Check for various error conditions
-    if not response:
-        print(f"❌ No response when loading URP program: {file_path}")
-        return False
-    elif "could not understand" in response.lower():
-        print(f"❌ Robot could not understand load command for: {file_path}")
-        print(f"   Response: {response}")
-        print(f"🔍 Debug: This might be due to spaces in filename or file not existing")
+    print(f"🔄 Loading URP program: {urp_name}")
+    try:
+        file_path = program_path(urp_name, orange_mode, program_folder)
+    except ValueError as e:
+        print(f"❌ {e}")
         return False
-    elif "file not found" in response.lower() or "error" in response.lower():
-        print(f"❌ Failed to load URP program: {file_path}")
-        print(f"   Response: {response}")
+
+    # Current state and loaded program in one round trip
+    stage_start = time.perf_counter()
+    current_state, loaded_program = send_dashboard_commands(["programState", "get loaded program"], client)
+    record("query", stage_start)
+    print(f"📊 Current robot state: {current_state} ({loaded_program})")
+    if not current_state:
+        print(f"❌ No response from the dashboard server when loading: {file_path}")
         return False
 
-    print(f"✅ Program loaded successfully")
-    time.sleep(0.8)  # Wait longer for program to load
-    
-    # Check what program is actually loaded
-    current_program = send_dashboard_command("get loaded program")
-    print(f"🔍 Debug: Currently loaded program: {current_program}")
-    
-    # Start the program
+    # Only stop when something is running or paused
+    stage_start = time.perf_counter()
+    if not current_state.upper().startswith("STOPPED"):
+        print("🛑 Stopping robot...")
+        send_dashboard_command("stop", client)
+        if not _wait_for_program_state(client, "STOPPED"):
+            print("⚠️ Robot did not report STOPPED, loading anyway")
+    record("stop", stage_start)
+
+    # Load the program unless it is already the loaded one
+    stage_start = time.perf_counter()
+    freshly_loaded = not _is_loaded(loaded_program, file_path)
+    if freshly_loaded:
+        print(f"📁 Loading from: {file_path}")
+        response = send_dashboard_command(f"load {file_path}", client)
+
+        # Check for various error conditions
+        if not response:
+            print(f"❌ No response when loading URP program: {file_path}")
+            return False
+        elif "could not understand" in response.lower():
+            print(f"❌ Robot could not understand load command for: {file_path}")
+            print(f"   Response: {response}")
+            print(f"🔍 Debug: This might be due to spaces in filename or file not existing")
+            unloadable_programs[file_path] = response
+            return False
+        elif not response.lower().startswith("loading program"):
+            print(f"❌ Failed to load URP program: {file_path}")
+            print(f"   Response: {response}")
+            unloadable_programs[file_path] = response
+            return False
+        unloadable_programs.pop(file_path, None)
+        print(f"✅ Program loaded successfully")
+    else:
+        print(f"⏩ {file_path} is already loaded, skipping load")
+    timings["load_skipped"] = not freshly_loaded
+    record("load", stage_start)
+
+    # The dashboard replies to load once the program is loaded; if play is refused
+    # anyway, wait until the controller reports the program and try once more
     print("▶️ Starting program...")
-    response = send_dashboard_command("play")
-    if not response or "Failed" in response or "error" in response.lower():
+    stage_start = time.perf_counter()
+    if before_play is not None:
+        before_play()
+    response = send_dashboard_command("play", client)
+    if freshly_loaded and not _play_started(response):
+        deadline = time.monotonic() + LAUNCH_CONFIRM_TIMEOUT
+        while not _is_loaded(send_dashboard_command("get loaded program", client), file_path):
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(STATE_POLL_INTERVAL)
+        response = send_dashboard_command("play", client)
+    record("play", stage_start)
+    record("total", launch_start)
+    print(f"⏱️ Launch timings for {file_path}: {timings}")
+    if not _play_started(response):
         print("❌ Failed to start URP program")
         print(f"   Response: {response}")
         return False
 
-    print(f"✅ URP program '{program_name}' started from {folder}")
+    print(f"✅ URP program '{file_path}' started")
     return True
 
+def _play_started(response):
+    return bool(response) and "failed" not in response.lower() and "error" not in response.lower()
+
 def test_robot_connection():
     """
     Test if robot is reachable via socket
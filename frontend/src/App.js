@@ -33,6 +33,7 @@ function App() {
   const [robotExecutionMessage, setRobotExecutionMessage] = useState("");
   const [currentTaskBlocked, setCurrentTaskBlocked] = useState(false);
   const [blockedTaskMessage, setBlockedTaskMessage] = useState("");
+  const [executionStream, setExecutionStream] = useState({});
   const [currentTaskOrder, setCurrentTaskOrder] = useState([]);
   const [currentBlockOrder, setCurrentBlockOrder] = useState([]);
   const [taskBlockMapping, setTaskBlockMapping] = useState({});
@@ -306,122 +307,114 @@ function App() {
   }, []);
 
 
+  // Subscribe to the backend execution event stream (snapshot on connect, then deltas)
   useEffect(() => {
-    const interval = setInterval(() => {
-      // Only fetch robot message if robot has started
-      if (robotStarted) {
-        fetch("http://127.0.0.1:8000/robot/message")
-          .then((res) => res.json())
-                  .then((data) => {
-          console.log("🔍 Robot message data:", data);
-          // Only set robot execution message, don't set robotMessage here
-          if (data.executionMessage !== undefined) setRobotExecutionMessage(data.executionMessage);
-        })
-        .then(() => {
-          // Also fetch human dependency messages
-          return fetch("http://127.0.0.1:8000/check-human-dependency");
-        })
-        .then((res) => res.json())
-        .then((humanDependencyData) => {
-          console.log("🔍 Human dependency data:", humanDependencyData);
-          // Check robot dependencies as well
-          return fetch("http://127.0.0.1:8000/check-robot-dependency")
-            .then((res) => res.json())
-            .then((robotDependencyData) => {
-              console.log("🔍 Robot dependency data:", robotDependencyData);
-              
-              // Prioritize robot dependency messages over human dependency messages
-              if (!robotDependencyData.allowed && robotDependencyData.message) {
-                const newMessage = `🤖 ${robotDependencyData.message}`;
-                if (newMessage !== robotMessage) {
-                  setRobotMessage(newMessage);
-                }
-              } else if (!humanDependencyData.allowed && humanDependencyData.message) {
-                const newMessage = `⚠️ ${humanDependencyData.message}`;
-                if (newMessage !== robotMessage) {
-                  setRobotMessage(newMessage);
-                }
-              } else {
-                // All dependencies are met - show success message
-                const successMessage = "✅ All dependencies are met";
-                if (robotMessage !== successMessage) {
-                  setRobotMessage(successMessage);
-                }
-              }
-              
-              // Update blocked states
-              setCurrentTaskBlocked(!humanDependencyData.allowed);
-              setBlockedTaskMessage(humanDependencyData.message || "");
-            });
-        })
-          .catch((err) => console.error("Error fetching robot message:", err));
-      }
-    }, 2000);
+    const source = new EventSource("http://127.0.0.1:8000/events");
+    let state = {};
+
+    source.addEventListener("snapshot", (e) => {
+      state = JSON.parse(e.data).state;
+      setExecutionStream(state);
+    });
+    source.addEventListener("delta", (e) => {
+      const { section, changes } = JSON.parse(e.data);
+      state = { ...state, [section]: { ...(state[section] || {}), ...changes } };
+      setExecutionStream(state);
+    });
+    // EventSource reconnects on its own and receives a fresh snapshot
+    source.onerror = (err) => console.error("Execution event stream error:", err);
 
-    return () => clearInterval(interval);
-  }, [robotStarted, robotMessage]);
+    return () => source.close();
+  }, []);
+
+
+  // Robot message and dependency gates from the event stream
+  useEffect(() => {
+    // Only show robot messages if robot has started
+    if (!robotStarted) return;
+
+    const robotState = executionStream.robot;
+    const execution = executionStream.execution;
+    if (robotState && robotState.executionMessage !== undefined) {
+      setRobotExecutionMessage(robotState.executionMessage);
+    }
+    if (!execution) return;
 
+    const humanGate = execution.human_gate || { allowed: true, message: "" };
+    const robotGate = execution.robot_gate || { allowed: true, message: "" };
 
+    // Prioritize robot dependency messages over human dependency messages
+    if (!robotGate.allowed && robotGate.message) {
+      setRobotMessage(`🤖 ${robotGate.message}`);
+    } else if (!humanGate.allowed && humanGate.message) {
+      setRobotMessage(`⚠️ ${humanGate.message}`);
+    } else {
+      // All dependencies are met - show success message
+      setRobotMessage("✅ All dependencies are met");
+    }
+
+    // Update blocked states
+    setCurrentTaskBlocked(!humanGate.allowed);
+    setBlockedTaskMessage(humanGate.message || "");
+  }, [robotStarted, executionStream]);
+
+
+
+  // Derive finished task lists from an execution state (event stream or /get-execution-state)
+  const applyExecutionState = useCallback((executionState) => {
+    // Get all tasks to determine which ones are finished
+    const allTasks = tasks;
+    
+    // Find human tasks that are finished (in all_finished_tasks but not in human_assigned_tasks)
+    const humanFinishedTasks = allTasks
+      .filter(task => task.assignedTo === "Human")
+      .filter(task => {
+        const taskName = task.name?.trim().toLowerCase();
+        const allFinished = executionState.all_finished_tasks.map(t => t.trim().toLowerCase());
+        const humanAssigned = executionState.human_assigned_tasks.map(t => t.trim().toLowerCase());
+        return allFinished.includes(taskName) && !humanAssigned.includes(taskName);
+      })
+      .map(task => task.name);
+    
+    // Find robot tasks that are finished (in all_finished_tasks but not in robot_assigned_tasks)
+    const robotFinishedTasks = allTasks
+      .filter(task => task.assignedTo === "Robot")
+      .filter(task => {
+        const taskName = task.name?.trim().toLowerCase();
+        const allFinished = executionState.all_finished_tasks.map(t => t.trim().toLowerCase());
+        const robotAssigned = executionState.robot_assigned_tasks.map(t => t.trim().toLowerCase());
+        return allFinished.includes(taskName) && !robotAssigned.includes(taskName);
+      })
+      .map(task => task.name);
+    
+    console.log("🔍 Debug: Human Finished Tasks:", humanFinishedTasks);
+    console.log("🔍 Debug: Robot Finished Tasks:", robotFinishedTasks);
+    
+    setFinishedTasks({
+      human_finished: humanFinishedTasks,
+      robot_finished: robotFinishedTasks,
+      all_finished: executionState.all_finished_tasks
+    });
+  }, [tasks]);
 
-  // Fetch execution state periodically
+  // One-off fetch, used when the UI needs the state immediately after its own request
   const fetchExecutionState = useCallback(async () => {
     try {
       const response = await axios.get("http://127.0.0.1:8000/get-execution-state");
-      
-      // Debug: Print robot assigned tasks
-      console.log("🔍 Debug: Robot Assigned Tasks:", response.data.robot_assigned_tasks);
-      console.log("🔍 Debug: All Finished Tasks:", response.data.all_finished_tasks);
-      
-      // Get all tasks to determine which ones are finished
-      const allTasks = tasks;
-      
-      // Find human tasks that are finished (in all_finished_tasks but not in human_assigned_tasks)
-      const humanFinishedTasks = allTasks
-        .filter(task => task.assignedTo === "Human")
-        .filter(task => {
-          const taskName = task.name?.trim().toLowerCase();
-          const allFinished = response.data.all_finished_tasks.map(t => t.trim().toLowerCase());
-          const humanAssigned = response.data.human_assigned_tasks.map(t => t.trim().toLowerCase());
-          return allFinished.includes(taskName) && !humanAssigned.includes(taskName);
-        })
-        .map(task => task.name);
-      
-      // Find robot tasks that are finished (in all_finished_tasks but not in robot_assigned_tasks)
-      const robotFinishedTasks = allTasks
-        .filter(task => task.assignedTo === "Robot")
-        .filter(task => {
-          const taskName = task.name?.trim().toLowerCase();
-          const allFinished = response.data.all_finished_tasks.map(t => t.trim().toLowerCase());
-          const robotAssigned = response.data.robot_assigned_tasks.map(t => t.trim().toLowerCase());
-          return allFinished.includes(taskName) && !robotAssigned.includes(taskName);
-        })
-        .map(task => task.name);
-      
-      console.log("🔍 Debug: Human Finished Tasks:", humanFinishedTasks);
-      console.log("🔍 Debug: Robot Finished Tasks:", robotFinishedTasks);
-      
-      setFinishedTasks({
-        human_finished: humanFinishedTasks,
-        robot_finished: robotFinishedTasks,
-        all_finished: response.data.all_finished_tasks
-      });
+      applyExecutionState(response.data);
     } catch (error) {
       console.error("Failed to fetch execution state:", error);
     }
-  }, [tasks]);
+  }, [applyExecutionState]);
 
-  // Fetch execution state on component mount and periodically
+  // Update finished tasks whenever the event stream reports an execution change
   useEffect(() => {
-    // Don't start polling if all tasks are completely finished
-    if (areAllTasksFinished) {
-      console.log("Skipping execution state polling - all tasks finished");
+    // Don't update if all tasks are completely finished
+    if (areAllTasksFinished || !executionStream.execution) {
       return;
     }
-    
-    fetchExecutionState();
-    const interval = setInterval(fetchExecutionState, 2000);
-    return () => clearInterval(interval);
-  }, [areAllTasksFinished, fetchExecutionState]);
+    applyExecutionState(executionStream.execution);
+  }, [areAllTasksFinished, executionStream, applyExecutionState]);
 
   // Reset robot + polling execution state
   useEffect(() => {
@@ -574,33 +567,21 @@ function App() {
 
 
   useEffect(() => {
-    const interval = setInterval(() => {
-      // Don't poll if all tasks are completely finished
-      if (areAllTasksFinished) {
-        return;
-      }
-      
-      // Only poll if robot has started and not finished
-      if (robotStarted && !robotFinished) {
-        axios.get("http://127.0.0.1:8000/robot/execution_state")
-          .then(res => {
-            setCurrentRobotTask(res.data.current_task);
-            setExecutedRobotTasks(res.data.executed_tasks);
-          })
-          .catch(err => console.error("Failed to fetch robot execution state", err));
+    // Don't update if all tasks are completely finished
+    if (areAllTasksFinished) {
+      return;
+    }
 
-        axios.get("http://127.0.0.1:8000/robot/all_completed")
-          .then(res => {
-            if (res.data.all_completed) {
-              setRobotFinished(true) // Disable Resume button
-            }
-          })
-          .catch(err => console.error("Failed to check robot completion", err));
+    // Only track robot state if robot has started and not finished
+    const robotState = executionStream.robot;
+    if (robotStarted && !robotFinished && robotState) {
+      setCurrentRobotTask(robotState.current_task);
+      setExecutedRobotTasks(robotState.executed_tasks || []);
+      if (robotState.all_tasks_completed) {
+        setRobotFinished(true) // Disable Resume button
       }
-    }, 2000); // Increased from 500ms to 2000ms
-
-    return () => clearInterval(interval);
-  }, [robotStarted, robotFinished, areAllTasksFinished]);
+    }
+  }, [robotStarted, robotFinished, areAllTasksFinished, executionStream]);
 
   // Function to start the question timer
   const startQuestionTimer = useCallback(() => {